@@ -0,0 +1,68 @@
+# Importa bibliotecas necessárias para avisar o painel sobre cada acesso assim que ele acontece
+
+# Importa a biblioteca socket para enviar os eventos por UDP local (sem conexão e sem esperar resposta)
+import socket
+# Importa a biblioteca json para serializar os eventos
+import json
+# Importa a biblioteca base64 para levar a miniatura do rosto dentro do próprio evento
+import base64
+# Importa a biblioteca OpenCV para reduzir e comprimir a miniatura
+import cv2
+
+# --- CONFIGURAÇÕES ---
+# Endereço onde o painel (facein, servidor ASGI) escuta os eventos de acesso
+ENDERECO_EVENTOS = ('127.0.0.1', 8765)
+# Lado (em pixels) da miniatura do rosto enviada junto com o evento
+LADO_MINIATURA = 64
+# Qualidade JPEG da miniatura
+QUALIDADE_MINIATURA = 70
+# Tamanho máximo de um datagrama; acima disso o evento segue sem miniatura
+TAMANHO_MAXIMO_DATAGRAMA = 60000
+
+def gerar_miniatura(imagem, lado=LADO_MINIATURA):
+    """
+    Reduz o rosto para uma miniatura JPEG e a devolve em base64 (ou None se não for possível).
+    """
+    if imagem is None or imagem.size == 0:
+        return None
+    altura, largura = imagem.shape[:2]
+    escala = lado / max(altura, largura)
+    if escala < 1:
+        imagem = cv2.resize(imagem, (max(1, int(largura * escala)), max(1, int(altura * escala))),
+                            interpolation=cv2.INTER_AREA)
+    ok, dados = cv2.imencode('.jpg', imagem, [cv2.IMWRITE_JPEG_QUALITY, QUALIDADE_MINIATURA])
+    if not ok:
+        return None
+    return base64.b64encode(dados.tobytes()).decode('ascii')
+
+class PublicadorEventos:
+    """
+    Publica eventos de acesso em um canal UDP local. O envio nunca bloqueia nem falha
+    o reconhecimento: se ninguém estiver escutando, o evento simplesmente se perde
+    (o registro oficial continua sendo o LogsAcesso).
+    """
+
+    def __init__(self, endereco=ENDERECO_EVENTOS):
+        self.endereco = endereco
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+        # Contadores de acompanhamento
+        self.publicados = 0
+        self.falhas = 0
+
+    def publicar(self, evento):
+        """
+        Envia um evento (dicionário) em um único datagrama.
+        """
+        dados = json.dumps(evento, ensure_ascii=False).encode('utf-8')
+        if len(dados) > TAMANHO_MAXIMO_DATAGRAMA and evento.get('miniatura'):
+            dados = json.dumps(dict(evento, miniatura=None), ensure_ascii=False).encode('utf-8')
+        try:
+            self._socket.sendto(dados, self.endereco)
+            self.publicados += 1
+        except OSError:
+            self.falhas += 1
+
+    def fechar(self):
+        self._socket.close()
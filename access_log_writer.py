@@ -0,0 +1,226 @@
+# Importa bibliotecas necessárias para gravar os logs de acesso em segundo plano
+
+# Importa a biblioteca sqlite3 para gravar na tabela LogsAcesso
+import sqlite3
+# Importa a biblioteca sys para avisar na saída de erros sobre eventos recusados pelo banco
+import sys
+# Importa a biblioteca threading para a thread que grava os logs
+import threading
+# Importa a biblioteca queue para a fila de eventos entre quem registra e quem grava
+import queue
+# Importa a biblioteca de tempo para os limites de tempo e a latência das gravações
+import time
+# Importa as métricas de tempo por etapa e de profundidade das filas
+from metrics import ETAPAS, FILAS
+
+# --- CONFIGURAÇÕES ---
+# Quantidade de eventos que dispara uma gravação imediata
+TAMANHO_LOTE_LOGS = 50
+# Tempo máximo (em segundos) que um evento espera na fila antes de ser gravado
+INTERVALO_GRAVACAO = 0.5
+# Tempo (em segundos) que uma gravação espera por outra conexão que esteja escrevendo no banco
+TEMPO_ESPERA_BLOQUEIO = 5.0
+# Quantas vezes um lote é tentado com o banco ocupado antes de ser descartado como rejeitado
+MAXIMO_TENTATIVAS_GRAVACAO = 5
+# Espera máxima (em segundos) entre duas tentativas; a espera dobra a cada tentativa até este limite
+ESPERA_MAXIMA_TENTATIVA = 30.0
+
+# Valores aceitos pela coluna status de LogsAcesso (a mesma restrição CHECK do banco)
+STATUS_VALIDOS = ('Aceito', 'Negado', 'Não Encontrado')
+
+# Códigos de erro do SQLite que indicam banco ocupado ou bloqueado por outra conexão
+_CODIGOS_PASSAGEIROS = (getattr(sqlite3, 'SQLITE_BUSY', 5), getattr(sqlite3, 'SQLITE_LOCKED', 6))
+
+# Comando de inserção de um evento
+_INSERIR_LOG = '''
+    INSERT INTO LogsAcesso (timestamp_acesso, status, usuario_id, caminho_foto_capturada, portao)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+def erro_passageiro(erro):
+    """
+    Indica se o erro é de banco ocupado ou bloqueado (e vale tentar de novo depois).
+    Outros erros operacionais (ex.: tabela inexistente, disco cheio) não se resolvem esperando.
+    """
+    if not isinstance(erro, sqlite3.OperationalError):
+        return False
+    # sqlite_errorcode só existe a partir do Python 3.11; antes disso resta a mensagem
+    codigo = getattr(erro, 'sqlite_errorcode', None)
+    if codigo is not None:
+        return codigo & 0xFF in _CODIGOS_PASSAGEIROS
+    mensagem = str(erro).lower()
+    return 'locked' in mensagem or 'busy' in mensagem
+
+class EscritorLogs:
+    """
+    Dono de uma única conexão de longa duração (em modo WAL) com o banco, que recebe eventos
+    de acesso por uma fila e os grava em transações agrupadas, por tamanho ou por tempo.
+    Um lote só é guardado para nova tentativa quando o banco está ocupado ou bloqueado, com
+    espera crescente e no máximo `MAXIMO_TENTATIVAS_GRAVACAO` vezes; eventos que o banco recusa
+    (ex.: status inválido, tabela inexistente) e lotes que esgotam as tentativas são descartados,
+    com aviso na saída de erros e, se informado, uma linha em `arquivo_rejeitados`.
+    """
+
+    def __init__(self, db_path, tamanho_lote=TAMANHO_LOTE_LOGS, intervalo=INTERVALO_GRAVACAO,
+                 arquivo_rejeitados=None, maximo_tentativas=MAXIMO_TENTATIVAS_GRAVACAO):
+        self.db_path = db_path
+        self.arquivo_rejeitados = arquivo_rejeitados
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.maximo_tentativas = maximo_tentativas
+        self._fila = queue.Queue()
+        self._parar = threading.Event()
+
+        # Contadores de acompanhamento
+        self.eventos_gravados = 0
+        self.gravacoes = 0
+        self.falhas = 0
+        self.rejeitados = 0
+        self.ultima_latencia = 0.0
+        self.maior_latencia = 0.0
+        self._soma_latencias = 0.0
+
+        FILAS.definir(self.profundidade_fila, 'logs')
+        self._thread = threading.Thread(target=self._executar, name='escritor-logs', daemon=True)
+        self._thread.start()
+
+    def registrar(self, evento):
+        """
+        Enfileira um evento (timestamp, status, usuario_id, caminho_foto_capturada, portao) para gravação.
+        """
+        self._fila.put(evento)
+
+    def profundidade_fila(self):
+        return self._fila.qsize()
+
+    def latencia_media(self):
+        return self._soma_latencias / self.gravacoes if self.gravacoes else 0.0
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.db_path, timeout=TEMPO_ESPERA_BLOQUEIO, check_same_thread=False)
+        # O modo WAL deixa leitores e o escritor trabalharem ao mesmo tempo e evita um fsync por evento
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _rejeitar(self, evento, erro):
+        """
+        Descarta um evento que o banco recusou, avisando na saída de erros e no arquivo de rejeitados.
+        """
+        self.rejeitados += 1
+        print(f"[ERRO DE LOG] Evento descartado {evento!r}: {erro}", file=sys.stderr)
+        if self.arquivo_rejeitados:
+            try:
+                with open(self.arquivo_rejeitados, 'a', encoding='utf-8') as arquivo:
+                    arquivo.write(f"{evento!r}\t{erro}\n")
+            except OSError as e:
+                print(f"[ERRO DE LOG] Não foi possível gravar em '{self.arquivo_rejeitados}': {e}", file=sys.stderr)
+
+    def _gravar_separados(self, conn, eventos):
+        """
+        Grava os eventos um a um, na mesma transação, descartando os que o banco recusa.
+        Erros passageiros (banco ocupado ou bloqueado) desfazem a transação e sobem para quem chamou.
+        Retorna quantos eventos foram gravados.
+        """
+        gravados = 0
+        with conn:
+            for evento in eventos:
+                try:
+                    conn.execute(_INSERIR_LOG, evento)
+                    gravados += 1
+                except Exception as e:
+                    if erro_passageiro(e):
+                        raise
+                    self._rejeitar(evento, e)
+        return gravados
+
+    def _gravar(self, conn, eventos):
+        """
+        Grava um lote. Retorna False apenas se o lote deve ser mantido para nova tentativa.
+        """
+        inicio = time.perf_counter()
+        try:
+            try:
+                with conn:
+                    conn.executemany(_INSERIR_LOG, eventos)
+                gravados = len(eventos)
+            except Exception as e:
+                if erro_passageiro(e):
+                    raise
+                # Algum evento do lote é inválido: grava os válidos e descarta só os recusados
+                print(f"[ERRO DE LOG] Lote de {len(eventos)} evento(s) recusado ({e}); gravando um a um.",
+                      file=sys.stderr)
+                gravados = self._gravar_separados(conn, eventos)
+        except sqlite3.OperationalError as e:
+            # Banco ocupado ou bloqueado: o lote inteiro é mantido e gravado de novo depois
+            self.falhas += 1
+            print(f"[ERRO DE LOG] Não foi possível gravar {len(eventos)} evento(s): {e}", file=sys.stderr)
+            return False
+        latencia = time.perf_counter() - inicio
+        ETAPAS.observar(latencia, 'gravacao_logs')
+        self.gravacoes += 1
+        self.eventos_gravados += gravados
+        self.ultima_latencia = latencia
+        self.maior_latencia = max(self.maior_latencia, latencia)
+        self._soma_latencias += latencia
+        return True
+
+    def _executar(self):
+        conn = self._conectar()
+        pendentes = []
+        limite = None
+        # Tentativas seguidas com o banco ocupado e momento em que a próxima pode ser feita
+        tentativas = 0
+        proxima_tentativa = 0.0
+        try:
+            while not (self._parar.is_set() and self._fila.empty() and not pendentes):
+                # Espera o próximo evento, no máximo até o limite de tempo do lote atual
+                espera = self.intervalo if limite is None else max(0.0, limite - time.monotonic())
+                try:
+                    evento = self._fila.get(timeout=espera)
+                    # None só acorda a thread para encerrar (ver encerrar)
+                    if evento is not None:
+                        pendentes.append(evento)
+                        if limite is None:
+                            limite = time.monotonic() + self.intervalo
+                    # Aproveita tudo que já estiver na fila sem esperar mais
+                    while len(pendentes) < self.tamanho_lote:
+                        evento = self._fila.get_nowait()
+                        if evento is not None:
+                            pendentes.append(evento)
+                except queue.Empty:
+                    pass
+
+                agora = time.monotonic()
+                vencido = limite is not None and agora >= limite
+                pronto = len(pendentes) >= self.tamanho_lote or vencido or self._parar.is_set()
+                if pendentes and pronto and agora >= proxima_tentativa:
+                    if self._gravar(conn, pendentes):
+                        pendentes = []
+                        limite = None
+                        tentativas = 0
+                        continue
+                    tentativas += 1
+                    if tentativas >= self.maximo_tentativas:
+                        # O banco continua ocupado: descarta o lote em vez de segurá-lo para sempre
+                        erro = f'banco ocupado após {tentativas} tentativa(s)'
+                        for evento in pendentes:
+                            self._rejeitar(evento, erro)
+                        pendentes = []
+                        limite = None
+                        tentativas = 0
+                        continue
+                    # Banco ocupado: mantém os eventos e tenta de novo depois de uma espera crescente
+                    espera = min(self.intervalo * 2 ** (tentativas - 1), ESPERA_MAXIMA_TENTATIVA)
+                    proxima_tentativa = limite = time.monotonic() + espera
+        finally:
+            conn.close()
+
+    def encerrar(self):
+        """
+        Grava tudo que ainda estiver na fila e fecha a conexão.
+        """
+        self._parar.set()
+        # Acorda a thread se ela estiver esperando por eventos com a fila vazia
+        self._fila.put(None)
+        self._thread.join()
@@ -0,0 +1,263 @@
+# Importa bibliotecas necessárias para decidir, em memória, se uma pessoa reconhecida pode passar
+
+# Importa a biblioteca threading para trocar as regras carregadas sem travar as decisões em andamento
+import threading
+# Importa a busca binária para achar os intervalos que contêm o momento atual
+from bisect import bisect_right
+# Importa a classe namedtuple para devolver a decisão de forma legível
+from collections import namedtuple
+# Importa as classes de data para normalizar os períodos das regras
+from datetime import datetime, date
+
+# --- CONFIGURAÇÕES ---
+# Horário de aula de cada turno (usado apenas se RESTRINGIR_HORARIO_AULA estiver ligado)
+HORARIOS_TURNO = {
+    'Matutino': ('07:00', '12:00'),
+    'Vespertino': ('13:00', '18:00'),
+    'Noturno': ('18:40', '22:00'),
+}
+# Se ligado, alunos só passam durante o horário de aula da sua turma com liberação da COAPAC
+# ou permissão especial (o portão não distingue entrada de saída, por isso vem desligado)
+RESTRINGIR_HORARIO_AULA = False
+# Fim aberto para suspensões sem data_fim
+SEM_FIM = '9999-12-31 23:59:59'
+
+# Decisão do motor de regras: se pode passar e o motivo (para o log e para a tela)
+Decisao = namedtuple('Decisao', ['permitido', 'motivo'])
+
+def _momento(valor, fim_do_dia=False):
+    """
+    Converte datas e horários do banco para o texto 'AAAA-MM-DD HH:MM:SS' (comparável como texto).
+    Datas sem hora viram o início (ou o fim) do dia. Retorna None se o valor for inválido.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, date):
+        valor = valor.isoformat()
+    texto = str(valor).strip().replace('T', ' ')
+    for formato in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            momento = datetime.strptime(texto[:19] if formato.endswith('%S') else texto, formato)
+        except ValueError:
+            continue
+        if formato == '%Y-%m-%d':
+            return momento.strftime('%Y-%m-%d 23:59:59' if fim_do_dia else '%Y-%m-%d 00:00:00')
+        return momento.strftime('%Y-%m-%d %H:%M:%S')
+    return None
+
+class Intervalos:
+    """
+    Conjunto de intervalos [início, fim] (com um motivo cada) ordenados pelo início.
+    Guarda o maior fim acumulado para responder "algum intervalo contém este momento?"
+    com uma busca binária, mesmo quando os intervalos se sobrepõem.
+    """
+    __slots__ = ('inicios', 'fins', 'motivos', 'maior_fim')
+
+    def __init__(self, intervalos):
+        intervalos = sorted(intervalos)
+        self.inicios = [inicio for inicio, _, _ in intervalos]
+        self.fins = [fim for _, fim, _ in intervalos]
+        self.motivos = [motivo for _, _, motivo in intervalos]
+        self.maior_fim = []
+        maior = ''
+        for fim in self.fins:
+            maior = max(maior, fim)
+            self.maior_fim.append(maior)
+
+    def ativo(self, momento):
+        """
+        Retorna o motivo de um intervalo que contém o momento, ou None se nenhum contém.
+        """
+        i = bisect_right(self.inicios, momento) - 1
+        if i < 0 or self.maior_fim[i] < momento:
+            return None
+        # Algum intervalo até i termina depois do momento: volta até encontrá-lo
+        while i >= 0:
+            if self.fins[i] >= momento:
+                return self.motivos[i]
+            i -= 1
+        return None
+
+def _agrupar(linhas):
+    """
+    Agrupa linhas (chave, início, fim, motivo) em um dicionário chave -> Intervalos.
+    """
+    grupos = {}
+    for chave, inicio, fim, motivo in linhas:
+        if inicio is None or fim is None or fim < inicio:
+            continue
+        grupos.setdefault(chave, []).append((inicio, fim, motivo))
+    return {chave: Intervalos(intervalos) for chave, intervalos in grupos.items()}
+
+class MotorPoliticas:
+    """
+    Mantém em memória as regras de acesso (situação do usuário, suspensões, permissões especiais,
+    liberações da COAPAC por turma e janelas dos visitantes), indexadas por usuário e turma,
+    e responde "pode passar agora, e por quê?" sem consultar o banco.
+    Cada grupo de regras é recarregado só quando a versão da sua tabela muda em VersoesTabelas.
+    """
+
+    # Tabelas de que cada grupo de regras depende
+    _DEPENDENCIAS = {
+        'usuarios': ('Usuarios',),
+        'suspensoes': ('AcoesDisciplinares',),
+        'permissoes': ('PermissoesEspeciais',),
+        'turmas': ('Turmas', 'UsuarioTurma'),
+        'liberacoes': ('LiberacoesCOAPAC',),
+        'visitantes': ('Visitantes',),
+    }
+
+    def __init__(self, restringir_horario_aula=RESTRINGIR_HORARIO_AULA, horarios_turno=None):
+        self.restringir_horario_aula = restringir_horario_aula
+        self.horarios_turno = HORARIOS_TURNO if horarios_turno is None else horarios_turno
+        self._versoes = {}
+        self._trava = threading.Lock()
+        # Estruturas trocadas inteiras a cada recarga (as decisões leem sem trava)
+        self.situacoes = {}
+        self.tipos = {}
+        self.suspensoes = {}
+        self.permissoes = {}
+        self.turmas_usuario = {}
+        self.turnos = {}
+        self.liberacoes = {}
+        self.visitantes = {}
+        # Quantas vezes cada grupo foi recarregado
+        self.recargas = {grupo: 0 for grupo in self._DEPENDENCIAS}
+
+    # --- Carga ---
+
+    def _carregar_usuarios(self, c):
+        c.execute("SELECT id, situacao, tipo FROM Usuarios")
+        situacoes, tipos = {}, {}
+        for usuario_id, situacao, tipo in c.fetchall():
+            situacoes[usuario_id] = situacao
+            tipos[usuario_id] = tipo
+        self.situacoes, self.tipos = situacoes, tipos
+
+    def _carregar_suspensoes(self, c):
+        c.execute("SELECT usuario_id, data_inicio, data_fim, motivo FROM AcoesDisciplinares WHERE tipo = 'Suspensão'")
+        self.suspensoes = _agrupar(
+            (usuario_id, _momento(inicio) or '0000-01-01 00:00:00',
+             _momento(fim, fim_do_dia=True) if fim else SEM_FIM,
+             f"Suspensão até {str(fim)[:10] if fim else 'segunda ordem'}" + (f": {motivo}" if motivo else ''))
+            for usuario_id, inicio, fim, motivo in c.fetchall()
+        )
+
+    def _carregar_permissoes(self, c):
+        # A permissão vale a partir do horário concedido até o fim daquele dia
+        c.execute("SELECT usuario_id, data_hora_permissao, justificativa FROM PermissoesEspeciais")
+        self.permissoes = _agrupar(
+            (usuario_id, _momento(quando), _momento(str(quando)[:10], fim_do_dia=True) if quando else None,
+             "Permissão especial" + (f": {justificativa}" if justificativa else ''))
+            for usuario_id, quando, justificativa in c.fetchall()
+        )
+
+    def _carregar_turmas(self, c):
+        c.execute("SELECT id, turno FROM Turmas")
+        self.turnos = dict(c.fetchall())
+        c.execute("SELECT usuario_id, turma_id FROM UsuarioTurma")
+        turmas_usuario = {}
+        for usuario_id, turma_id in c.fetchall():
+            turmas_usuario.setdefault(usuario_id, []).append(turma_id)
+        self.turmas_usuario = turmas_usuario
+
+    def _carregar_liberacoes(self, c):
+        # A liberação vale a partir do horário liberado (ou do início do dia) até o fim daquele dia
+        c.execute("SELECT turma_id, data_liberacao, horario_liberacao, justificativa FROM LiberacoesCOAPAC")
+        self.liberacoes = _agrupar(
+            (turma_id,
+             _momento(f"{data} {horario}" if horario else data),
+             _momento(data, fim_do_dia=True),
+             "Liberação da COAPAC" + (f": {justificativa}" if justificativa else ''))
+            for turma_id, data, horario, justificativa in c.fetchall()
+        )
+
+    def _carregar_visitantes(self, c):
+        c.execute("SELECT id, horario_programado_inicio, horario_programado_fim, motivo_acesso FROM Visitantes")
+        self.visitantes = _agrupar(
+            (visitante_id, _momento(inicio), _momento(fim, fim_do_dia=True), motivo or 'Visita programada')
+            for visitante_id, inicio, fim, motivo in c.fetchall()
+        )
+
+    def atualizar(self, conn):
+        """
+        Recarrega apenas os grupos de regras cujas tabelas mudaram desde a última chamada.
+        Retorna a lista de grupos recarregados.
+        """
+        with self._trava:
+            c = conn.cursor()
+            c.execute("SELECT tabela, versao FROM VersoesTabelas")
+            versoes = dict(c.fetchall())
+            recarregados = []
+            for grupo, tabelas in self._DEPENDENCIAS.items():
+                atual = tuple(versoes.get(tabela) for tabela in tabelas)
+                if self._versoes.get(grupo) == atual:
+                    continue
+                getattr(self, f'_carregar_{grupo}')(c)
+                self._versoes[grupo] = atual
+                self.recargas[grupo] += 1
+                recarregados.append(grupo)
+            return recarregados
+
+    # --- Decisões ---
+
+    def _em_horario_de_aula(self, usuario_id, agora):
+        """
+        Retorna as turmas do aluno que estão em horário de aula neste momento.
+        """
+        if agora.weekday() >= 5:
+            return []
+        hora = agora.strftime('%H:%M')
+        em_aula = []
+        for turma_id in self.turmas_usuario.get(usuario_id, ()):
+            janela = self.horarios_turno.get(self.turnos.get(turma_id))
+            if janela is not None and janela[0] <= hora < janela[1]:
+                em_aula.append(turma_id)
+        return em_aula
+
+    def decidir(self, usuario_id, agora=None):
+        """
+        Decide se o usuário pode passar agora. Ordem das regras:
+        1. Permissão especial válida libera a passagem (inclusive de suspensos).
+        2. Suspensão em vigor (ou situação 'Suspenso') nega.
+        3. Com a restrição de horário ligada, aluno em horário de aula só passa com liberação da COAPAC.
+        """
+        agora = agora or datetime.now()
+        momento = agora.strftime('%Y-%m-%d %H:%M:%S')
+
+        permissoes = self.permissoes.get(usuario_id)
+        motivo = permissoes.ativo(momento) if permissoes is not None else None
+        if motivo is not None:
+            return Decisao(True, motivo)
+
+        suspensoes = self.suspensoes.get(usuario_id)
+        motivo = suspensoes.ativo(momento) if suspensoes is not None else None
+        if motivo is not None:
+            return Decisao(False, motivo)
+        if self.situacoes.get(usuario_id) == 'Suspenso':
+            return Decisao(False, "Usuário com situação 'Suspenso'")
+
+        if self.restringir_horario_aula and self.tipos.get(usuario_id) == 'Discente':
+            turmas = self._em_horario_de_aula(usuario_id, agora)
+            if turmas:
+                for turma_id in turmas:
+                    liberacoes = self.liberacoes.get(turma_id)
+                    motivo = liberacoes.ativo(momento) if liberacoes is not None else None
+                    if motivo is not None:
+                        return Decisao(True, motivo)
+                return Decisao(False, 'Horário de aula sem liberação da COAPAC')
+
+        return Decisao(True, 'Acesso liberado')
+
+    def decidir_visitante(self, visitante_id, agora=None):
+        """
+        Decide se o visitante pode passar agora, pela janela de horário programada.
+        """
+        momento = (agora or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+        janelas = self.visitantes.get(visitante_id)
+        motivo = janelas.ativo(momento) if janelas is not None else None
+        if motivo is not None:
+            return Decisao(True, motivo)
+        return Decisao(False, 'Fora do horário programado da visita')
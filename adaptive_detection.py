@@ -0,0 +1,145 @@
+# Importa bibliotecas necessárias para detectar rostos só quando e onde vale a pena
+
+# Importa a biblioteca OpenCV para reduzir os frames e comparar um frame com o anterior
+import cv2
+# Importa a biblioteca NumPy para contar os pixels que mudaram
+import numpy as np
+# Importa as métricas de tempo por etapa e o contador de detecções puladas
+from metrics import ETAPAS, DETECCOES_PULADAS
+
+# --- CONFIGURAÇÕES ---
+# Largura (em pixels) da imagem entregue ao MediaPipe; frames maiores são reduzidos antes da detecção
+LARGURA_DETECCAO = 640
+# Largura (em pixels) da miniatura em tons de cinza usada para detectar movimento
+LARGURA_MOVIMENTO = 160
+# Diferença mínima de intensidade (0 a 255) para considerar que um pixel mudou
+LIMIAR_PIXEL = 25
+# Fração mínima de pixels alterados para considerar que houve movimento na cena
+LIMIAR_MOVIMENTO = 0.005
+# Por quantos segundos após o último movimento (ou rosto) a detecção continua rodando em todos os frames
+JANELA_ATIVIDADE = 1.5
+# Mesmo sem movimento, roda uma detecção a cada tantos segundos (rede de segurança)
+INTERVALO_DETECCAO_OCIOSA = 2.0
+
+def regiao_em_pixels(regiao, largura, altura):
+    """
+    Converte a região de interesse relativa (x1, y1, x2, y2, de 0 a 1) em pixels.
+    Sem região, devolve o frame inteiro.
+    """
+    if not regiao:
+        return 0, 0, largura, altura
+    x1, y1, x2, y2 = regiao
+    x1, x2 = int(max(0.0, x1) * largura), int(min(1.0, x2) * largura)
+    y1, y2 = int(max(0.0, y1) * altura), int(min(1.0, y2) * altura)
+    if x2 <= x1 or y2 <= y1:
+        raise ValueError(f"Região de interesse inválida: {regiao}")
+    return x1, y1, x2, y2
+
+def _mapear_para_frame(deteccao, x1, y1, largura_regiao, altura_regiao, largura, altura):
+    """
+    Converte, no próprio objeto do MediaPipe, as coordenadas relativas à região de interesse
+    em coordenadas relativas ao frame inteiro (caixa e pontos do rosto), para que o recorte,
+    a qualidade e o desenho continuem funcionando sem saber da região.
+    """
+    escala_x, escala_y = largura_regiao / largura, altura_regiao / altura
+    deslocamento_x, deslocamento_y = x1 / largura, y1 / altura
+    caixa = deteccao.location_data.relative_bounding_box
+    caixa.xmin = deslocamento_x + caixa.xmin * escala_x
+    caixa.ymin = deslocamento_y + caixa.ymin * escala_y
+    caixa.width *= escala_x
+    caixa.height *= escala_y
+    for ponto in deteccao.location_data.relative_keypoints:
+        ponto.x = deslocamento_x + ponto.x * escala_x
+        ponto.y = deslocamento_y + ponto.y * escala_y
+
+class DetectorAdaptativo:
+    """
+    Frente de detecção de uma câmera. Antes do MediaPipe, passa por três filtros baratos:
+    - recorta a região de interesse (se configurada);
+    - compara uma miniatura em tons de cinza com a do frame anterior e pula a detecção
+      em cenas paradas, sem rostos e sem movimento recente;
+    - reduz a imagem para LARGURA_DETECCAO antes de detectar.
+    As detecções devolvidas estão sempre em coordenadas relativas ao frame inteiro.
+    """
+
+    def __init__(self, face_detection, regiao=None, largura_deteccao=LARGURA_DETECCAO,
+                 limiar_movimento=LIMIAR_MOVIMENTO, janela_atividade=JANELA_ATIVIDADE,
+                 intervalo_ocioso=INTERVALO_DETECCAO_OCIOSA, camera=None):
+        self.face_detection = face_detection
+        self.regiao = regiao
+        self.largura_deteccao = largura_deteccao
+        self.limiar_movimento = limiar_movimento
+        self.janela_atividade = janela_atividade
+        self.intervalo_ocioso = intervalo_ocioso
+        self.camera = camera
+        self._miniatura_anterior = None
+        self._ultima_atividade = None
+        self._ultima_deteccao = None
+
+        # Contadores de acompanhamento
+        self.frames = 0
+        self.deteccoes = 0
+
+    def _houve_movimento(self, imagem):
+        """
+        Compara a miniatura borrada da imagem com a do frame anterior.
+        """
+        altura, largura = imagem.shape[:2]
+        escala = LARGURA_MOVIMENTO / largura
+        miniatura = cv2.resize(imagem, (LARGURA_MOVIMENTO, max(1, int(altura * escala))),
+                               interpolation=cv2.INTER_AREA)
+        miniatura = cv2.GaussianBlur(cv2.cvtColor(miniatura, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        anterior, self._miniatura_anterior = self._miniatura_anterior, miniatura
+        if anterior is None or anterior.shape != miniatura.shape:
+            return True
+        alterados = np.count_nonzero(cv2.absdiff(miniatura, anterior) > LIMIAR_PIXEL)
+        return alterados >= self.limiar_movimento * miniatura.size
+
+    def _deve_detectar(self, movimento, agora):
+        if movimento:
+            return True
+        if self._ultima_atividade is not None and agora - self._ultima_atividade < self.janela_atividade:
+            return True
+        return self._ultima_deteccao is None or agora - self._ultima_deteccao >= self.intervalo_ocioso
+
+    def detectar(self, frame, agora):
+        """
+        Retorna a lista de detecções do MediaPipe do frame (vazia quando a detecção é pulada).
+        """
+        self.frames += 1
+        altura, largura = frame.shape[:2]
+        x1, y1, x2, y2 = regiao_em_pixels(self.regiao, largura, altura)
+        imagem = frame[y1:y2, x1:x2] if self.regiao else frame
+
+        with ETAPAS.medir('movimento'):
+            movimento = self._houve_movimento(imagem)
+        if movimento:
+            self._ultima_atividade = agora
+        if not self._deve_detectar(movimento, agora):
+            DETECCOES_PULADAS.incrementar(valor_rotulo=self.camera)
+            return []
+
+        self.deteccoes += 1
+        self._ultima_deteccao = agora
+        with ETAPAS.medir('deteccao'):
+            altura_regiao, largura_regiao = imagem.shape[:2]
+            if largura_regiao > self.largura_deteccao:
+                escala = self.largura_deteccao / largura_regiao
+                imagem = cv2.resize(imagem, (self.largura_deteccao, max(1, int(altura_regiao * escala))),
+                                    interpolation=cv2.INTER_AREA)
+            # As coordenadas do MediaPipe são relativas, então a redução não muda a caixa
+            results = self.face_detection.process(cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB))
+            deteccoes = results.detections or []
+            if self.regiao:
+                for deteccao in deteccoes:
+                    _mapear_para_frame(deteccao, x1, y1, x2 - x1, y2 - y1, largura, altura)
+        if deteccoes:
+            # Com alguém na cena, detecta em todos os frames para o rastreador não perder a pessoa
+            self._ultima_atividade = agora
+        return deteccoes
+
+    def taxa_deteccao(self):
+        """
+        Fração dos frames em que o MediaPipe realmente rodou.
+        """
+        return self.deteccoes / self.frames if self.frames else None
@@ -0,0 +1,329 @@
+# Importa bibliotecas necessárias para o índice de vizinhos mais próximos
+
+# Importa a biblioteca OS para manipular o caminho do arquivo do índice
+import os
+# Importa a biblioteca de tempo para medir a latência das buscas (usada na avaliação de recall)
+import time
+# Importa a biblioteca NumPy para guardar vetores e calcular distâncias
+import numpy as np
+
+# --- CONFIGURAÇÕES ---
+# Quantidade padrão de listas consultadas por busca (quanto maior, maior o recall e a latência)
+NPROBE_PADRAO = 8
+# Mínimo de rostos para valer a pena treinar os centróides do índice
+MINIMO_PARA_TREINO = 256
+# Iterações do k-means usado no treino dos centróides
+ITERACOES_KMEANS = 20
+# Marca das linhas livres (as chaves podem ser negativas: ver os modelos extras em face_gallery.py)
+LINHA_LIVRE = np.iinfo(np.int64).min
+
+class IndiceFaces:
+    """
+    Interface comum dos índices de rostos. Todo índice guarda pares (usuario_id, embedding)
+    e devolve os k vizinhos mais próximos por distância de cosseno.
+    """
+
+    def adicionar(self, usuario_id, embedding):
+        """Adiciona (ou substitui) o embedding de um usuário."""
+        raise NotImplementedError
+
+    def remover(self, usuario_id):
+        """Remove o usuário do índice, se existir."""
+        raise NotImplementedError
+
+    def buscar(self, embedding, k=2):
+        """Retorna (ids, distancias) dos k vizinhos mais próximos, do mais próximo ao mais distante."""
+        raise NotImplementedError
+
+    def ids(self):
+        """Retorna o conjunto de IDs presentes no índice."""
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self.ids())
+
+def _k_menores(distancias, k):
+    """
+    Retorna as posições dos k menores valores, em ordem crescente.
+    """
+    k = min(k, len(distancias))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    posicoes = np.argpartition(distancias, k - 1)[:k]
+    return posicoes[np.argsort(distancias[posicoes])]
+
+class IndiceExato(IndiceFaces):
+    """
+    Índice de busca exata: compara o embedding com todos os rostos guardados.
+    Serve de referência para medir o recall do índice aproximado.
+    """
+
+    def __init__(self):
+        self._vetores = {}
+        self._cache = None
+
+    def adicionar(self, usuario_id, embedding):
+        self._vetores[int(usuario_id)] = np.asarray(embedding, dtype=np.float32)
+        self._cache = None
+
+    def remover(self, usuario_id):
+        if self._vetores.pop(int(usuario_id), None) is not None:
+            self._cache = None
+
+    def ids(self):
+        return set(self._vetores)
+
+    def _matriz(self):
+        # Monta a matriz só quando o conteúdo muda
+        if self._cache is None:
+            ids = np.fromiter(self._vetores.keys(), dtype=np.int64, count=len(self._vetores))
+            matriz = np.vstack(list(self._vetores.values())) if self._vetores else np.empty((0, 0), np.float32)
+            self._cache = (ids, matriz)
+        return self._cache
+
+    def buscar(self, embedding, k=2):
+        ids, matriz = self._matriz()
+        if len(ids) == 0:
+            return ids, np.empty(0, dtype=np.float32)
+        distancias = 1.0 - matriz @ embedding
+        melhores = _k_menores(distancias, k)
+        return ids[melhores], distancias[melhores]
+
+class IndiceIVF(IndiceFaces):
+    """
+    Índice aproximado do tipo IVF (arquivo invertido): os rostos são agrupados em listas
+    pelo centróide mais próximo e cada busca só examina as 'nprobe' listas mais próximas.
+    Inserções, remoções e trocas de foto atualizam apenas a lista afetada, sem reconstruir o índice.
+    """
+
+    def __init__(self, dimensao, nprobe=NPROBE_PADRAO):
+        self.dimensao = dimensao
+        # Quantidade de listas examinadas por busca: controla o equilíbrio entre recall e latência
+        self.nprobe = nprobe
+        self.centroides = None
+        # Vetores guardados em um bloco contíguo; linhas livres são reaproveitadas
+        self._vetores = np.empty((0, dimensao), dtype=np.float32)
+        self._ids_linhas = np.empty(0, dtype=np.int64)
+        self._lista_da_linha = np.empty(0, dtype=np.int64)
+        self._linha_do_id = {}
+        self._linhas_livres = []
+        self._total = 0
+        self._listas = []
+        self._listas_np = []
+
+    # --- Manutenção ---
+
+    def treinar(self, amostra=None, nlist=None):
+        """
+        Calcula os centróides com k-means e redistribui os rostos já guardados.
+        Só precisa ser chamado uma vez (ou quando a galeria crescer muito).
+        """
+        linhas = np.fromiter(self._linha_do_id.values(), dtype=np.int64, count=len(self._linha_do_id))
+        if amostra is None:
+            amostra = self._vetores[linhas]
+        if len(amostra) < MINIMO_PARA_TREINO:
+            return False
+        if nlist is None:
+            nlist = max(1, int(np.sqrt(len(amostra))))
+
+        self.centroides = _kmeans(amostra, nlist)
+        self._listas = [[] for _ in range(nlist)]
+        if len(linhas):
+            listas = self._lista_mais_proxima(self._vetores[linhas])
+            for linha, lista in zip(linhas, listas):
+                self._lista_da_linha[linha] = lista
+                self._listas[lista].append(int(linha))
+        self._listas_np = [None] * nlist
+        print(f"[ÍNDICE] Índice treinado com {nlist} listas sobre {len(amostra)} rostos.")
+        return True
+
+    def _lista_mais_proxima(self, vetores):
+        return np.argmax(np.atleast_2d(vetores) @ self.centroides.T, axis=1)
+
+    def _reservar_linha(self):
+        if self._linhas_livres:
+            return self._linhas_livres.pop()
+        linha = self._total
+        # Cresce os blocos em potências de dois para evitar cópias a cada inserção
+        if linha >= len(self._vetores):
+            capacidade = max(64, 2 * len(self._vetores))
+            self._vetores = _crescer(self._vetores, capacidade, 0)
+            self._ids_linhas = _crescer(self._ids_linhas, capacidade, LINHA_LIVRE)
+            self._lista_da_linha = _crescer(self._lista_da_linha, capacidade, -1)
+        self._total += 1
+        return linha
+
+    def adicionar(self, usuario_id, embedding):
+        usuario_id = int(usuario_id)
+        # Trocar a foto de um usuário é remover o vetor antigo e inserir o novo
+        self.remover(usuario_id)
+        linha = self._reservar_linha()
+        self._vetores[linha] = embedding
+        self._ids_linhas[linha] = usuario_id
+        self._linha_do_id[usuario_id] = linha
+        if self.centroides is not None:
+            lista = int(self._lista_mais_proxima(embedding)[0])
+            self._lista_da_linha[linha] = lista
+            self._listas[lista].append(linha)
+            self._listas_np[lista] = None
+
+    def remover(self, usuario_id):
+        linha = self._linha_do_id.pop(int(usuario_id), None)
+        if linha is None:
+            return
+        lista = int(self._lista_da_linha[linha])
+        if lista >= 0:
+            self._listas[lista].remove(linha)
+            self._listas_np[lista] = None
+        self._ids_linhas[linha] = LINHA_LIVRE
+        self._lista_da_linha[linha] = -1
+        self._linhas_livres.append(linha)
+
+    def ids(self):
+        return set(self._linha_do_id)
+
+    # --- Busca ---
+
+    def _linhas_da_lista(self, lista):
+        if self._listas_np[lista] is None:
+            self._listas_np[lista] = np.asarray(self._listas[lista], dtype=np.int64)
+        return self._listas_np[lista]
+
+    def buscar(self, embedding, k=2):
+        if self.centroides is None:
+            # Sem treino ainda: examina todos os rostos guardados
+            linhas = np.fromiter(self._linha_do_id.values(), dtype=np.int64, count=len(self._linha_do_id))
+        else:
+            proximidade = self.centroides @ embedding
+            nprobe = min(self.nprobe, len(self.centroides))
+            listas = np.argpartition(-proximidade, nprobe - 1)[:nprobe]
+            linhas = np.concatenate([self._linhas_da_lista(lista) for lista in listas])
+        if len(linhas) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        distancias = 1.0 - self._vetores[linhas] @ embedding
+        melhores = _k_menores(distancias, k)
+        return self._ids_linhas[linhas[melhores]], distancias[melhores]
+
+    # --- Persistência ---
+
+    def salvar(self, caminho):
+        """
+        Grava o índice em disco (arquivo .npz). Escreve em um arquivo temporário
+        e renomeia, para nunca deixar um índice pela metade.
+        """
+        total = self._total
+        temporario = caminho + '.tmp.npz'
+        np.savez(
+            temporario,
+            dimensao=self.dimensao,
+            nprobe=self.nprobe,
+            centroides=self.centroides if self.centroides is not None else np.empty((0, self.dimensao), np.float32),
+            vetores=self._vetores[:total],
+            ids=self._ids_linhas[:total],
+            listas=self._lista_da_linha[:total]
+        )
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """
+        Lê um índice salvo com salvar(). Retorna None se o arquivo não existir.
+        """
+        if not os.path.exists(caminho):
+            return None
+        dados = np.load(caminho)
+        indice = cls(int(dados['dimensao']), int(dados['nprobe']))
+        if len(dados['centroides']):
+            indice.centroides = dados['centroides']
+            indice._listas = [[] for _ in range(len(indice.centroides))]
+            indice._listas_np = [None] * len(indice.centroides)
+        indice._vetores = dados['vetores'].copy()
+        indice._ids_linhas = dados['ids'].copy()
+        indice._lista_da_linha = dados['listas'].copy()
+        indice._total = len(indice._ids_linhas)
+        for linha, (usuario_id, lista) in enumerate(zip(indice._ids_linhas, indice._lista_da_linha)):
+            if usuario_id == LINHA_LIVRE:
+                indice._linhas_livres.append(linha)
+                continue
+            indice._linha_do_id[int(usuario_id)] = linha
+            if lista >= 0:
+                indice._listas[lista].append(linha)
+        return indice
+
+def _crescer(vetor, capacidade, preenchimento):
+    """
+    Retorna uma cópia do vetor com mais linhas, preenchendo as novas com o valor indicado.
+    """
+    novo = np.full((capacidade,) + vetor.shape[1:], preenchimento, dtype=vetor.dtype)
+    novo[:len(vetor)] = vetor
+    return novo
+
+def _kmeans(vetores, k):
+    """
+    K-means esférico simples (centróides normalizados), suficiente para particionar embeddings.
+    """
+    gerador = np.random.default_rng(0)
+    centroides = vetores[gerador.choice(len(vetores), size=k, replace=False)].copy()
+    for _ in range(ITERACOES_KMEANS):
+        rotulos = np.argmax(vetores @ centroides.T, axis=1)
+        for i in range(k):
+            membros = vetores[rotulos == i]
+            # Lista vazia: recomeça a partir de um rosto aleatório
+            soma = membros.sum(axis=0) if len(membros) else vetores[gerador.integers(len(vetores))]
+            norma = np.linalg.norm(soma)
+            if norma > 0:
+                centroides[i] = soma / norma
+    return centroides.astype(np.float32)
+
+def sincronizar_indice(indice, ids, matriz):
+    """
+    Deixa o índice igual à galeria (ids e matriz de embeddings) aplicando só as diferenças:
+    remove usuários que saíram, adiciona os novos e substitui os que trocaram de foto.
+    Retorna True se algo mudou.
+    """
+    posicao = {int(usuario_id): i for i, usuario_id in enumerate(ids)}
+    mudou = False
+    for usuario_id in indice.ids() - set(posicao):
+        indice.remover(usuario_id)
+        mudou = True
+    for usuario_id, i in posicao.items():
+        linha = indice._linha_do_id.get(usuario_id)
+        if linha is None or not np.array_equal(indice._vetores[linha], matriz[i]):
+            indice.adicionar(usuario_id, matriz[i])
+            mudou = True
+    if indice.centroides is None and len(indice) >= MINIMO_PARA_TREINO:
+        mudou = indice.treinar() or mudou
+    return mudou
+
+def avaliar_recall(indice, referencia, consultas=None, tamanho_amostra=200, k=1, ruido=0.05):
+    """
+    Compara o índice aproximado com a busca exata e retorna um dicionário com o recall@k
+    e a latência média (em ms) de cada um. Sem consultas explícitas, usa rostos da própria
+    galeria com um pouco de ruído, simulando novas fotos das mesmas pessoas.
+    """
+    if consultas is None:
+        _, matriz = referencia._matriz()
+        gerador = np.random.default_rng(0)
+        escolhidos = gerador.choice(len(matriz), size=min(tamanho_amostra, len(matriz)), replace=False)
+        consultas = matriz[escolhidos] + gerador.normal(0, ruido, (len(escolhidos), matriz.shape[1])).astype(np.float32)
+        consultas /= np.linalg.norm(consultas, axis=1, keepdims=True)
+
+    acertos, tempo_indice, tempo_exato = 0, 0.0, 0.0
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        ids_exatos, _ = referencia.buscar(consulta, k)
+        tempo_exato += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        ids_aprox, _ = indice.buscar(consulta, k)
+        tempo_indice += time.perf_counter() - inicio
+
+        acertos += len(set(ids_exatos.tolist()) & set(ids_aprox.tolist()))
+
+    total = max(1, len(consultas))
+    return {
+        'recall': acertos / max(1, total * k),
+        'latencia_indice_ms': 1000 * tempo_indice / total,
+        'latencia_exata_ms': 1000 * tempo_exato / total,
+        'nprobe': getattr(indice, 'nprobe', None),
+    }
@@ -0,0 +1,360 @@
+# Importa as bibliotecas necessárias para reprocessar vídeos gravados e capturas antigas fora do portão
+
+# Importa a biblioteca OS para percorrer as pastas de capturas
+import os
+# Importa a biblioteca csv e a json para gravar os resultados enquanto são produzidos
+import csv
+import json
+# Importa a biblioteca sqlite3 para ler os logs de acesso e, opcionalmente, gravar os resultados
+import sqlite3
+# Importa a biblioteca de tempo para medir a vazão
+import time
+# Importa a biblioteca argparse para ler as opções da linha de comando
+import argparse
+# Importa as classes de data para o fim (inclusivo) do intervalo de logs
+from datetime import date, timedelta
+# Importa o pool de processos onde cada núcleo detecta e reconhece um pedaço do trabalho
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+# Importa a biblioteca OpenCV para ler os vídeos e as capturas
+import cv2
+
+# Importa funções internas do sistema
+
+# Importa a função que cria o banco de dados e tabelas
+from database_setup import criar_banco_de_dados
+# Importa as mesmas etapas de detecção, recorte e qualidade usadas no portão
+from detection_utils import caixa_em_pixels, recortar_rosto
+from adaptive_detection import DetectorAdaptativo, INTERVALO_DETECCAO_OCIOSA
+from face_quality import pontuar_qualidade, QUALIDADE_MINIMA
+# Importa o limiar de distância usado na decisão do portão
+from face_gallery import LIMIAR_DISTANCIA
+# Importa a consulta que percorre o banco principal e os meses arquivados
+from log_archive import consultar_em_partes
+
+# --- CONFIGURAÇÕES ---
+# Define diretório base onde está o arquivo atual
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames de vídeo entregues a um processo de uma só vez
+QUADROS_POR_TAREFA = 300
+# Capturas entregues a um processo de uma só vez
+IMAGENS_POR_TAREFA = 64
+# Rostos enviados ao modelo em uma única chamada
+LOTE_EMBEDDINGS = 32
+# Intervalo (em segundos) entre as linhas de progresso
+INTERVALO_PROGRESSO = 5.0
+# Extensões de imagem aceitas na pasta de capturas
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+# Colunas de cada resultado, na ordem em que são gravadas
+COLUNAS = ['fonte', 'quadro', 'tempo_s', 'rosto', 'x1', 'y1', 'x2', 'y2', 'qualidade',
+           'usuario_id', 'nome', 'distancia', 'margem', 'status',
+           'log_id', 'status_original', 'usuario_original', 'mudou']
+
+# --- SAÍDA DOS RESULTADOS ---
+
+class EscritorResultados:
+    """
+    Grava os resultados à medida que chegam, em CSV, JSONL ou em um banco SQLite separado
+    (escolhido pela extensão do arquivo), sem acumulá-los na memória.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.formato = os.path.splitext(caminho)[1].lower().lstrip('.')
+        self.gravados = 0
+        if self.formato == 'csv':
+            self._arquivo = open(caminho, 'w', encoding='utf-8', newline='')
+            self._csv = csv.DictWriter(self._arquivo, fieldnames=COLUNAS)
+            self._csv.writeheader()
+        elif self.formato == 'jsonl':
+            self._arquivo = open(caminho, 'w', encoding='utf-8')
+        elif self.formato in ('db', 'sqlite', 'sqlite3'):
+            self._conn = sqlite3.connect(caminho)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS Resultados ({', '.join(COLUNAS)})")
+            self._inserir = f"INSERT INTO Resultados VALUES ({', '.join('?' * len(COLUNAS))})"
+        else:
+            raise ValueError(f"Formato de saída inválido: '{caminho}'. Use .csv, .jsonl ou .db.")
+
+    def escrever(self, linhas):
+        if self.formato == 'csv':
+            self._csv.writerows(linhas)
+        elif self.formato == 'jsonl':
+            self._arquivo.writelines(json.dumps(linha, ensure_ascii=False) + '\n' for linha in linhas)
+        else:
+            with self._conn:
+                self._conn.executemany(self._inserir, [[linha[coluna] for coluna in COLUNAS] for linha in linhas])
+        self.gravados += len(linhas)
+
+    def fechar(self):
+        if self.formato == 'csv' or self.formato == 'jsonl':
+            self._arquivo.close()
+        else:
+            self._conn.close()
+
+# --- FUNÇÕES EXECUTADAS NOS PROCESSOS ---
+
+# Detector do MediaPipe do processo (criado uma vez por processo, só para vídeos)
+_detector = None
+# Galeria e limiar usados pelo processo
+_galeria = None
+_limiar = LIMIAR_DISTANCIA
+
+def _inicializar_processo(com_deteccao, limiar):
+    """
+    Executada uma vez em cada processo do pool: cria o detector (se houver vídeos),
+    carrega o modelo e abre a galeria (mapeada do disco, compartilhada entre os processos).
+    """
+    global _detector, _galeria, _limiar
+    # Importa aqui para que o processo principal não precise carregar o MediaPipe nem o modelo
+    from face_gallery import aquecer_modelo
+    from core_functions import obter_galeria
+    if com_deteccao:
+        import mediapipe as mp
+        _detector = mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.6)
+    aquecer_modelo()
+    _galeria = obter_galeria()
+    _limiar = limiar
+
+def _linha(fonte, **campos):
+    linha = dict.fromkeys(COLUNAS)
+    linha['fonte'] = fonte
+    linha.update(campos)
+    return linha
+
+def _reconhecer(linhas, recortes):
+    """
+    Gera os embeddings dos recortes em lotes e preenche, em cada linha correspondente,
+    o usuário mais próximo, a distância, a margem e o status pelo limiar.
+    """
+    from face_gallery import gerar_embeddings_lote
+    for inicio in range(0, len(recortes), LOTE_EMBEDDINGS):
+        embeddings = gerar_embeddings_lote(recortes[inicio:inicio + LOTE_EMBEDDINGS])
+        for linha, embedding in zip(linhas[inicio:inicio + LOTE_EMBEDDINGS], embeddings):
+            resultado = _galeria.buscar(embedding)
+            if resultado is None:
+                linha['status'] = 'Não Encontrado'
+                continue
+            linha['distancia'] = round(resultado.distancia, 4)
+            linha['margem'] = round(resultado.margem, 4) if resultado.margem != float('inf') else None
+            if resultado.distancia <= _limiar:
+                linha['usuario_id'] = resultado.usuario_id
+                linha['nome'] = _galeria.usuarios[resultado.usuario_id][0]
+                linha['status'] = 'Reconhecido'
+            else:
+                linha['status'] = 'Não Encontrado'
+            if linha['status_original'] is not None:
+                linha['mudou'] = linha['usuario_id'] != linha['usuario_original']
+
+def _processar_video(caminho, inicio, fim, passo, todos_os_quadros):
+    """
+    Detecta e reconhece os rostos dos frames [inicio, fim) de um vídeo, um a cada `passo`.
+    O tempo do próprio vídeo alimenta o filtro de movimento, então cenas paradas são puladas
+    como no portão (a menos que todos_os_quadros esteja ligado).
+    Retorna (linhas, frames lidos, rostos reconhecidos).
+    """
+    captura = cv2.VideoCapture(caminho)
+    fps = captura.get(cv2.CAP_PROP_FPS) or 30.0
+    if inicio:
+        captura.set(cv2.CAP_PROP_POS_FRAMES, inicio)
+    detector = DetectorAdaptativo(_detector, intervalo_ocioso=0.0 if todos_os_quadros else INTERVALO_DETECCAO_OCIOSA,
+                                  camera=caminho)
+    linhas, recortes, quadros = [], [], 0
+    try:
+        for numero in range(inicio, fim):
+            # Frames fora do passo são apenas avançados, sem decodificar a imagem
+            if (numero - inicio) % passo:
+                if not captura.grab():
+                    break
+                continue
+            ret, frame = captura.read()
+            if not ret:
+                break
+            quadros += 1
+            tempo = numero / fps
+            altura, largura = frame.shape[:2]
+            for indice, deteccao in enumerate(detector.detectar(frame, tempo)):
+                recorte = recortar_rosto(frame, deteccao)
+                if recorte is None:
+                    continue
+                nota, _ = pontuar_qualidade(recorte, deteccao)
+                if nota < QUALIDADE_MINIMA:
+                    continue
+                x1, y1, x2, y2 = caixa_em_pixels(deteccao, largura, altura)
+                linhas.append(_linha(caminho, quadro=numero, tempo_s=round(tempo, 3), rosto=indice,
+                                     x1=x1, y1=y1, x2=x2, y2=y2, qualidade=round(nota, 3)))
+                recortes.append(recorte)
+    finally:
+        captura.release()
+    _reconhecer(linhas, recortes)
+    return linhas, quadros, len(linhas)
+
+def _processar_imagens(itens):
+    """
+    Reconhece um grupo de capturas (rostos já recortados). Cada item é (caminho, log),
+    onde log é None ou (id, status original, usuario_id original) do registro em LogsAcesso.
+    Retorna (linhas, 0 frames, rostos reconhecidos).
+    """
+    linhas, recortes = [], []
+    for caminho, log in itens:
+        imagem = cv2.imread(caminho)
+        if imagem is None:
+            continue
+        linha = _linha(caminho)
+        if log is not None:
+            linha['log_id'], linha['status_original'], linha['usuario_original'] = log
+        linhas.append(linha)
+        recortes.append(imagem)
+    _reconhecer(linhas, recortes)
+    return linhas, 0, len(linhas)
+
+# --- MONTAGEM DAS TAREFAS ---
+
+def tarefas_video(caminho, passo=1, todos_os_quadros=False):
+    """
+    Divide um vídeo em pedaços de QUADROS_POR_TAREFA frames, processados em paralelo.
+    Vídeos sem contagem de frames (alguns formatos de stream gravado) viram uma única tarefa.
+    """
+    captura = cv2.VideoCapture(caminho)
+    total = int(captura.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    captura.release()
+    if total <= 0:
+        return [(_processar_video, (caminho, 0, 2 ** 62, passo, todos_os_quadros))]
+    tamanho = max(passo, QUADROS_POR_TAREFA - QUADROS_POR_TAREFA % passo)
+    return [(_processar_video, (caminho, inicio, min(inicio + tamanho, total), passo, todos_os_quadros))
+            for inicio in range(0, total, tamanho)]
+
+def ler_logs(db_path, desde=None, ate=None):
+    """
+    Lista (caminho da captura, (id, status, usuario_id)) dos logs de acesso com captura,
+    opcionalmente entre duas datas ('AAAA-MM-DD'; `ate` inclusiva), incluindo os meses arquivados.
+    """
+    consulta = '''
+        SELECT id, status, usuario_id, caminho_foto_capturada FROM LogsAcesso
+        WHERE caminho_foto_capturada IS NOT NULL
+    '''
+    parametros = []
+    if desde:
+        consulta += " AND timestamp_acesso >= ?"
+        parametros.append(desde)
+    if ate:
+        consulta += " AND timestamp_acesso < date(?, '+1 day')"
+        parametros.append(ate)
+    fim = (date.fromisoformat(ate) + timedelta(days=1)).isoformat() if ate else None
+    # Os meses arquivados são lidos em grupos, então anos de arquivo não esbarram no limite de ATTACH
+    linhas = consultar_em_partes(consulta + " ORDER BY id", parametros, db_path, desde, fim)
+    return [(caminho, (log_id, status, usuario_id)) for log_id, status, usuario_id, caminho in linhas]
+
+def ler_pasta_capturas(pasta, db_path=None):
+    """
+    Lista as imagens de uma pasta de capturas (incluindo as subpastas por data). Se o banco for
+    informado, cada captura referenciada em LogsAcesso leva junto o resultado original.
+    """
+    logs = dict(ler_logs(db_path)) if db_path and os.path.exists(db_path) else {}
+    itens = []
+    # Os logs guardam caminhos absolutos
+    for raiz, pastas, arquivos in os.walk(os.path.abspath(pasta)):
+        pastas.sort()
+        for nome in sorted(arquivos):
+            if nome.lower().endswith(EXTENSOES_IMAGEM):
+                caminho = os.path.join(raiz, nome)
+                itens.append((caminho, logs.get(caminho)))
+    return itens
+
+def tarefas_imagens(itens):
+    return [(_processar_imagens, (itens[i:i + IMAGENS_POR_TAREFA],))
+            for i in range(0, len(itens), IMAGENS_POR_TAREFA)]
+
+# --- PROCESSO PRINCIPAL ---
+
+def reprocessar(tarefas, saida, processos=None, limiar=LIMIAR_DISTANCIA, com_deteccao=True):
+    """
+    Executa as tarefas em um processo por núcleo, gravando os resultados em `saida` à medida
+    que cada tarefa termina. Retorna um dicionário com a vazão (frames e rostos por segundo).
+    """
+    # A galeria é preparada aqui uma vez (embeddings pendentes e armazém); os processos só a abrem
+    from core_functions import obter_galeria, db_path
+    criar_banco_de_dados(db_path)
+    obter_galeria()
+
+    processos = processos or os.cpu_count() or 1
+    escritor = EscritorResultados(saida)
+    quadros = rostos = reconhecidos = mudaram = 0
+    inicio = time.perf_counter()
+    proximo_progresso = inicio + INTERVALO_PROGRESSO
+    try:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo,
+                                 initargs=(com_deteccao, limiar)) as pool:
+            # Mantém só algumas tarefas em voo para não carregar todos os resultados na memória
+            em_voo, proxima = set(), 0
+            while em_voo or proxima < len(tarefas):
+                while proxima < len(tarefas) and len(em_voo) < processos * 2:
+                    funcao, argumentos = tarefas[proxima]
+                    em_voo.add(pool.submit(funcao, *argumentos))
+                    proxima += 1
+                prontas, em_voo = wait(em_voo, return_when=FIRST_COMPLETED)
+                for futuro in prontas:
+                    linhas, lidos, encontrados = futuro.result()
+                    escritor.escrever(linhas)
+                    quadros += lidos
+                    rostos += encontrados
+                    reconhecidos += sum(1 for linha in linhas if linha['status'] == 'Reconhecido')
+                    mudaram += sum(1 for linha in linhas if linha['mudou'])
+                agora = time.perf_counter()
+                if agora >= proximo_progresso:
+                    proximo_progresso = agora + INTERVALO_PROGRESSO
+                    decorrido = agora - inicio
+                    print(f"[REPROCESSAMENTO] {proxima - len(em_voo)}/{len(tarefas)} tarefa(s): "
+                          f"{quadros / decorrido:.1f} frames/s, {rostos / decorrido:.1f} rostos/s")
+    finally:
+        escritor.fechar()
+
+    decorrido = time.perf_counter() - inicio
+    resumo = {
+        'tarefas': len(tarefas),
+        'processos': processos,
+        'segundos': round(decorrido, 2),
+        'frames': quadros,
+        'rostos': rostos,
+        'reconhecidos': reconhecidos,
+        'mudaram': mudaram,
+        'frames_por_segundo': quadros / decorrido if decorrido else 0.0,
+        'rostos_por_segundo': rostos / decorrido if decorrido else 0.0,
+    }
+    print(f"[REPROCESSAMENTO] Concluído em {decorrido:.1f}s com {processos} processo(s): "
+          f"{quadros} frame(s) ({resumo['frames_por_segundo']:.1f}/s), "
+          f"{rostos} rosto(s) ({resumo['rostos_por_segundo']:.1f}/s), {reconhecidos} reconhecido(s).")
+    if mudaram:
+        print(f"[REPROCESSAMENTO] {mudaram} log(s) teriam outro resultado com a galeria atual.")
+    print(f"[REPROCESSAMENTO] {escritor.gravados} resultado(s) gravado(s) em '{saida}'.")
+    return resumo
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Reprocessa vídeos gravados e capturas antigas com a galeria atual, o mais rápido possível.'
+    )
+    parser.add_argument('--video', nargs='+', default=[], help='Vídeos gravados (detecção e reconhecimento)')
+    parser.add_argument('--capturas', help='Pasta de capturas (ex.: capturas_log), com os rostos já recortados')
+    parser.add_argument('--logs', action='store_true',
+                        help='Reavalia as capturas dos logs de acesso e compara com o resultado original')
+    parser.add_argument('--desde', help="Com --logs, só acessos a partir desta data (AAAA-MM-DD)")
+    parser.add_argument('--ate', help="Com --logs, só acessos até esta data (AAAA-MM-DD)")
+    parser.add_argument('--saida', default='reprocessamento.csv', help='Arquivo de resultados (.csv, .jsonl ou .db)')
+    parser.add_argument('--processos', type=int, default=None, help='Processos em paralelo (padrão: um por núcleo)')
+    parser.add_argument('--passo', type=int, default=1, help='Processa um frame a cada tantos frames do vídeo')
+    parser.add_argument('--todos-os-quadros', action='store_true',
+                        help='Detecta em todos os frames, sem pular as cenas paradas')
+    parser.add_argument('--limiar', type=float, default=LIMIAR_DISTANCIA,
+                        help='Distância máxima para considerar o rosto reconhecido (para testar novos limiares)')
+    args = parser.parse_args()
+
+    from core_functions import db_path as banco
+    tarefas = []
+    for caminho in args.video:
+        tarefas += tarefas_video(caminho, max(1, args.passo), args.todos_os_quadros)
+    if args.capturas:
+        tarefas += tarefas_imagens(ler_pasta_capturas(args.capturas, banco))
+    if args.logs:
+        tarefas += tarefas_imagens([item for item in ler_logs(banco, args.desde, args.ate) if os.path.exists(item[0])])
+    if not tarefas:
+        parser.error('Informe --video, --capturas ou --logs.')
+    reprocessar(tarefas, args.saida, args.processos, args.limiar, com_deteccao=bool(args.video))
@@ -0,0 +1,377 @@
+# Importa as bibliotecas necessárias para medir o desempenho do sistema de ponta a ponta
+
+# Importa a biblioteca OpenCV para gerar as imagens sintéticas e ler os vídeos de teste
+import cv2
+# Importa a biblioteca MediaPipe para medir a detecção facial como no main.py
+import mediapipe as mp
+# Importa a biblioteca NumPy para gerar rostos sintéticos e o modelo stub
+import numpy as np
+# Importa a biblioteca de tempo para medir as latências
+import time
+# Importa a biblioteca OS para montar os caminhos da pasta de trabalho
+import os
+# Importa a biblioteca json para gravar (e comparar) os resultados
+import json
+# Importa a biblioteca argparse para ler as opções da linha de comando
+import argparse
+# Importa a biblioteca sqlite3 para inserir a galeria sintética em Usuarios
+import sqlite3
+# Importa a biblioteca tempfile para criar a pasta de trabalho quando nenhuma é informada
+import tempfile
+# Importa a biblioteca platform para registrar a máquina em que o benchmark rodou
+import platform
+# Importa a função que silencia as mensagens de log durante as medições
+from contextlib import redirect_stdout
+# Importa a classe datetime para registrar quando o benchmark rodou
+from datetime import datetime
+
+# Importa funções internas do sistema
+
+# Importa a galeria (para trocar o modelo pelo stub) e as funções de verificação medidas
+import face_gallery
+import core_functions
+from embedding_backends import criar_backend
+# Importa a função que cria o banco de dados do benchmark
+from database_setup import criar_banco_de_dados
+# Importa as mesmas etapas de detecção usadas pelo main.py
+from detection_utils import caixa_em_pixels, recortar_rosto
+from adaptive_detection import DetectorAdaptativo
+from face_tracker import RastreadorFaces
+from face_quality import pontuar_qualidade, SeletorMelhorRecorte
+# Importa o cálculo de percentis usado nos relatórios do servidor de câmeras
+from gate_server import percentil
+
+# --- CONFIGURAÇÕES ---
+# Tamanhos de galeria medidos por padrão
+TAMANHOS_PADRAO = [100, 1000, 10000]
+# Verificações medidas para cada tamanho de galeria
+VERIFICACOES_POR_TAMANHO = 200
+# Tamanho dos lotes na medição de verificar_pessoas_lote
+TAMANHO_LOTE = 8
+# Frames sintéticos usados quando nenhum vídeo é informado
+FRAMES_SINTETICOS = 300
+# Eventos enviados na medição de registrar_log_acesso
+EVENTOS_LOG = 5000
+# Lado (em pixels) das fotos sintéticas de cadastro
+LADO_FOTO = 112
+# Versão gravada nos embeddings do stub (nunca se mistura com os do Facenet512)
+VERSAO_STUB = 'stub-512'
+
+def embeddings_stub(imagens):
+    """
+    Modelo stub: reduz o rosto a 16x32 tons de cinza e usa os pixels como vetor de 512 dimensões.
+    Roda em qualquer CPU, sem baixar pesos, e reconhece bem as fotos sintéticas (mesmo com ruído).
+    """
+    vetores = []
+    for imagem in imagens:
+        if isinstance(imagem, str):
+            imagem = cv2.imread(imagem)
+        cinza = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+        vetor = cv2.resize(cinza, (16, 32), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        vetores.append(vetor - vetor.mean())
+    return np.vstack(vetores)
+
+def rosto_sintetico(semente):
+    """
+    Gera a "foto" de uma identidade sintética: blocos aleatórios determinados pela semente.
+    """
+    blocos = np.random.default_rng(semente).integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    return cv2.resize(blocos, (LADO_FOTO, LADO_FOTO), interpolation=cv2.INTER_NEAREST)
+
+def com_ruido(imagem, aleatorio, desvio=12.0):
+    """
+    Simula uma nova captura da mesma pessoa somando ruído à foto de cadastro.
+    """
+    ruido = aleatorio.normal(0, desvio, imagem.shape)
+    return np.clip(imagem.astype(np.float32) + ruido, 0, 255).astype(np.uint8)
+
+def resumo_latencias(latencias):
+    """
+    Resume uma lista de latências (em segundos) em milissegundos.
+    """
+    return {
+        'amostras': len(latencias),
+        'media_ms': 1000 * sum(latencias) / len(latencias) if latencias else None,
+        'p50_ms': 1000 * percentil(latencias, 50) if latencias else None,
+        'p95_ms': 1000 * percentil(latencias, 95) if latencias else None,
+        'p99_ms': 1000 * percentil(latencias, 99) if latencias else None,
+    }
+
+def preparar_ambiente(pasta):
+    """
+    Aponta o core_functions para um banco, pasta de capturas e índice dentro da pasta de trabalho.
+    """
+    core_functions.db_path = os.path.join(pasta, 'benchmark.db')
+    core_functions.capturas_dir = os.path.join(pasta, 'capturas_log')
+    core_functions.indice_path = os.path.join(pasta, 'indice_faces.npz')
+    core_functions.embeddings_dir = os.path.join(pasta, 'embeddings')
+    os.makedirs(core_functions.capturas_dir, exist_ok=True)
+    os.makedirs(os.path.join(pasta, 'rostos'), exist_ok=True)
+    with redirect_stdout(open(os.devnull, 'w')):
+        criar_banco_de_dados(core_functions.db_path)
+
+def ampliar_galeria(pasta, de, ate):
+    """
+    Cadastra as identidades sintéticas de `de` até `ate` (fotos em disco e linhas em Usuarios)
+    e gera os embeddings. Retorna o tempo gasto no cadastro.
+    """
+    inicio = time.perf_counter()
+    linhas = []
+    for i in range(de, ate):
+        caminho = os.path.join(pasta, 'rostos', f'usuario_{i}.png')
+        cv2.imwrite(caminho, rosto_sintetico(i))
+        linhas.append((f'Usuário Sintético {i}', f'B{i:08d}', 'Discente', caminho))
+    conn = sqlite3.connect(core_functions.db_path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO Usuarios (nome_completo, matricula, tipo, caminho_foto_rosto) VALUES (?, ?, ?, ?)",
+                linhas
+            )
+        with redirect_stdout(open(os.devnull, 'w')):
+            face_gallery.atualizar_embeddings(conn)
+    finally:
+        conn.close()
+    return time.perf_counter() - inicio
+
+def medir_reconhecimento(tamanho, verificacoes, aleatorio):
+    """
+    Mede verificar_pessoa (um rosto) e verificar_pessoas_lote (lotes) com a galeria atual.
+    Metade das consultas é de pessoas cadastradas, metade de desconhecidos.
+    """
+    core_functions.recarregar_galeria()
+    with redirect_stdout(open(os.devnull, 'w')):
+        inicio = time.perf_counter()
+        galeria = core_functions.obter_galeria()
+        carga = time.perf_counter() - inicio
+
+        consultas = []
+        for i in range(verificacoes):
+            if i % 2 == 0:
+                consultas.append((com_ruido(rosto_sintetico(int(aleatorio.integers(0, tamanho))), aleatorio), True))
+            else:
+                consultas.append((rosto_sintetico(10 ** 9 + i), False))
+
+        latencias, acertos = [], 0
+        for imagem, cadastrado in consultas:
+            inicio = time.perf_counter()
+            resultado = core_functions.verificar_pessoa(imagem, 'benchmark')
+            latencias.append(time.perf_counter() - inicio)
+            if resultado is not None and (resultado.usuario_id is not None) == cadastrado:
+                acertos += 1
+
+        latencias_lote = []
+        for i in range(0, len(consultas), TAMANHO_LOTE):
+            lote = [imagem for imagem, _ in consultas[i:i + TAMANHO_LOTE]]
+            inicio = time.perf_counter()
+            core_functions.verificar_pessoas_lote(lote, 'benchmark')
+            latencias_lote.append((time.perf_counter() - inicio) / len(lote))
+
+    return {
+        'galeria': tamanho,
+        'indice_aproximado': galeria.indice is not None,
+        'carga_galeria_s': carga,
+        'acuracia': acertos / len(consultas),
+        'individual': resumo_latencias(latencias),
+        'lote_por_rosto': dict(resumo_latencias(latencias_lote), tamanho_lote=TAMANHO_LOTE),
+    }
+
+def frames_sinteticos(quantidade, largura=640, altura=480):
+    """
+    Gera frames com um rosto desenhado que atravessa a cena (para quando não há vídeo gravado).
+    """
+    for i in range(quantidade):
+        frame = np.full((altura, largura, 3), 90, dtype=np.uint8)
+        cx = int(100 + (largura - 200) * i / max(1, quantidade - 1))
+        cy = altura // 2
+        cv2.ellipse(frame, (cx, cy), (70, 95), 0, 0, 360, (160, 190, 225), -1)
+        cv2.circle(frame, (cx - 25, cy - 25), 9, (40, 40, 40), -1)
+        cv2.circle(frame, (cx + 25, cy - 25), 9, (40, 40, 40), -1)
+        cv2.ellipse(frame, (cx, cy + 40), (28, 10), 0, 0, 180, (60, 60, 160), 3)
+        yield frame
+
+def frames_parados(quantidade, largura=640, altura=480, semente=0):
+    """
+    Gera frames de um corredor vazio (fundo fixo com ruído de sensor), para medir o custo ocioso.
+    """
+    aleatorio = np.random.default_rng(semente)
+    fundo = np.full((altura, largura, 3), 90, dtype=np.uint8)
+    cv2.rectangle(fundo, (200, 80), (440, 480), (60, 70, 80), -1)
+    for _ in range(quantidade):
+        yield com_ruido(fundo, aleatorio, desvio=3.0)
+
+def frames_video(caminho, limite=None):
+    """
+    Lê os frames de um vídeo gravado.
+    """
+    captura = cv2.VideoCapture(caminho)
+    lidos = 0
+    try:
+        while limite is None or lidos < limite:
+            ret, frame = captura.read()
+            if not ret:
+                break
+            lidos += 1
+            yield frame
+    finally:
+        captura.release()
+
+def medir_deteccao(frames):
+    """
+    Passa os frames pelo mesmo caminho do main.py (MediaPipe, rastreador, recorte, qualidade
+    e seletor), sem o reconhecimento e sem janela, medindo o tempo de cada frame.
+    """
+    rastreador = RastreadorFaces()
+    seletor = SeletorMelhorRecorte()
+    latencias, rostos, recortes_liberados = [], 0, 0
+    inicio_total = time.perf_counter()
+    with mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.6) as face_detection:
+        detector = DetectorAdaptativo(face_detection, camera='benchmark')
+        for frame in frames:
+            inicio = time.perf_counter()
+            agora = time.time()
+            deteccoes = detector.detectar(frame, agora)
+            ih, iw = frame.shape[:2]
+            rastros = rastreador.atualizar([caixa_em_pixels(d, iw, ih) for d in deteccoes], agora)
+            for rastro, deteccao in zip(rastros, deteccoes):
+                if not rastreador.precisa_verificar(rastro, agora):
+                    continue
+                recorte = recortar_rosto(frame, deteccao)
+                if recorte is None:
+                    continue
+                nota, _ = pontuar_qualidade(recorte, deteccao)
+                if seletor.oferecer(rastro.id, recorte, nota, agora) is not None:
+                    recortes_liberados += 1
+                    rastreador.marcar_pendente(rastro, agora)
+            seletor.limpar(rastreador.rastros)
+            latencias.append(time.perf_counter() - inicio)
+            rostos += len(deteccoes)
+    duracao = time.perf_counter() - inicio_total
+    return dict(
+        resumo_latencias(latencias),
+        frames=len(latencias),
+        fps=len(latencias) / duracao if duracao > 0 else None,
+        rostos_detectados=rostos,
+        recortes_enviados=recortes_liberados,
+        taxa_deteccao=detector.taxa_deteccao(),
+    )
+
+def medir_logs(eventos):
+    """
+    Mede a vazão de registrar_log_acesso: quanto custa enfileirar e quanto tempo o escritor
+    leva para gravar tudo no banco.
+    """
+    escritor = core_functions.obter_escritor_logs()
+    gravados_antes = escritor.eventos_gravados
+    with redirect_stdout(open(os.devnull, 'w')):
+        inicio = time.perf_counter()
+        for _ in range(eventos):
+            core_functions.registrar_log_acesso('Não Encontrado', portao='benchmark')
+        enfileirado = time.perf_counter() - inicio
+        while escritor.eventos_gravados - gravados_antes < eventos and escritor.falhas == 0:
+            time.sleep(0.005)
+        gravado = time.perf_counter() - inicio
+    return {
+        'eventos': eventos,
+        'enfileirar_por_segundo': eventos / enfileirado if enfileirado > 0 else None,
+        'gravados_por_segundo': eventos / gravado if gravado > 0 else None,
+        'latencia_media_gravacao_ms': 1000 * escritor.latencia_media(),
+        'falhas': escritor.falhas,
+    }
+
+def comparar(atual, anterior):
+    """
+    Mostra a variação das principais métricas em relação a uma execução anterior.
+    """
+    def variacao(novo, velho):
+        if novo is None or not velho:
+            return 'n/d'
+        return f"{100 * (novo - velho) / velho:+.1f}%"
+
+    print("\n--- Comparação com a execução anterior ---")
+    if 'deteccao' in atual and 'deteccao' in anterior:
+        print(f"Detecção FPS: {atual['deteccao']['fps']:.1f} ({variacao(atual['deteccao']['fps'], anterior['deteccao']['fps'])})")
+    if 'deteccao_ociosa' in atual and 'deteccao_ociosa' in anterior:
+        print(f"Corredor vazio FPS: {atual['deteccao_ociosa']['fps']:.1f} "
+              f"({variacao(atual['deteccao_ociosa']['fps'], anterior['deteccao_ociosa']['fps'])})")
+    anteriores = {r['galeria']: r for r in anterior.get('reconhecimento', [])}
+    for r in atual.get('reconhecimento', []):
+        velho = anteriores.get(r['galeria'])
+        if velho:
+            print(f"Galeria {r['galeria']}: p95 {r['individual']['p95_ms']:.1f} ms "
+                  f"({variacao(r['individual']['p95_ms'], velho['individual']['p95_ms'])})")
+    if 'logs' in atual and 'logs' in anterior:
+        print(f"Logs gravados/s: {atual['logs']['gravados_por_segundo']:.0f} "
+              f"({variacao(atual['logs']['gravados_por_segundo'], anterior['logs']['gravados_por_segundo'])})")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ponta a ponta do reconhecimento facial.')
+    parser.add_argument('--tamanhos', default=','.join(map(str, TAMANHOS_PADRAO)),
+                        help='Tamanhos de galeria, separados por vírgula (ex.: 100,1000,10000)')
+    parser.add_argument('--verificacoes', type=int, default=VERIFICACOES_POR_TAMANHO,
+                        help='Verificações medidas para cada tamanho de galeria')
+    parser.add_argument('--video', help='Vídeo gravado para medir a detecção (sem ele, usa frames sintéticos)')
+    parser.add_argument('--frames', type=int, default=FRAMES_SINTETICOS, help='Máximo de frames medidos')
+    parser.add_argument('--eventos-log', type=int, default=EVENTOS_LOG, help='Eventos na medição dos logs')
+    parser.add_argument('--modelo', default='stub',
+                        help="Modelo de embeddings: stub (CPU, sem rede), deepface (Facenet512) ou onnx[:caminho]")
+    parser.add_argument('--pasta', help='Pasta de trabalho (banco, fotos e capturas); padrão: temporária')
+    parser.add_argument('--saida', default='benchmark_resultados.json', help='Arquivo JSON com os resultados')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    tamanhos = sorted(int(t) for t in args.tamanhos.split(','))
+    pasta = args.pasta or tempfile.mkdtemp(prefix='benchmark_')
+    if args.modelo == 'stub':
+        face_gallery.usar_gerador_embeddings(embeddings_stub, VERSAO_STUB)
+    else:
+        face_gallery.usar_backend(criar_backend(args.modelo))
+    preparar_ambiente(pasta)
+    aleatorio = np.random.default_rng(0)
+
+    resultados = {
+        'meta': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'modelo': face_gallery.VERSAO_MODELO,
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'processador': platform.processor(),
+            'video': args.video,
+        },
+    }
+
+    print("[BENCHMARK] Medindo a detecção...")
+    frames = frames_video(args.video, args.frames) if args.video else frames_sinteticos(args.frames)
+    resultados['deteccao'] = medir_deteccao(frames)
+    print(f"   - {resultados['deteccao']['fps']:.1f} FPS, {resultados['deteccao']['rostos_detectados']} rosto(s), "
+          f"detecção em {resultados['deteccao']['taxa_deteccao']:.0%} dos frames")
+    resultados['deteccao_ociosa'] = medir_deteccao(frames_parados(args.frames))
+    print(f"   - Corredor vazio: {resultados['deteccao_ociosa']['fps']:.1f} FPS, "
+          f"detecção em {resultados['deteccao_ociosa']['taxa_deteccao']:.0%} dos frames")
+
+    resultados['reconhecimento'] = []
+    cadastrados = 0
+    for tamanho in tamanhos:
+        print(f"[BENCHMARK] Galeria com {tamanho} usuário(s)...")
+        tempo_cadastro = ampliar_galeria(pasta, cadastrados, tamanho)
+        cadastrados = max(cadastrados, tamanho)
+        resultado = medir_reconhecimento(tamanho, args.verificacoes, aleatorio)
+        resultado['cadastro_s'] = tempo_cadastro
+        resultados['reconhecimento'].append(resultado)
+        print(f"   - p50 {resultado['individual']['p50_ms']:.1f} ms, p95 {resultado['individual']['p95_ms']:.1f} ms, "
+              f"acurácia {resultado['acuracia']:.1%}")
+
+    print("[BENCHMARK] Medindo a gravação dos logs...")
+    resultados['logs'] = medir_logs(args.eventos_log)
+    print(f"   - {resultados['logs']['gravados_por_segundo']:.0f} eventos gravados por segundo")
+
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+    print(f"[BENCHMARK] Resultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar(resultados, json.load(arquivo))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# Importa as bibliotecas necessárias para cadastrar muitos usuários de uma vez a partir das fotos
+
+# Importa a biblioteca OS para percorrer a pasta de fotos e salvar os rostos recortados
+import os
+# Importa a biblioteca csv para ler a planilha de alunos e gravar o relatório de rejeitados
+import csv
+# Importa a biblioteca sqlite3 para gravar os usuários em transações agrupadas
+import sqlite3
+# Importa a biblioteca de tempo para medir a vazão do cadastro
+import time
+# Importa a biblioteca argparse para ler as opções da linha de comando
+import argparse
+# Importa o pool de processos onde cada núcleo detecta, recorta e gera os embeddings
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+# Importa o contador usado no resumo dos rejeitados
+from collections import Counter
+# Importa a biblioteca OpenCV para ler as fotos e salvar os rostos recortados
+import cv2
+
+# Importa funções internas do sistema
+
+# Importa a função que cria o banco de dados e tabelas, garantindo que tudo esteja pronto antes do cadastro
+from database_setup import criar_banco_de_dados
+# Importa a galeria para saber a versão do modelo gravada junto com cada embedding
+import face_gallery
+# Importa as mesmas funções de recorte e avaliação de qualidade usadas no portão
+from detection_utils import recortar_rosto
+from face_quality import pontuar_qualidade
+
+# --- CONFIGURAÇÕES ---
+# Define diretório base onde está o arquivo atual
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Caminho completo do banco de dados SQLite
+db_path = os.path.join(BASE_DIR, 'database.db')
+# Pasta onde os rostos recortados dos cadastrados são guardados
+rostos_dir = os.path.join(BASE_DIR, 'rostos_cadastrados')
+# Fotos enviadas a um processo de uma só vez (o modelo gera os embeddings do lote em uma chamada)
+FOTOS_POR_TAREFA = 16
+# Usuários gravados por transação
+USUARIOS_POR_TRANSACAO = 200
+# Qualidade mínima (0 a 1) do rosto para aceitar a foto de cadastro
+QUALIDADE_MINIMA_CADASTRO = 0.35
+# Confiança mínima do MediaPipe para contar um rosto na foto
+CONFIANCA_MINIMA = 0.6
+# Extensões de imagem aceitas na pasta de fotos
+EXTENSOES_FOTO = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+# Tipos de usuário aceitos pela tabela Usuarios
+TIPOS_USUARIO = ('Discente', 'Docente', 'Servidor')
+
+# Motivos de rejeição
+SEM_ROSTO = 'sem_rosto'
+VARIOS_ROSTOS = 'varios_rostos'
+BAIXA_QUALIDADE = 'baixa_qualidade'
+IMAGEM_INVALIDA = 'imagem_invalida'
+DADOS_INVALIDOS = 'dados_invalidos'
+FALHA_EMBEDDING = 'falha_embedding'
+MATRICULA_REPETIDA = 'matricula_repetida'
+
+# --- LEITURA DOS ALUNOS ---
+
+def ler_csv(caminho):
+    """
+    Lê uma planilha com as colunas matricula, nome_completo, tipo e foto
+    (caminho da foto, relativo à pasta da planilha). Retorna a lista de dicionários.
+    """
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        itens = []
+        for linha in csv.DictReader(arquivo):
+            foto = (linha.get('foto') or '').strip()
+            itens.append({
+                'matricula': (linha.get('matricula') or '').strip(),
+                'nome_completo': (linha.get('nome_completo') or '').strip(),
+                'tipo': (linha.get('tipo') or 'Discente').strip(),
+                'foto': os.path.join(pasta, foto) if foto else '',
+            })
+    return itens
+
+def ler_pasta(pasta, tipo='Discente'):
+    """
+    Lê uma pasta de fotos nomeadas como MATRICULA_Nome_Completo.jpg.
+    """
+    itens = []
+    for nome_arquivo in sorted(os.listdir(pasta)):
+        base, extensao = os.path.splitext(nome_arquivo)
+        if extensao.lower() not in EXTENSOES_FOTO:
+            continue
+        matricula, _, nome = base.partition('_')
+        itens.append({
+            'matricula': matricula.strip(),
+            'nome_completo': nome.replace('_', ' ').strip(),
+            'tipo': tipo,
+            'foto': os.path.join(pasta, nome_arquivo),
+        })
+    return itens
+
+# --- FUNÇÕES EXECUTADAS NOS PROCESSOS ---
+
+# Detector do MediaPipe do processo (criado uma vez por processo)
+_detector = None
+
+def _inicializar_processo():
+    """
+    Executada uma vez em cada processo do pool: cria o detector e carrega o modelo de reconhecimento.
+    """
+    global _detector
+    # Importa aqui para que o processo principal não precise carregar o MediaPipe
+    import mediapipe as mp
+    _detector = mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=CONFIANCA_MINIMA)
+    face_gallery.carregar_modelo()
+
+def _recortar_foto(item):
+    """
+    Detecta o rosto da foto e devolve (recorte, None) ou (None, motivo da rejeição).
+    """
+    imagem = cv2.imread(item['foto'])
+    if imagem is None:
+        return None, IMAGEM_INVALIDA
+    deteccoes = _detector.process(cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB)).detections or []
+    if not deteccoes:
+        return None, SEM_ROSTO
+    if len(deteccoes) > 1:
+        return None, VARIOS_ROSTOS
+    recorte = recortar_rosto(imagem, deteccoes[0])
+    if recorte is None:
+        return None, SEM_ROSTO
+    nota, _ = pontuar_qualidade(recorte, deteccoes[0])
+    if nota < QUALIDADE_MINIMA_CADASTRO:
+        return None, BAIXA_QUALIDADE
+    return recorte, None
+
+def _processar_tarefa(itens, pasta_rostos):
+    """
+    Processa um grupo de fotos dentro de um processo do pool: detecção, recorte, qualidade,
+    gravação do rosto recortado e embeddings (todos os aceitos em uma única chamada ao modelo).
+    Retorna uma lista de (item, caminho_rosto, embedding em bytes, motivo da rejeição).
+    """
+    resultados, aceitos = [], []
+    for item in itens:
+        try:
+            recorte, motivo = _recortar_foto(item)
+        except Exception:
+            recorte, motivo = None, IMAGEM_INVALIDA
+        if motivo is not None:
+            resultados.append((item, None, None, motivo))
+            continue
+        caminho_rosto = os.path.join(pasta_rostos, f"{item['matricula']}.jpg")
+        cv2.imwrite(caminho_rosto, recorte)
+        aceitos.append((item, caminho_rosto, recorte))
+
+    if aceitos:
+        try:
+            vetores = face_gallery.gerar_embeddings_lote([recorte for _, _, recorte in aceitos])
+        except Exception:
+            # Um rosto problemático não pode derrubar o lote inteiro: tenta um a um
+            vetores = []
+            for _, _, recorte in aceitos:
+                try:
+                    vetores.append(face_gallery.gerar_embeddings_lote([recorte])[0])
+                except Exception:
+                    vetores.append(None)
+        for (item, caminho_rosto, _), vetor in zip(aceitos, vetores):
+            if vetor is None:
+                resultados.append((item, None, None, FALHA_EMBEDDING))
+            else:
+                resultados.append((item, caminho_rosto, face_gallery.embedding_para_blob(vetor), None))
+    return resultados
+
+# --- PROCESSO PRINCIPAL ---
+
+def _ja_cadastrados(conn, versao_modelo):
+    """
+    Matrículas que já têm embedding da versão atual do modelo (puladas ao retomar um cadastro).
+    """
+    c = conn.cursor()
+    c.execute("SELECT matricula FROM Usuarios WHERE matricula IS NOT NULL AND modelo_embedding = ?", (versao_modelo,))
+    return {linha[0] for linha in c.fetchall()}
+
+def _gravar_usuarios(conn, linhas, versao_modelo):
+    """
+    Insere (ou atualiza, pela matrícula) um grupo de usuários com seus embeddings em uma única transação.
+    """
+    with conn:
+        conn.executemany('''
+            INSERT INTO Usuarios (matricula, nome_completo, tipo, caminho_foto_rosto, embedding, modelo_embedding)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (matricula) DO UPDATE SET
+                nome_completo = excluded.nome_completo,
+                tipo = excluded.tipo,
+                caminho_foto_rosto = excluded.caminho_foto_rosto,
+                embedding = excluded.embedding,
+                modelo_embedding = excluded.modelo_embedding
+        ''', [linha + (versao_modelo,) for linha in linhas])
+
+def cadastrar(itens, processos=None, relatorio_rejeitados='rejeitados.csv'):
+    """
+    Cadastra os itens (matricula, nome_completo, tipo, foto) usando um processo por núcleo.
+    Pode ser interrompido e executado de novo: quem já tem embedding da versão atual é pulado,
+    e cada transação gravada fica salva. Retorna (cadastrados, lista de rejeitados).
+    """
+    versao_modelo = face_gallery.VERSAO_MODELO
+    criar_banco_de_dados(db_path)
+    os.makedirs(rostos_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+
+    rejeitados = []
+    feitos = _ja_cadastrados(conn, versao_modelo)
+    vistos = set()
+    pendentes = []
+    for item in itens:
+        if not item['matricula'] or not item['nome_completo'] or item['tipo'] not in TIPOS_USUARIO or not item['foto']:
+            rejeitados.append((item, DADOS_INVALIDOS))
+        elif item['matricula'] in vistos:
+            rejeitados.append((item, MATRICULA_REPETIDA))
+        elif item['matricula'] not in feitos:
+            pendentes.append(item)
+        vistos.add(item['matricula'])
+    print(f"[CADASTRO] {len(itens)} registro(s) lido(s); {len(itens) - len(pendentes) - len(rejeitados)} "
+          f"já cadastrado(s); {len(pendentes)} a processar.")
+
+    processos = processos or os.cpu_count() or 1
+    tarefas = [pendentes[i:i + FOTOS_POR_TAREFA] for i in range(0, len(pendentes), FOTOS_POR_TAREFA)]
+    cadastrados, a_gravar = 0, []
+    inicio = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo) as pool:
+            # Mantém só algumas tarefas em voo para não carregar todas as fotos na memória de uma vez
+            em_voo, proxima = set(), 0
+            while em_voo or proxima < len(tarefas):
+                while proxima < len(tarefas) and len(em_voo) < processos * 2:
+                    em_voo.add(pool.submit(_processar_tarefa, tarefas[proxima], rostos_dir))
+                    proxima += 1
+                prontas, em_voo = wait(em_voo, return_when=FIRST_COMPLETED)
+                for futuro in prontas:
+                    for item, caminho_rosto, blob, motivo in futuro.result():
+                        if motivo is not None:
+                            rejeitados.append((item, motivo))
+                        else:
+                            a_gravar.append((item['matricula'], item['nome_completo'], item['tipo'], caminho_rosto, blob))
+                if len(a_gravar) >= USUARIOS_POR_TRANSACAO:
+                    _gravar_usuarios(conn, a_gravar, versao_modelo)
+                    cadastrados += len(a_gravar)
+                    a_gravar = []
+                    decorrido = time.perf_counter() - inicio
+                    print(f"[CADASTRO] {cadastrados} cadastrado(s) ({cadastrados / decorrido:.1f} fotos/s)")
+    finally:
+        # Grava o que já foi processado, mesmo se o cadastro foi interrompido
+        if a_gravar:
+            _gravar_usuarios(conn, a_gravar, versao_modelo)
+            cadastrados += len(a_gravar)
+        conn.close()
+        _gravar_rejeitados(relatorio_rejeitados, rejeitados)
+
+    decorrido = time.perf_counter() - inicio
+    print(f"[CADASTRO] Concluído: {cadastrados} cadastrado(s) em {decorrido:.1f}s com {processos} processo(s).")
+    if rejeitados:
+        resumo = ', '.join(f"{motivo}: {total}" for motivo, total in Counter(m for _, m in rejeitados).most_common())
+        print(f"[CADASTRO] {len(rejeitados)} rejeitado(s) ({resumo}). Detalhes em '{relatorio_rejeitados}'.")
+    return cadastrados, rejeitados
+
+def _gravar_rejeitados(caminho, rejeitados):
+    """
+    Grava a planilha de rejeitados (matrícula, nome, foto e motivo) para conferência.
+    """
+    if not caminho:
+        return
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['matricula', 'nome_completo', 'tipo', 'foto', 'motivo'])
+        for item, motivo in rejeitados:
+            escritor.writerow([item['matricula'], item['nome_completo'], item['tipo'], item['foto'], motivo])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cadastra usuários em lote a partir das fotos.')
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument('--csv', help='Planilha com as colunas matricula, nome_completo, tipo e foto')
+    origem.add_argument('--pasta', help='Pasta de fotos nomeadas como MATRICULA_Nome_Completo.jpg')
+    parser.add_argument('--tipo', default='Discente', choices=TIPOS_USUARIO, help='Tipo dos usuários lidos da pasta')
+    parser.add_argument('--processos', type=int, default=None, help='Processos em paralelo (padrão: um por núcleo)')
+    parser.add_argument('--rejeitados', default='rejeitados.csv', help='Planilha com as fotos rejeitadas')
+    args = parser.parse_args()
+    itens = ler_csv(args.csv) if args.csv else ler_pasta(args.pasta, args.tipo)
+    cadastrar(itens, args.processos, args.rejeitados)
@@ -0,0 +1,257 @@
+# Importa bibliotecas necessárias para ler a câmera em uma thread própria, entregando sempre o frame mais novo
+
+# Importa a biblioteca OS para saber se a fonte é um arquivo de vídeo local
+import os
+# Importa a biblioteca threading para decodificar os frames fora do loop de detecção
+import threading
+# Importa a biblioteca de tempo para marcar o instante de captura de cada frame e espaçar as reconexões
+import time
+# Importa a biblioteca random para variar um pouco as esperas entre reconexões
+import random
+# Importa a biblioteca argparse para o modo de teste pela linha de comando
+import argparse
+# Importa a biblioteca OpenCV para abrir as câmeras, streams e arquivos de vídeo
+import cv2
+# Importa os contadores de frames descartados e reconexões e o indicador de câmera conectada
+from metrics import QUADROS_DESCARTADOS, RECONEXOES, CAMERA_CONECTADA
+
+# --- CONFIGURAÇÕES ---
+# Espera (em segundos) antes da primeira tentativa de reconexão; dobra a cada falha seguida
+RECONEXAO_INICIAL = 0.5
+# Espera máxima (em segundos) entre duas tentativas de reconexão
+RECONEXAO_MAXIMA = 30.0
+# Tempo máximo (em milissegundos) para abrir um stream e para receber cada frame dele
+TEMPO_LIMITE_ABERTURA_MS = 5000
+TEMPO_LIMITE_LEITURA_MS = 5000
+
+def abrir_fonte(fonte):
+    """
+    Abre uma fonte de vídeo: índice de webcam ('0'), URL de stream ou arquivo local.
+    Streams recebem tempos limite de abertura e leitura, para uma conexão travada virar uma falha
+    (e uma reconexão) em vez de bloquear a leitura para sempre.
+    """
+    if isinstance(fonte, int) or (isinstance(fonte, str) and fonte.isdigit()):
+        return cv2.VideoCapture(int(fonte))
+    if isinstance(fonte, str) and '://' in fonte:
+        return cv2.VideoCapture(fonte, cv2.CAP_ANY, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, TEMPO_LIMITE_ABERTURA_MS,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, TEMPO_LIMITE_LEITURA_MS,
+        ])
+    return cv2.VideoCapture(fonte)
+
+class CapturaCamera:
+    """
+    Lê uma fonte de vídeo em uma thread própria e guarda apenas o frame mais novo.
+    O loop de detecção chama `ler()` e recebe o frame mais recente e o instante em que foi
+    capturado. Frames que chegaram enquanto o loop ainda processava o anterior são descartados
+    e contados, em vez de se acumularem no buffer do OpenCV.
+    Se o stream cair, a captura é reaberta com espera exponencial (até RECONEXAO_MAXIMA).
+    Arquivos de vídeo entregam todos os frames, sem descarte, a menos que `tempo_real` esteja
+    ligado (aí o arquivo é lido no ritmo do seu FPS, como se fosse uma câmera).
+    """
+
+    def __init__(self, fonte, nome=None, repetir=False, tempo_real=False,
+                 reconexao_inicial=RECONEXAO_INICIAL, reconexao_maxima=RECONEXAO_MAXIMA, abrir=abrir_fonte):
+        self.fonte = fonte
+        self.nome = nome or str(fonte)
+        # Para arquivos de vídeo: volta ao início quando o arquivo acaba
+        self.repetir = repetir
+        self.eh_arquivo = isinstance(fonte, str) and os.path.isfile(fonte)
+        self.tempo_real = tempo_real and self.eh_arquivo
+        # Câmeras e streams (e arquivos em tempo real) só entregam o frame mais novo
+        self.descartar = not self.eh_arquivo or self.tempo_real
+        self.reconexao_inicial = reconexao_inicial
+        self.reconexao_maxima = reconexao_maxima
+        self._abrir = abrir
+
+        self._condicao = threading.Condition()
+        self._parar = threading.Event()
+        self._quadro = None
+        self._instante = None
+        self._numero = 0
+        self._entregue = 0
+        # Fica True quando um arquivo de vídeo (sem repetir) chega ao fim
+        self.terminou = False
+        self.conectada = False
+
+        # Contadores de acompanhamento
+        self.lidos = 0
+        self.descartados = 0
+        self.reconexoes = 0
+
+        CAMERA_CONECTADA.definir(lambda: int(self.conectada), self.nome)
+        self._thread = threading.Thread(target=self._executar, name=f'captura-{self.nome}', daemon=True)
+        self._thread.start()
+
+    def _abrir_captura(self):
+        captura = self._abrir(self.fonte)
+        if not captura.isOpened():
+            captura.release()
+            return None
+        if not self.eh_arquivo:
+            # Onde o backend permite, o OpenCV guarda no máximo um frame além do que está sendo lido
+            captura.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return captura
+
+    def _aguardar_reconexao(self, espera, motivo):
+        """
+        Espera antes de tentar abrir a fonte de novo (ou até o encerramento). Retorna a próxima espera.
+        """
+        self.conectada = False
+        print(f"[CÂMERA] [{self.nome}] {motivo} Nova tentativa em {espera:.1f}s...")
+        # Um pouco de variação evita que várias câmeras reconectem todas no mesmo instante
+        self._parar.wait(espera * random.uniform(0.8, 1.2))
+        self.reconexoes += 1
+        RECONEXOES.incrementar(valor_rotulo=self.nome)
+        return min(espera * 2, self.reconexao_maxima)
+
+    def _publicar(self, frame, instante):
+        with self._condicao:
+            if not self.descartar:
+                # Arquivo lido em velocidade máxima: espera o loop pegar o frame anterior
+                self._condicao.wait_for(lambda: self._entregue == self._numero or self._parar.is_set())
+            elif self._numero > self._entregue:
+                # O frame anterior nunca foi lido: será substituído por este, mais novo
+                self.descartados += 1
+                QUADROS_DESCARTADOS.incrementar(valor_rotulo=self.nome)
+            self._quadro, self._instante = frame, instante
+            self._numero += 1
+            self._condicao.notify_all()
+
+    def _executar(self):
+        captura = None
+        espera = self.reconexao_inicial
+        intervalo = None
+        proximo = None
+        lidos_desde_inicio = 0
+        try:
+            while not self._parar.is_set():
+                if captura is None:
+                    captura = self._abrir_captura()
+                    if captura is None:
+                        espera = self._aguardar_reconexao(espera, "Não foi possível abrir a fonte de vídeo.")
+                        continue
+                    if self.tempo_real:
+                        intervalo = 1.0 / (captura.get(cv2.CAP_PROP_FPS) or 30.0)
+                        proximo = time.monotonic()
+
+                ret, frame = captura.read()
+                instante = time.monotonic()
+                if not ret:
+                    if self.eh_arquivo:
+                        if self.repetir and lidos_desde_inicio > 0:
+                            captura.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            lidos_desde_inicio = 0
+                            continue
+                        print(f"[CÂMERA] [{self.nome}] Fim do arquivo de vídeo.")
+                        break
+                    captura.release()
+                    captura = None
+                    espera = self._aguardar_reconexao(espera, "Stream interrompido.")
+                    continue
+
+                # Voltou a receber frames: a próxima queda começa com a espera inicial
+                espera = self.reconexao_inicial
+                self.conectada = True
+                self.lidos += 1
+                lidos_desde_inicio += 1
+                self._publicar(frame, instante)
+
+                if self.tempo_real:
+                    proximo += intervalo
+                    self._parar.wait(max(0.0, proximo - time.monotonic()))
+        finally:
+            if captura is not None:
+                captura.release()
+            self.conectada = False
+            with self._condicao:
+                self.terminou = True
+                self._condicao.notify_all()
+
+    def ler(self, timeout=1.0):
+        """
+        Espera (no máximo `timeout` segundos) por um frame mais novo que o último entregue.
+        Retorna (frame, instante da captura em time.monotonic()) ou (None, None) se nenhum
+        frame novo chegou a tempo ou a captura terminou (ver `terminou`).
+        """
+        with self._condicao:
+            disponivel = self._condicao.wait_for(lambda: self._numero > self._entregue or self.terminou, timeout)
+            if not disponivel or self._numero == self._entregue:
+                return None, None
+            self._entregue = self._numero
+            frame, instante = self._quadro, self._instante
+            self._quadro = None
+            self._condicao.notify_all()
+            return frame, instante
+
+    def encerrar(self):
+        self._parar.set()
+        with self._condicao:
+            self._condicao.notify_all()
+        self._thread.join(timeout=TEMPO_LIMITE_LEITURA_MS / 1000 + 1)
+
+# --- TESTE LOCAL ---
+
+def simular_camera(video, porta, quedas=None):
+    """
+    Serve um arquivo de vídeo como stream MJPEG em http://localhost:porta/preview.mjpg, no ritmo
+    do seu FPS, para testar a captura sem a câmera do portão. Com `quedas`, derruba o servidor
+    a cada tantos segundos (e o sobe de novo) para exercitar a reconexão.
+    """
+    # Importa aqui para que a captura não dependa do servidor de prévia
+    from preview_stream import TransmissorPreview
+    fonte = CapturaCamera(video, nome='simulada', repetir=True, tempo_real=True)
+    transmissor = TransmissorPreview(porta, fps=1000, largura=10 ** 6, endereco='127.0.0.1')
+    proxima_queda = time.monotonic() + quedas if quedas else None
+    try:
+        while not fonte.terminou:
+            frame, _ = fonte.ler()
+            if frame is not None and transmissor.quer_quadro():
+                transmissor.publicar(frame)
+            if proxima_queda is not None and time.monotonic() >= proxima_queda:
+                print("[SIMULAÇÃO] Derrubando o stream por 3s...")
+                transmissor.encerrar()
+                time.sleep(3)
+                transmissor = TransmissorPreview(porta, fps=1000, largura=10 ** 6, endereco='127.0.0.1')
+                proxima_queda = time.monotonic() + quedas
+    finally:
+        transmissor.encerrar()
+        fonte.encerrar()
+
+def medir_captura(fonte, atraso_ms, duracao, tempo_real=False):
+    """
+    Lê a fonte simulando um processamento de `atraso_ms` por frame e mostra quantos frames
+    foram lidos e descartados, as reconexões e a idade dos frames ao serem entregues.
+    """
+    captura = CapturaCamera(fonte, tempo_real=tempo_real)
+    idades, fim = [], time.monotonic() + duracao
+    try:
+        while time.monotonic() < fim and not captura.terminou:
+            frame, instante = captura.ler()
+            if frame is None:
+                continue
+            idades.append(time.monotonic() - instante)
+            time.sleep(atraso_ms / 1000)
+    finally:
+        captura.encerrar()
+    idades.sort()
+    p50 = idades[len(idades) // 2] * 1000 if idades else 0.0
+    p95 = idades[int(len(idades) * 0.95)] * 1000 if idades else 0.0
+    print(f"[CAPTURA] {captura.lidos} frame(s) lido(s), {len(idades)} processado(s), "
+          f"{captura.descartados} descartado(s), {captura.reconexoes} reconexão(ões); "
+          f"idade ao entregar p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Testa a captura de vídeo com descarte de frames e reconexão.')
+    parser.add_argument('fonte', help='URL do stream, índice da webcam ou arquivo de vídeo')
+    parser.add_argument('--simular', type=int, metavar='PORTA',
+                        help='Em vez de ler, serve o arquivo de vídeo como stream MJPEG nesta porta')
+    parser.add_argument('--quedas', type=float, help='Com --simular, derruba o stream a cada tantos segundos')
+    parser.add_argument('--atraso-ms', type=float, default=100.0, help='Processamento simulado por frame')
+    parser.add_argument('--duracao', type=float, default=30.0, help='Duração da medição (s)')
+    parser.add_argument('--tempo-real', action='store_true', help='Lê arquivos no ritmo do FPS, como uma câmera')
+    args = parser.parse_args()
+    if args.simular:
+        simular_camera(args.fonte, args.simular, args.quedas)
+    else:
+        medir_captura(args.fonte, args.atraso_ms, args.duracao, args.tempo_real)
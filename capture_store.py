@@ -0,0 +1,248 @@
+# Importa bibliotecas necessárias para guardar as imagens capturadas no portão
+
+# Importa a biblioteca OS para criar as pastas por data e apagar arquivos antigos
+import os
+# Importa a biblioteca sqlite3 para manter LogsAcesso coerente quando uma captura é apagada
+import sqlite3
+# Importa a biblioteca uuid para gerar nomes de arquivo que nunca se repetem
+import uuid
+# Importa a biblioteca threading para gravar as imagens em segundo plano
+import threading
+# Importa a biblioteca queue para a fila de imagens a gravar
+import queue
+# Importa a biblioteca de tempo para agendar a política de retenção
+import time
+# Importa a biblioteca argparse para aplicar a retenção manualmente pela linha de comando
+import argparse
+# Importa as classes de data para nomear as pastas e calcular a idade das capturas
+from datetime import datetime, timedelta
+# Importa a biblioteca OpenCV para comprimir as imagens (JPEG ou WebP)
+import cv2
+# Importa as métricas de tempo por etapa e de profundidade das filas
+from metrics import ETAPAS, FILAS
+# Importa a limpeza das referências às capturas apagadas nos meses de logs já arquivados
+from log_archive import desligar_capturas_arquivadas
+
+# --- CONFIGURAÇÕES ---
+# Formato padrão das capturas ('jpg' ou 'webp')
+FORMATO_PADRAO = 'jpg'
+# Qualidade de compressão (0 a 100)
+QUALIDADE_PADRAO = 85
+# Idade máxima (em dias) de uma captura antes de ser apagada (None desativa)
+RETENCAO_DIAS = 90
+# Tamanho máximo (em GB) da pasta de capturas; as mais antigas são apagadas primeiro (None desativa)
+RETENCAO_MAX_GB = 20
+# Intervalo (em segundos) entre aplicações automáticas da política de retenção
+INTERVALO_RETENCAO = 3600
+# Quantidade máxima de imagens esperando para serem gravadas
+TAMANHO_FILA_GRAVACAO = 256
+
+# Parâmetro de qualidade do OpenCV para cada formato
+_PARAMETRO_QUALIDADE = {'jpg': cv2.IMWRITE_JPEG_QUALITY, 'webp': cv2.IMWRITE_WEBP_QUALITY}
+
+class ArmazemCapturas:
+    """
+    Guarda as capturas em subpastas por data (capturas_log/AAAA/MM/DD/) com nomes únicos,
+    grava os arquivos em segundo plano e aplica periodicamente a política de retenção
+    por idade e por tamanho total, limpando em LogsAcesso a referência às capturas apagadas.
+    """
+
+    def __init__(self, diretorio, db_path=None, formato=FORMATO_PADRAO, qualidade=QUALIDADE_PADRAO,
+                 retencao_dias=RETENCAO_DIAS, retencao_max_gb=RETENCAO_MAX_GB,
+                 intervalo_retencao=INTERVALO_RETENCAO):
+        if formato not in _PARAMETRO_QUALIDADE:
+            raise ValueError(f"Formato de captura inválido: '{formato}'. Use 'jpg' ou 'webp'.")
+        self.diretorio = diretorio
+        self.db_path = db_path
+        self.formato = formato
+        self.qualidade = qualidade
+        self.retencao_dias = retencao_dias
+        self.retencao_max_gb = retencao_max_gb
+        self.intervalo_retencao = intervalo_retencao
+
+        # Contadores de acompanhamento
+        self.gravadas = 0
+        self.falhas = 0
+        self.apagadas = 0
+
+        self._fila = queue.Queue(maxsize=TAMANHO_FILA_GRAVACAO)
+        FILAS.definir(self._fila.qsize, 'capturas')
+        self._proxima_retencao = time.monotonic() + intervalo_retencao
+        self._thread = threading.Thread(target=self._executar, name='armazem-capturas', daemon=True)
+        self._thread.start()
+
+    def gerar_caminho(self, agora=None):
+        """
+        Gera o caminho de uma nova captura: pasta do dia e nome com hora e um identificador único.
+        """
+        agora = agora or datetime.now()
+        pasta = os.path.join(self.diretorio, agora.strftime('%Y'), agora.strftime('%m'), agora.strftime('%d'))
+        nome = f"captura_{agora.strftime('%H%M%S')}_{uuid.uuid4().hex[:12]}.{self.formato}"
+        return os.path.join(pasta, nome)
+
+    def salvar(self, imagem):
+        """
+        Reserva o caminho da captura e agenda a gravação em segundo plano.
+        Retorna o caminho imediatamente, para ser usado no log de acesso.
+        """
+        caminho = self.gerar_caminho()
+        # Se a fila estiver cheia, espera: descartar deixaria o log apontando para um arquivo inexistente
+        self._fila.put((caminho, imagem))
+        return caminho
+
+    def _gravar(self, caminho, imagem):
+        ok, dados = cv2.imencode(f'.{self.formato}', imagem, [_PARAMETRO_QUALIDADE[self.formato], int(self.qualidade)])
+        if not ok:
+            raise ValueError("Falha ao comprimir a imagem.")
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        # Grava em um arquivo temporário e renomeia, para nunca deixar uma captura pela metade
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(dados.tobytes())
+        os.replace(temporario, caminho)
+
+    def _executar(self):
+        while True:
+            espera = max(0.0, self._proxima_retencao - time.monotonic())
+            try:
+                item = self._fila.get(timeout=espera)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                return
+            if item:
+                caminho, imagem = item
+                try:
+                    with ETAPAS.medir('gravacao_captura'):
+                        self._gravar(caminho, imagem)
+                    self.gravadas += 1
+                except Exception as e:
+                    self.falhas += 1
+                    print(f"[ERRO] Não foi possível salvar a captura '{caminho}': {e}")
+
+            if time.monotonic() >= self._proxima_retencao:
+                self._proxima_retencao = time.monotonic() + self.intervalo_retencao
+                try:
+                    self.aplicar_retencao()
+                except Exception as e:
+                    print(f"[ERRO] Falha ao aplicar a retenção de capturas: {e}")
+
+    def encerrar(self):
+        """
+        Grava as capturas que ainda estão na fila e encerra a thread.
+        """
+        self._fila.put(None)
+        self._thread.join()
+
+    # --- Retenção ---
+
+    def _listar_capturas(self):
+        """
+        Lista (data, caminho, tamanho) de todas as capturas, da mais antiga para a mais nova.
+        Nas pastas por data, a data vem do nome da pasta; arquivos soltos na raiz (formato antigo)
+        usam a data de modificação.
+        """
+        capturas = []
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                if entrada.is_file():
+                    estado = entrada.stat()
+                    capturas.append((datetime.fromtimestamp(estado.st_mtime), entrada.path, estado.st_size))
+        for ano in _subpastas_numericas(self.diretorio):
+            for mes in _subpastas_numericas(os.path.join(self.diretorio, ano)):
+                for dia in _subpastas_numericas(os.path.join(self.diretorio, ano, mes)):
+                    pasta = os.path.join(self.diretorio, ano, mes, dia)
+                    try:
+                        data = datetime(int(ano), int(mes), int(dia))
+                    except ValueError:
+                        continue
+                    with os.scandir(pasta) as entradas:
+                        for entrada in entradas:
+                            if entrada.is_file() and not entrada.name.endswith('.tmp'):
+                                capturas.append((data, entrada.path, entrada.stat().st_size))
+        capturas.sort()
+        return capturas
+
+    def aplicar_retencao(self, agora=None):
+        """
+        Apaga as capturas mais antigas que o limite de idade e, se a pasta ainda passar do
+        tamanho máximo, continua apagando das mais antigas para as mais novas.
+        Os logs que apontavam para capturas apagadas ficam com caminho_foto_capturada = NULL.
+        Retorna a quantidade de arquivos apagados.
+        """
+        agora = agora or datetime.now()
+        capturas = self._listar_capturas()
+        total = sum(tamanho for _, _, tamanho in capturas)
+        limite_idade = agora - timedelta(days=self.retencao_dias) if self.retencao_dias is not None else None
+        limite_tamanho = self.retencao_max_gb * 1024 ** 3 if self.retencao_max_gb is not None else None
+
+        apagar = []
+        for data, caminho, tamanho in capturas:
+            velha = limite_idade is not None and data < limite_idade
+            excesso = limite_tamanho is not None and total > limite_tamanho
+            if not (velha or excesso):
+                break
+            apagar.append(caminho)
+            total -= tamanho
+
+        if not apagar:
+            return 0
+
+        # Primeiro desliga os logs das capturas, depois apaga os arquivos
+        if self.db_path is not None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                with conn:
+                    conn.executemany(
+                        "UPDATE LogsAcesso SET caminho_foto_capturada = NULL WHERE caminho_foto_capturada = ?",
+                        [(caminho,) for caminho in apagar]
+                    )
+            finally:
+                conn.close()
+            desligar_capturas_arquivadas(self.db_path, apagar)
+        for caminho in apagar:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+        _remover_pastas_vazias(self.diretorio, {os.path.dirname(caminho) for caminho in apagar})
+
+        self.apagadas += len(apagar)
+        print(f"[CAPTURAS] {len(apagar)} captura(s) antiga(s) apagada(s) pela política de retenção.")
+        return len(apagar)
+
+def _subpastas_numericas(pasta):
+    """
+    Lista, em ordem, as subpastas cujo nome é um número (ano, mês ou dia).
+    """
+    try:
+        with os.scandir(pasta) as entradas:
+            return sorted(e.name for e in entradas if e.is_dir() and e.name.isdigit())
+    except FileNotFoundError:
+        return []
+
+def _remover_pastas_vazias(diretorio, pastas):
+    """
+    Remove as pastas de data que ficaram vazias depois da retenção (dia, depois mês e ano).
+    """
+    for pasta in sorted(pastas, reverse=True):
+        while os.path.abspath(pasta) != os.path.abspath(diretorio):
+            try:
+                os.rmdir(pasta)
+            except OSError:
+                # Pasta ainda tem arquivos (ou já foi removida): para de subir
+                break
+            pasta = os.path.dirname(pasta)
+
+if __name__ == '__main__':
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    capturas_dir = os.path.join(BASE_DIR, 'capturas_log')
+    db_path = os.path.join(BASE_DIR, 'database.db')
+    parser = argparse.ArgumentParser(description='Aplica a política de retenção às capturas do portão.')
+    parser.add_argument('--dias', type=float, default=RETENCAO_DIAS, help='Idade máxima das capturas, em dias')
+    parser.add_argument('--max-gb', type=float, default=RETENCAO_MAX_GB, help='Tamanho máximo da pasta, em GB')
+    args = parser.parse_args()
+    armazem = ArmazemCapturas(capturas_dir, db_path, retencao_dias=args.dias, retencao_max_gb=args.max_gb)
+    armazem.aplicar_retencao()
+    armazem.encerrar()
@@ -4,12 +4,36 @@
 import sqlite3
 # Importa a biblioteca OS para manipulação de caminhos de arquivos e diretórios (usada para salvar capturas e organizar pastas)
 import os
-# Importa a biblioteca OpenCV para captura de vídeo e manipulação de imagens (usada em todo o processamento de vídeo)
-import cv2
 # Importa a função datetime para gerar timestamps com data e hora atual (usada em logs e nomes de arquivos)
 from datetime import datetime
-# Importa a biblioteca DeepFace para fazer a verificação facial entre duas imagens (usada na comparação de rostos)
-from deepface import DeepFace
+# Importa a classe namedtuple para devolver o resultado da verificação de forma legível
+from collections import namedtuple
+# Importa a biblioteca threading para proteger o carregamento da galeria quando há várias threads verificando
+import threading
+# Importa a biblioteca atexit para gravar os logs pendentes quando o programa terminar
+import atexit
+# Importa a biblioteca de tempo para espaçar as verificações de mudança nas regras de acesso
+import time
+# Importa a galeria de embeddings para comparar o rosto com todos os cadastrados de uma só vez
+from face_gallery import (Galeria, atualizar_embeddings, gerar_embeddings_lote, LIMIAR_DISTANCIA,
+                          iniciar_aquecimento, aguardar_modelo, estado_modelo,
+                          CONSULTA_MODELOS, AGREGACAO_MODELOS)
+# Importa a incorporação de capturas confiáveis como novos modelos faciais do usuário
+import face_templates
+# Importa o índice aproximado usado quando a galeria fica grande demais para a busca exata
+from ann_index import IndiceIVF, sincronizar_indice
+# Importa o escritor que grava os logs de acesso em lote, com uma única conexão
+from access_log_writer import EscritorLogs, STATUS_VALIDOS
+# Importa o armazém que grava as capturas em pastas por data, em segundo plano
+from capture_store import ArmazemCapturas
+# Importa o publicador que avisa o painel, em tempo real, sobre cada acesso
+from access_events import PublicadorEventos, gerar_miniatura
+# Importa o contador de verificações por resultado
+from metrics import VERIFICACOES, PRONTO
+# Importa o motor de regras de acesso (suspensões, permissões especiais, liberações da COAPAC)
+from access_policy import MotorPoliticas
+# Importa o armazém de embeddings mapeado em memória e compartilhado entre os processos
+from embedding_store import ArmazemEmbeddings
 
 # --- CONFIGURAÇÕES ---
 # Define diretório base onde está o arquivo atual
@@ -18,111 +42,406 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 db_path = os.path.join(BASE_DIR, 'database.db')
 # Caminho onde as imagens de rosto capturadas serão salvas
 capturas_dir = os.path.join(BASE_DIR, 'capturas_log')
+# Caminho do índice aproximado de rostos, salvo ao lado do banco de dados
+indice_path = os.path.join(BASE_DIR, 'indice_faces.npz')
+# Pasta do armazém de embeddings mapeado em memória
+embeddings_dir = os.path.join(BASE_DIR, 'embeddings')
+# A partir de quantos usuários a busca passa a usar o índice aproximado
+USAR_INDICE_A_PARTIR_DE = 5000
+# Formato ('jpg' ou 'webp') e qualidade de compressão das capturas
+FORMATO_CAPTURA = 'jpg'
+QUALIDADE_CAPTURA = 85
+# Guarda a galeria em um arquivo mapeado em memória (compartilhado entre processos) em vez de copiar os BLOBs
+USAR_ARMAZEM_EMBEDDINGS = True
+# Formato dos vetores no armazém: 'float32', 'float16' ou 'int8' (com escala por vetor)
+FORMATO_EMBEDDINGS = 'float16'
+# Intervalo (em segundos) entre verificações de mudança nas tabelas de regras de acesso
+INTERVALO_VERIFICACAO_POLITICAS = 5.0
+# Intervalo (em segundos) entre as gravações no banco dos usos de cada modelo facial
+INTERVALO_GRAVACAO_USOS = 60.0
+# Motivo registrado quando o modelo não consegue gerar o embedding de um rosto
+FALHA_EMBEDDING = 'Falha ao gerar o embedding do rosto'
 
 # Cria o diretório de capturas se ele ainda não existir
 if not os.path.exists(capturas_dir):
     os.makedirs(capturas_dir)
 
-def registrar_log_acesso(status, usuario_id=None, caminho_foto_capturada=None):
+# Resultado de uma verificação, devolvido para quem chamou verificar_pessoa (ex.: para desenhar na tela)
+ResultadoVerificacao = namedtuple(
+    'ResultadoVerificacao', ['status', 'usuario_id', 'nome', 'distancia', 'margem', 'motivo'], defaults=(None,)
+)
+
+# Galeria de embeddings mantida em memória (carregada na primeira verificação)
+_galeria = None
+# Trava que impede duas threads de carregarem a galeria ao mesmo tempo
+_trava_galeria = threading.Lock()
+# Próximo instante em que os usos dos modelos faciais contados pela galeria vão para o banco
+_proxima_gravacao_usos = 0.0
+
+# Escritor de logs e armazém de capturas do processo (iniciados no primeiro uso)
+_escritor_logs = None
+_armazem_capturas = None
+_publicador_eventos = None
+_trava_escritor = threading.Lock()
+
+# Regras de acesso em memória, atualizadas quando as tabelas mudam (ver VersoesTabelas)
+_motor_politicas = MotorPoliticas()
+_proxima_verificacao_politicas = 0.0
+_trava_politicas = threading.Lock()
+
+def obter_galeria():
     """
-    Insere um log na tabela LogsAcesso com timestamp e status da verificação.
-    Pode receber o ID do usuário e o caminho da imagem capturada.
+    Retorna a galeria de embeddings, gerando os embeddings pendentes e
+    carregando-a do banco apenas na primeira chamada.
     """
-    # Conecta ao banco de dados
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
+    global _galeria
+    with _trava_galeria:
+        if _galeria is None:
+            conn = sqlite3.connect(db_path)
+            try:
+                atualizar_embeddings(conn)
+                if USAR_ARMAZEM_EMBEDDINGS:
+                    armazem = ArmazemEmbeddings(os.path.join(embeddings_dir, 'modelos'), FORMATO_EMBEDDINGS,
+                                                consulta=CONSULTA_MODELOS)
+                    galeria = Galeria.do_armazem(armazem, conn)
+                else:
+                    galeria = Galeria.carregar(conn)
+            finally:
+                conn.close()
+            if AGREGACAO_MODELOS == 'centroide':
+                galeria = galeria.por_centroide()
+            if len(galeria) >= USAR_INDICE_A_PARTIR_DE:
+                galeria.indice = carregar_indice(galeria)
+            _galeria = galeria
+        return _galeria
 
-    # Gera um timestamp no formato "YYYY-MM-DD HH:MM:SS"
-    timestamp_local = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def preparar_em_segundo_plano():
+    """
+    Carrega e aquece o modelo e depois a galeria em segundo plano, para que a câmera e a
+    detecção comecem imediatamente. Rostos enviados antes disso esperam na fila do serviço.
+    """
+    def executar():
+        if aguardar_modelo():
+            obter_galeria()
+            print("[INFO] Reconhecimento pronto.")
+    iniciar_aquecimento()
+    threading.Thread(target=executar, name='preparacao-galeria', daemon=True).start()
+
+def estado_prontidao():
+    """
+    Retorna em que ponto está a preparação do reconhecimento:
+    'carregando modelo', 'carregando galeria', 'pronto' ou 'falhou'.
+    """
+    estado = estado_modelo()
+    if estado == 'falhou':
+        return 'falhou'
+    if estado != 'pronto':
+        return 'carregando modelo'
+    return 'pronto' if _galeria is not None else 'carregando galeria'
+
+PRONTO.definir(lambda: 1 if estado_prontidao() == 'pronto' else 0)
+
+def carregar_indice(galeria):
+    """
+    Abre o índice aproximado salvo em disco (ou cria um novo) e aplica apenas
+    as diferenças em relação à galeria atual, sem reconstruí-lo.
+    """
+    indice = IndiceIVF.carregar(indice_path)
+    if indice is None or indice.dimensao != galeria.matriz.shape[1]:
+        indice = IndiceIVF(galeria.matriz.shape[1])
+    if sincronizar_indice(indice, galeria.chaves, galeria.matriz):
+        indice.salvar(indice_path)
+    return indice
+
+def recarregar_galeria():
+    """
+    Descarta a galeria em memória para que seja recarregada na próxima verificação
+    (usar após cadastrar, remover ou trocar a foto de um usuário).
+    """
+    global _galeria
+    with _trava_galeria:
+        gravar_usos_modelos()
+        _galeria = None
 
+def _aplicar_modelos(adicionados, removidos):
+    """
+    Leva para a galeria em memória os modelos faciais que acabaram de entrar ou sair, sem
+    recarregá-la do banco: só o armazém e o índice recebem as alterações (ver Galeria.com_modelos).
+    Na agregação por centróide, ou se a alteração incremental falhar, a galeria é recarregada.
+    """
+    global _galeria
+    with _trava_galeria:
+        if _galeria is None:
+            # A próxima carga já lê os modelos novos do banco
+            return
+        nova = None
+        if AGREGACAO_MODELOS != 'centroide':
+            conn = None
+            try:
+                conn = sqlite3.connect(db_path, timeout=5)
+                nova = _galeria.com_modelos(adicionados, removidos, conn)
+            except Exception as e:
+                # Uma falha aqui nunca pode derrubar a verificação: a galeria é recarregada
+                print(f"[AVISO] Não foi possível atualizar a galeria em memória. Detalhe: {e}")
+            finally:
+                if conn is not None:
+                    conn.close()
+        if nova is None:
+            gravar_usos_modelos()
+        _galeria = nova
+
+def gravar_usos_modelos():
+    """
+    Soma no banco os usos dos modelos faciais contados pela galeria desde a última gravação.
+    Chamada a cada INTERVALO_GRAVACAO_USOS segundos, antes de descartar a galeria e ao encerrar
+    o programa, para que o descarte dos modelos menos úteis veja os usos de todos os processos.
+    """
+    galeria = _galeria
+    if galeria is None or not galeria.usos:
+        return
+    conn = sqlite3.connect(db_path, timeout=5)
     try:
-        # Insere o log de acesso na tabela LogsAcesso
-        c.execute('''
-            INSERT INTO LogsAcesso (timestamp_acesso, status, usuario_id, caminho_foto_capturada)
-            VALUES (?, ?, ?, ?)
-        ''', (timestamp_local, status, usuario_id, caminho_foto_capturada))
-        conn.commit()
-        print(f"[LOG] Evento de acesso '{status}' registrado às {timestamp_local}.")
-    except Exception as e:
-        # Caso ocorra erro na tentativa de inserir o log
-        print(f"[ERRO DE LOG] Não foi possível registrar o acesso: {e}")
+        face_templates.registrar_usos(conn, galeria)
+    except sqlite3.Error as e:
+        print(f"[AVISO] Não foi possível gravar os usos dos modelos faciais. Detalhe: {e}")
     finally:
-        # Fecha a conexão com o banco de dados
         conn.close()
 
-def verificar_pessoa(imagem_rosto_detectado):
+def _gravar_usos_periodicamente():
+    global _proxima_gravacao_usos
+    agora = time.monotonic()
+    if agora >= _proxima_gravacao_usos:
+        _proxima_gravacao_usos = agora + INTERVALO_GRAVACAO_USOS
+        gravar_usos_modelos()
+
+atexit.register(gravar_usos_modelos)
+
+def obter_motor_politicas():
     """
-    Compara rosto detectado com todos os rostos cadastrados no banco.
-    Se for identificado, registra como 'Aceito' ou 'Negado'; caso contrário, 'Não Encontrado'.
+    Retorna o motor de regras de acesso, recarregando (no máximo a cada
+    INTERVALO_VERIFICACAO_POLITICAS segundos) só as regras cujas tabelas mudaram.
+    """
+    global _proxima_verificacao_politicas
+    with _trava_politicas:
+        agora = time.monotonic()
+        if agora >= _proxima_verificacao_politicas:
+            conn = sqlite3.connect(db_path)
+            try:
+                recarregados = _motor_politicas.atualizar(conn)
+            finally:
+                conn.close()
+            if recarregados:
+                print(f"[POLÍTICAS] Regras recarregadas: {', '.join(recarregados)}.")
+            _proxima_verificacao_politicas = agora + INTERVALO_VERIFICACAO_POLITICAS
+    return _motor_politicas
+
+def obter_escritor_logs():
+    """
+    Retorna o escritor de logs do processo, iniciando-o na primeira chamada.
+    Os eventos pendentes são gravados automaticamente quando o programa termina.
+    """
+    global _escritor_logs
+    with _trava_escritor:
+        if _escritor_logs is None:
+            _escritor_logs = EscritorLogs(db_path)
+            atexit.register(_escritor_logs.encerrar)
+        return _escritor_logs
+
+def registrar_log_acesso(status, usuario_id=None, caminho_foto_capturada=None, portao=None):
+    """
+    Registra um evento de acesso na tabela LogsAcesso com timestamp e status da verificação.
+    Pode receber o ID do usuário, o caminho da imagem capturada e o portão (câmera) do acesso.
+    O evento é enfileirado e gravado em lote pelo escritor de logs, sem esperar o banco.
+    Um status fora de STATUS_VALIDOS é recusado aqui, antes de chegar à fila.
+    """
+    if status not in STATUS_VALIDOS:
+        raise ValueError(f"Status de acesso inválido: '{status}'. Use um de {', '.join(STATUS_VALIDOS)}.")
+    # Gera um timestamp no formato "YYYY-MM-DD HH:MM:SS" no momento do evento (não da gravação)
+    timestamp_local = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    obter_escritor_logs().registrar((timestamp_local, status, usuario_id, caminho_foto_capturada, portao))
+    print(f"[LOG] Evento de acesso '{status}' registrado às {timestamp_local}.")
+    return timestamp_local
+
+def obter_publicador_eventos():
+    """
+    Retorna o publicador de eventos ao vivo do processo, iniciando-o na primeira chamada.
+    """
+    global _publicador_eventos
+    with _trava_escritor:
+        if _publicador_eventos is None:
+            _publicador_eventos = PublicadorEventos()
+        return _publicador_eventos
+
+def _registrar_e_publicar(status, imagem_rosto, caminho_foto_capturada, portao, usuario_id=None, nome=None,
+                          motivo=None):
+    """
+    Registra o acesso em LogsAcesso e o publica para os painéis conectados, com a miniatura do rosto.
+    """
+    timestamp_local = registrar_log_acesso(status, usuario_id, caminho_foto_capturada, portao)
+    VERIFICACOES.incrementar(valor_rotulo=status)
+    try:
+        obter_publicador_eventos().publicar({
+            'timestamp': timestamp_local,
+            'status': status,
+            'usuario_id': usuario_id,
+            'nome': nome,
+            'motivo': motivo,
+            'portao': portao,
+            'caminho_foto': caminho_foto_capturada,
+            'miniatura': gerar_miniatura(imagem_rosto),
+        })
+    except Exception as e:
+        # O painel ao vivo é só um aviso: uma falha aqui não pode impedir o acesso
+        print(f"[AVISO] Não foi possível publicar o evento de acesso: {e}")
+
+def obter_armazem_capturas():
+    """
+    Retorna o armazém de capturas do processo, iniciando-o na primeira chamada.
+    As capturas pendentes são gravadas automaticamente quando o programa termina.
+    """
+    global _armazem_capturas
+    with _trava_escritor:
+        if _armazem_capturas is None:
+            _armazem_capturas = ArmazemCapturas(
+                capturas_dir, db_path, formato=FORMATO_CAPTURA, qualidade=QUALIDADE_CAPTURA
+            )
+            atexit.register(_armazem_capturas.encerrar)
+        return _armazem_capturas
+
+def _salvar_captura(imagem_rosto_detectado):
+    """
+    Agenda a gravação da imagem capturada e retorna o caminho (único) do arquivo.
+    """
+    return obter_armazem_capturas().salvar(imagem_rosto_detectado)
+
+def _decidir_acesso(galeria, resultado, imagem_rosto, log_img_path, portao=None):
+    """
+    Decide o status a partir do resultado da busca na galeria, registra o log e
+    retorna o ResultadoVerificacao correspondente.
     """
-    # Conecta ao banco de dados
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
+    # Se nenhum rosto for compatível com os cadastrados
+    if resultado is None or resultado.distancia > LIMIAR_DISTANCIA:
+        print("❌ Pessoa não reconhecida no banco de dados.")
+        if resultado is not None:
+            print(f"   - Distância do mais próximo: {resultado.distancia:.3f}")
+        _registrar_e_publicar('Não Encontrado', imagem_rosto, log_img_path, portao)
+        if resultado is None:
+            return ResultadoVerificacao('Não Encontrado', None, None, None, None)
+        return ResultadoVerificacao('Não Encontrado', None, None, resultado.distancia, resultado.margem)
 
-    # Gera um nome único para a imagem capturada usando o timestamp atual
-    timestamp = int(datetime.now().timestamp())
-    log_img_filename = f"captura_{timestamp}.jpg"
-    log_img_path = os.path.join(capturas_dir, log_img_filename)
+    user_id = resultado.usuario_id
+    nome, tipo_usuario, situacao = galeria.usuarios[user_id]
+    # Suspensões, permissões especiais e liberações da COAPAC, consultadas em memória
+    decisao = obter_motor_politicas().decidir(user_id)
+    print("-" * 30)
 
-    # Salva a imagem capturada na pasta de logs
-    cv2.imwrite(log_img_path, imagem_rosto_detectado)
+    if not decisao.permitido:
+        # Usuário reconhecido mas com acesso bloqueado por alguma regra
+        print(f"❌ ACESSO NEGADO: {nome}")
+        print(f"   - Motivo: {decisao.motivo}")
+        status = 'Negado'
+    else:
+        # Usuário reconhecido com acesso liberado
+        print(f"✅ ACESSO ACEITO: {nome}")
+        print(f"   - Tipo: {tipo_usuario}")
+        print(f"   - Situação: {situacao}")
+        print(f"   - Motivo: {decisao.motivo}")
+        status = 'Aceito'
+    print(f"   - Distância: {resultado.distancia:.3f} (margem {resultado.margem:.3f})")
+    print("-" * 30)
+    _registrar_e_publicar(status, imagem_rosto, log_img_path, portao, user_id, nome, decisao.motivo)
+    return ResultadoVerificacao(status, user_id, nome, resultado.distancia, resultado.margem, decisao.motivo)
 
+def _gerar_embeddings_tolerante(imagens_rostos):
+    """
+    Gera os embeddings de todos os rostos em uma única chamada ao modelo. Se o lote falhar,
+    tenta rosto a rosto, para que um recorte problemático (de qualquer câmera) não derrube os outros.
+    Retorna uma lista com o embedding de cada rosto, ou None nos que falharam também sozinhos.
+    """
     try:
-        # Recupera todos os usuários cadastrados no banco
-        c.execute("SELECT id, nome_completo, tipo, situacao, caminho_foto_rosto FROM Usuarios")
-        registros = c.fetchall()
-
-        # Se não houver usuários cadastrados, registra como "Não Encontrado"
-        if not registros:
-            print("[AVISO] Nenhum usuário cadastrado para verificação.")
-            registrar_log_acesso('Não Encontrado', caminho_foto_capturada=log_img_path)
-            return
+        return list(gerar_embeddings_lote(imagens_rostos))
+    except Exception as e:
+        if len(imagens_rostos) > 1:
+            print(f"[AVISO] Lote de {len(imagens_rostos)} rosto(s) falhou; verificando um a um. Detalhe: {e}")
+        else:
+            print(f"[ERRO] Verificação falhou. Detalhe: {e}")
+            return [None]
+    embeddings = []
+    for imagem in imagens_rostos:
+        try:
+            embeddings.append(gerar_embeddings_lote([imagem])[0])
+        except Exception as e:
+            print(f"[ERRO] Verificação de um rosto falhou. Detalhe: {e}")
+            embeddings.append(None)
+    return embeddings
 
-        pessoa_encontrada = False
+def verificar_pessoas_lote(imagens_rostos, portoes=None):
+    """
+    Verifica vários rostos de uma vez: todos passam pelo modelo em um único lote
+    e cada um é comparado com a galeria inteira.
+    portoes pode ser o nome de um único portão para todo o lote ou uma lista com o portão de cada rosto.
+    Retorna uma lista de ResultadoVerificacao, na mesma ordem das imagens recebidas. Rostos cujo
+    embedding não pôde ser gerado ficam registrados como 'Não Encontrado' (motivo FALHA_EMBEDDING).
+    """
+    # Salva as imagens capturadas na pasta de logs
+    caminhos = [_salvar_captura(imagem) for imagem in imagens_rostos]
+    if portoes is None or isinstance(portoes, str):
+        portoes = [portoes] * len(caminhos)
 
-        # Percorre todos os usuários cadastrados
-        for user_id, nome, tipo_usuario, situacao, arquivo_rosto_db in registros:
-            # Pula se a imagem do rosto do usuário não existir
-            if not os.path.exists(arquivo_rosto_db):
-                continue
+    galeria = obter_galeria()
 
-            try:
-                # Compara o rosto capturado com o rosto do banco usando DeepFace
-                result = DeepFace.verify(
-                    img1_path=log_img_path,
-                    img2_path=arquivo_rosto_db,
-                    model_name='Facenet512',
-                    enforce_detection=False
-                )
-
-                # Se for verificado como verdadeiro, analisa a situação do usuário
-                if result['verified']:
-                    pessoa_encontrada = True
-                    print("-" * 30)
-
-                    if situacao == 'Suspenso':
-                        # Usuário reconhecido mas com acesso suspenso
-                        print(f"❌ ACESSO NEGADO: {nome}")
-                        print(f"   - Motivo: Usuário com situação '{situacao}'")
-                        registrar_log_acesso('Negado', user_id, log_img_path)
-                    else:
-                        # Usuário reconhecido com acesso liberado
-                        print(f"✅ ACESSO ACEITO: {nome}")
-                        print(f"   - Tipo: {tipo_usuario}")
-                        print(f"   - Situação: {situacao}")
-                        registrar_log_acesso('Aceito', user_id, log_img_path)
-                    print("-" * 30)
-                    return  # Finaliza após primeira correspondência
+    # Se não houver usuários cadastrados, registra todos como "Não Encontrado"
+    if len(galeria) == 0:
+        print("[AVISO] Nenhum usuário cadastrado para verificação.")
+        for imagem, log_img_path, portao in zip(imagens_rostos, caminhos, portoes):
+            _registrar_e_publicar('Não Encontrado', imagem, log_img_path, portao)
+        return [ResultadoVerificacao('Não Encontrado', None, None, None, None) for _ in caminhos]
 
-            except Exception as e:
-                # Se a comparação falhar para esse usuário, exibe erro mas continua tentando os próximos
-                print(f"[ERRO] Verificação falhou para {nome}. Detalhe: {e}")
+    embeddings = _gerar_embeddings_tolerante(imagens_rostos)
 
-        # Se nenhum rosto for compatível com os cadastrados
-        if not pessoa_encontrada:
-            print("❌ Pessoa não reconhecida no banco de dados.")
-            registrar_log_acesso('Não Encontrado', caminho_foto_capturada=log_img_path)
+    resultados = []
+    incorporados, descartados = [], []
+    for embedding, imagem, log_img_path, portao in zip(embeddings, imagens_rostos, caminhos, portoes):
+        if embedding is None:
+            # O rosto não pôde ser convertido: o acesso fica registrado como não encontrado, com a captura
+            _registrar_e_publicar('Não Encontrado', imagem, log_img_path, portao, motivo=FALHA_EMBEDDING)
+            resultados.append(ResultadoVerificacao('Não Encontrado', None, None, None, None, FALHA_EMBEDDING))
+            continue
+        busca = galeria.buscar(embedding)
+        resultado = _decidir_acesso(galeria, busca, imagem, log_img_path, portao)
+        if face_templates.INCORPORAR_CAPTURAS and resultado.status == 'Aceito':
+            incorporado = _incorporar_captura(galeria, busca, embedding, log_img_path)
+            if incorporado is not None:
+                # Modelos extras entram na galeria com a chave -id (ver CONSULTA_MODELOS)
+                modelo_id, removidos = incorporado
+                incorporados.append((-modelo_id, busca.usuario_id, embedding))
+                descartados += [-removido for removido in removidos]
+        resultados.append(resultado)
+    if incorporados:
+        # Os novos modelos já valem no próximo rosto, sem recarregar a galeria inteira
+        _aplicar_modelos(incorporados, descartados)
+    _gravar_usos_periodicamente()
+    return resultados
 
+def _incorporar_captura(galeria, busca, embedding, log_img_path):
+    """
+    Tenta guardar uma captura 'Aceito' como novo modelo facial do usuário (ver face_templates.py).
+    Retorna (id do novo modelo, ids descartados) ou None. Uma falha aqui nunca atrapalha a verificação.
+    """
+    conn = sqlite3.connect(db_path, timeout=5)
+    try:
+        return face_templates.incorporar_captura(conn, galeria, busca, embedding, log_img_path)
+    except sqlite3.Error as e:
+        print(f"[AVISO] Não foi possível incorporar a captura como modelo facial. Detalhe: {e}")
+        return None
     finally:
-        # Encerra a conexão com o banco, independente do resultado
         conn.close()
+
+def verificar_pessoa(imagem_rosto_detectado, portao=None):
+    """
+    Compara rosto detectado com todos os rostos cadastrados no banco.
+    O rosto é convertido em embedding uma única vez e comparado com a galeria inteira.
+    Se for identificado, registra como 'Aceito' ou 'Negado'; caso contrário, 'Não Encontrado'.
+    Retorna um ResultadoVerificacao.
+    """
+    return verificar_pessoas_lote([imagem_rosto_detectado], portao)[0]
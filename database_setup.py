@@ -4,13 +4,56 @@
 import sqlite3
 # Importa a biblioteca OS para manipulação de caminhos de arquivos e diretórios (usada para salvar capturas e organizar pastas)
 import os
+# Importa a migração que prepara LogsAcesso para consultas e relatórios rápidos
+from log_queries import migrar_logs
 
-def criar_banco_de_dados():
+def _adicionar_coluna_se_ausente(c, tabela, coluna, definicao):
     """
-    Cria as 12 tabelas principais do sistema, caso ainda não existam no banco de dados SQLite.
+    Adiciona uma coluna a uma tabela já existente, caso ela ainda não exista.
+    Usada para migrar bancos antigos sem perder os dados cadastrados.
     """
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(BASE_DIR, 'database.db')
+    c.execute(f"PRAGMA table_info({tabela})")
+    colunas = [linha[1] for linha in c.fetchall()]
+    if coluna not in colunas:
+        c.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+        print(f"[DB SETUP] Coluna '{coluna}' adicionada à tabela {tabela}.")
+
+# Tabelas cujas alterações são contadas em VersoesTabelas (usadas para invalidar caches)
+TABELAS_VERSIONADAS = (
+    'Usuarios', 'Turmas', 'UsuarioTurma', 'Visitantes', 'AcoesDisciplinares',
+    'PermissoesEspeciais', 'LiberacoesCOAPAC', 'ModelosFaciais'
+)
+
+def _criar_versoes_tabelas(c):
+    """
+    Cria a tabela VersoesTabelas e os gatilhos que incrementam a versão de cada tabela
+    versionada a cada inserção, alteração ou remoção. Quem guarda dados em cache só precisa
+    comparar um número para saber se algo mudou.
+    """
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS VersoesTabelas (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for tabela in TABELAS_VERSIONADAS:
+        c.execute("INSERT OR IGNORE INTO VersoesTabelas (tabela, versao) VALUES (?, 0)", (tabela,))
+        for evento in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela}_{evento.lower()} AFTER {evento} ON {tabela}
+                BEGIN
+                    UPDATE VersoesTabelas SET versao = versao + 1 WHERE tabela = '{tabela}';
+                END
+            ''')
+
+def criar_banco_de_dados(db_path=None):
+    """
+    Cria as 13 tabelas principais do sistema, caso ainda não existam no banco de dados SQLite.
+    Sem db_path, usa o database.db ao lado deste arquivo.
+    """
+    if db_path is None:
+        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+        db_path = os.path.join(BASE_DIR, 'database.db')
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
 
@@ -56,7 +99,9 @@ def criar_banco_de_dados():
             matricula TEXT UNIQUE,
             tipo TEXT CHECK(tipo IN ('Discente', 'Docente', 'Servidor')),
             situacao TEXT DEFAULT 'Normal' CHECK(situacao IN ('Normal', 'Advertido', 'Suspenso')),
-            caminho_foto_rosto TEXT NOT NULL
+            caminho_foto_rosto TEXT NOT NULL,
+            embedding BLOB,
+            modelo_embedding TEXT
         )
     ''')
 
@@ -94,6 +139,7 @@ def criar_banco_de_dados():
             usuario_id INTEGER,
             visitante_id INTEGER,
             caminho_foto_capturada TEXT,
+            portao TEXT,
             FOREIGN KEY (usuario_id) REFERENCES Usuarios(id),
             FOREIGN KEY (visitante_id) REFERENCES Visitantes(id)
         )
@@ -174,6 +220,37 @@ def criar_banco_de_dados():
         )
     ''')
 
+    # 13. Modelos faciais extras de cada usuário (além da foto principal em Usuarios)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS ModelosFaciais (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            caminho_foto TEXT,
+            origem TEXT NOT NULL DEFAULT 'cadastro' CHECK(origem IN ('cadastro', 'captura')),
+            embedding BLOB,
+            modelo_embedding TEXT,
+            usos INTEGER NOT NULL DEFAULT 0,
+            criado_em TEXT NOT NULL,
+            ultimo_uso TEXT,
+            FOREIGN KEY (usuario_id) REFERENCES Usuarios(id) ON DELETE CASCADE
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_modelos_usuario ON ModelosFaciais(usuario_id)')
+
+    # Atualiza bancos criados antes das colunas novas existirem
+    _adicionar_coluna_se_ausente(c, 'Usuarios', 'embedding', 'BLOB')
+    _adicionar_coluna_se_ausente(c, 'Usuarios', 'modelo_embedding', 'TEXT')
+    _adicionar_coluna_se_ausente(c, 'LogsAcesso', 'portao', 'TEXT')
+
+    # Índice usado para limpar os logs de capturas apagadas pela política de retenção
+    c.execute('CREATE INDEX IF NOT EXISTS idx_logs_foto ON LogsAcesso(caminho_foto_capturada)')
+
+    # Índices, timestamps padronizados e tabelas de resumo para os relatórios de acesso
+    migrar_logs(conn)
+
+    # Versões das tabelas de cadastro, para invalidar caches do painel e das regras de acesso
+    _criar_versoes_tabelas(c)
+
     # Finaliza alterações
     conn.commit()
     conn.close()
@@ -0,0 +1,25 @@
+# Importa funções auxiliares para trabalhar com as detecções do MediaPipe
+
+def caixa_em_pixels(deteccao, largura, altura):
+    """
+    Converte a caixa relativa (0 a 1) de uma detecção do MediaPipe em pixels,
+    limitada às bordas da imagem. Retorna (x1, y1, x2, y2).
+    """
+    bboxC = deteccao.location_data.relative_bounding_box
+    x, y = int(bboxC.xmin * largura), int(bboxC.ymin * altura)
+    w, h = int(bboxC.width * largura), int(bboxC.height * altura)
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(largura, x + w), min(altura, y + h)
+    return x1, y1, x2, y2
+
+def recortar_rosto(frame, deteccao):
+    """
+    Recorta do frame o rosto de uma detecção do MediaPipe.
+    Retorna uma cópia do recorte (independente do frame) ou None se a caixa for vazia.
+    """
+    ih, iw = frame.shape[:2]
+    x1, y1, x2, y2 = caixa_em_pixels(deteccao, iw, ih)
+    recorte = frame[y1:y2, x1:x2]
+    if recorte.size == 0:
+        return None
+    return recorte.copy()
@@ -0,0 +1,376 @@
+# Importa bibliotecas necessárias para trocar o modelo que gera os embeddings faciais conforme a máquina
+
+# Importa a biblioteca OS para localizar os modelos e as fotos do teste de paridade
+import os
+# Importa a biblioteca de tempo para medir carga e latência de cada backend
+import time
+# Importa a biblioteca hashlib para identificar o arquivo do modelo ONNX pelo conteúdo
+import hashlib
+# Importa a biblioteca argparse para o teste de paridade e a quantização pela linha de comando
+import argparse
+# Importa a biblioteca json para gravar o relatório de paridade
+import json
+# Importa o pool de processos para medir cada backend isolado (memória sem interferência dos outros)
+from concurrent.futures import ProcessPoolExecutor
+# Importa a função que lê a versão de pacotes instalados (usada para versionar os embeddings salvos)
+from importlib.metadata import version, PackageNotFoundError
+# Importa a biblioteca NumPy para montar os lotes e comparar os embeddings
+import numpy as np
+# Importa a biblioteca OpenCV para ler e redimensionar as imagens dos backends sem detector próprio
+import cv2
+
+# --- CONFIGURAÇÕES ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Backend usado quando nenhum é escolhido: 'deepface' ou 'onnx' (pode ser trocado por máquina com FACEIN_BACKEND)
+BACKEND_PADRAO = os.environ.get('FACEIN_BACKEND', 'deepface')
+# Arquivo do modelo ONNX (fornecido localmente, ex.: o Facenet512 exportado e, opcionalmente, quantizado em int8)
+CAMINHO_MODELO_ONNX = os.environ.get('FACEIN_MODELO_ONNX', os.path.join(BASE_DIR, 'modelos', 'facenet512.onnx'))
+# Threads usadas pelo ONNX Runtime em cada inferência (0 deixa o runtime decidir)
+THREADS_ONNX = int(os.environ.get('FACEIN_THREADS_ONNX', '0'))
+# Modelo do DeepFace usado pelo backend 'deepface'
+MODELO_DEEPFACE = 'Facenet512'
+
+def _versao_pacote(nome):
+    """
+    Retorna a versão instalada de um pacote, ou 'desconhecida' se não for possível descobrir.
+    """
+    try:
+        return version(nome)
+    except PackageNotFoundError:
+        return 'desconhecida'
+
+def _ler_imagem(imagem):
+    """
+    Aceita o caminho de um arquivo ou uma imagem BGR já carregada e devolve a imagem BGR.
+    """
+    if isinstance(imagem, str):
+        carregada = cv2.imread(imagem)
+        if carregada is None:
+            raise ValueError(f"Não foi possível ler a imagem '{imagem}'.")
+        return carregada
+    return imagem
+
+def _redimensionar_com_borda(imagem, altura, largura):
+    """
+    Redimensiona mantendo a proporção e completa com bordas pretas até (altura, largura),
+    como o pré-processamento do DeepFace. Devolve float32 de 0 a 1.
+    """
+    escala = min(altura / imagem.shape[0], largura / imagem.shape[1])
+    nova = cv2.resize(imagem, (max(1, int(imagem.shape[1] * escala)), max(1, int(imagem.shape[0] * escala))))
+    borda_y, borda_x = altura - nova.shape[0], largura - nova.shape[1]
+    nova = cv2.copyMakeBorder(nova, borda_y // 2, borda_y - borda_y // 2, borda_x // 2, borda_x - borda_x // 2,
+                              cv2.BORDER_CONSTANT, value=0)
+    return nova.astype(np.float32) / 255.0
+
+class BackendEmbeddings:
+    """
+    Interface dos geradores de embeddings. Cada backend:
+    - tem um `nome` e uma `versao` (gravada com cada embedding; se mudar, os embeddings são recalculados);
+    - carrega as bibliotecas pesadas só em `carregar()`;
+    - separa `preparar` (imagens -> lote) de `inferir` (lote -> vetores) para que as etapas sejam medidas.
+    """
+    nome = None
+    versao = None
+
+    def carregar(self):
+        raise NotImplementedError
+
+    def preparar(self, imagens):
+        raise NotImplementedError
+
+    def inferir(self, lote):
+        raise NotImplementedError
+
+    def aquecer(self):
+        """
+        Carrega o modelo e passa uma imagem fictícia por todo o caminho.
+        """
+        self.carregar()
+        self.inferir(self.preparar([np.zeros((160, 160, 3), dtype=np.uint8)]))
+
+class BackendDeepFace(BackendEmbeddings):
+    """
+    Facenet512 do DeepFace sobre o TensorFlow, com a mesma detecção, alinhamento e
+    redimensionamento do DeepFace.represent (embeddings idênticos aos do DeepFace).
+    """
+    nome = 'deepface'
+
+    def __init__(self, modelo=MODELO_DEEPFACE):
+        self.modelo_nome = modelo
+        self.versao = f"{modelo}@deepface-{_versao_pacote('deepface')}"
+        self._modelo = None
+
+    def _importar_deepface(self):
+        # O DeepFace (e, com ele, o TensorFlow) só é importado quando o modelo é realmente necessário
+        from deepface import DeepFace
+        from deepface.modules import preprocessing
+        return DeepFace, preprocessing
+
+    def carregar(self):
+        if self._modelo is None:
+            DeepFace, _ = self._importar_deepface()
+            self._modelo = DeepFace.build_model(self.modelo_nome)
+        return self._modelo
+
+    def _preparar_rosto(self, imagem, tamanho_entrada):
+        """
+        Detecta, alinha e redimensiona o rosto de uma imagem exatamente como o DeepFace.represent,
+        devolvendo um tensor (1, altura, largura, 3) pronto para entrar no modelo.
+        """
+        DeepFace, preprocessing = self._importar_deepface()
+        rostos = DeepFace.extract_faces(
+            img_path=imagem,
+            detector_backend='opencv',
+            enforce_detection=False,
+            align=True
+        )
+        # O DeepFace devolve o rosto em RGB e o represent inverte os canais antes do modelo; fazemos o mesmo
+        rosto = rostos[0]['face'][:, :, ::-1]
+        return preprocessing.resize_image(img=rosto, target_size=(tamanho_entrada[1], tamanho_entrada[0]))
+
+    def preparar(self, imagens):
+        modelo = self.carregar()
+        return np.concatenate([self._preparar_rosto(imagem, modelo.input_shape) for imagem in imagens])
+
+    def inferir(self, lote):
+        return np.asarray(self.carregar().model(lote, training=False), dtype=np.float32)
+
+class BackendOnnx(BackendEmbeddings):
+    """
+    Modelo ONNX executado pelo ONNX Runtime na CPU (ex.: Facenet512 exportado do DeepFace,
+    em float32 ou quantizado em int8). Sem detector próprio: espera recortes de rosto, como os
+    que saem do MediaPipe, e aplica o mesmo redimensionamento com bordas e a mesma ordem de canais
+    (BGR, de 0 a 1) do backend DeepFace.
+    """
+    nome = 'onnx'
+
+    def __init__(self, caminho=CAMINHO_MODELO_ONNX, threads=THREADS_ONNX):
+        self.caminho = caminho
+        self.threads = threads
+        self.versao = f"onnx:{os.path.basename(caminho)}:{self._resumo_arquivo(caminho)}"
+        self._sessao = None
+        self._entrada = None
+        self._canais_primeiro = False
+        self._tamanho = (160, 160)
+
+    @staticmethod
+    def _resumo_arquivo(caminho):
+        """
+        Identifica o modelo pelo conteúdo, para que um arquivo trocado (ou quantizado) gere nova versão.
+        """
+        if not os.path.exists(caminho):
+            return 'ausente'
+        resumo = hashlib.sha256()
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+                resumo.update(bloco)
+        return resumo.hexdigest()[:12]
+
+    def carregar(self):
+        if self._sessao is None:
+            import onnxruntime as ort
+            if not os.path.exists(self.caminho):
+                raise FileNotFoundError(f"Modelo ONNX não encontrado em '{self.caminho}'.")
+            opcoes = ort.SessionOptions()
+            opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            opcoes.intra_op_num_threads = self.threads
+            sessao = ort.InferenceSession(self.caminho, opcoes, providers=['CPUExecutionProvider'])
+            entrada = sessao.get_inputs()[0]
+            forma = entrada.shape
+            # Aceita modelos NHWC (exportados do Keras) e NCHW (exportados do PyTorch)
+            self._canais_primeiro = forma[1] == 3
+            altura, largura = (forma[2], forma[3]) if self._canais_primeiro else (forma[1], forma[2])
+            if isinstance(altura, int) and isinstance(largura, int):
+                self._tamanho = (altura, largura)
+            self._entrada = entrada.name
+            self._sessao = sessao
+        return self._sessao
+
+    def preparar(self, imagens):
+        self.carregar()
+        lote = np.stack([_redimensionar_com_borda(_ler_imagem(imagem), *self._tamanho) for imagem in imagens])
+        return lote.transpose(0, 3, 1, 2) if self._canais_primeiro else lote
+
+    def inferir(self, lote):
+        return np.asarray(self.carregar().run(None, {self._entrada: lote})[0], dtype=np.float32)
+
+class BackendFuncao(BackendEmbeddings):
+    """
+    Adapta uma função simples (lista de imagens -> matriz de vetores) à interface, como o stub dos benchmarks.
+    """
+    nome = 'funcao'
+
+    def __init__(self, funcao, versao):
+        self.funcao = funcao
+        self.versao = versao
+
+    def carregar(self):
+        return self.funcao
+
+    def preparar(self, imagens):
+        return imagens
+
+    def inferir(self, lote):
+        return np.asarray(self.funcao(lote), dtype=np.float32)
+
+def criar_backend(especificacao=None):
+    """
+    Cria um backend a partir de 'deepface', 'onnx' (modelo em CAMINHO_MODELO_ONNX)
+    ou 'onnx:caminho/do/modelo.onnx'. Nada pesado é carregado aqui.
+    """
+    especificacao = especificacao or BACKEND_PADRAO
+    nome, _, argumento = especificacao.partition(':')
+    if nome == 'deepface':
+        return BackendDeepFace(argumento or MODELO_DEEPFACE)
+    if nome == 'onnx':
+        return BackendOnnx(argumento or CAMINHO_MODELO_ONNX)
+    raise ValueError(f"Backend de embeddings desconhecido: '{especificacao}' (use 'deepface' ou 'onnx[:caminho]').")
+
+def quantizar_onnx(entrada, saida):
+    """
+    Gera uma variante int8 (quantização dinâmica dos pesos) de um modelo ONNX.
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(entrada, saida, weight_type=QuantType.QInt8)
+    print(f"[BACKEND] Modelo int8 salvo em '{saida}' "
+          f"({os.path.getsize(entrada) / 1e6:.1f} MB -> {os.path.getsize(saida) / 1e6:.1f} MB).")
+
+# --- TESTE DE PARIDADE ---
+
+def ler_conjunto_rotulado(pasta):
+    """
+    Lê um conjunto de teste organizado como pasta/<pessoa>/<foto>.jpg.
+    Retorna (caminhos, rótulos) em ordem estável.
+    """
+    caminhos, rotulos = [], []
+    for pessoa in sorted(os.listdir(pasta)):
+        subpasta = os.path.join(pasta, pessoa)
+        if not os.path.isdir(subpasta):
+            continue
+        for arquivo in sorted(os.listdir(subpasta)):
+            if arquivo.lower().endswith(('.jpg', '.jpeg', '.png')):
+                caminhos.append(os.path.join(subpasta, arquivo))
+                rotulos.append(pessoa)
+    return caminhos, rotulos
+
+def _memoria_pico_mb():
+    """
+    Pico de memória residente do processo atual, em MB.
+    """
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _medir_backend(especificacao, caminhos):
+    """
+    Executada em um processo próprio: carrega o backend e gera os embeddings, uma imagem por vez.
+    """
+    memoria_inicial = _memoria_pico_mb()
+    backend = criar_backend(especificacao)
+    inicio = time.perf_counter()
+    backend.aquecer()
+    carga = time.perf_counter() - inicio
+    vetores, latencias = [], []
+    for caminho in caminhos:
+        inicio = time.perf_counter()
+        vetores.append(backend.inferir(backend.preparar([caminho]))[0])
+        latencias.append(time.perf_counter() - inicio)
+    return {
+        'versao': backend.versao,
+        'carga_s': carga,
+        'latencias': latencias,
+        'memoria_mb': _memoria_pico_mb() - memoria_inicial,
+        'vetores': np.asarray(vetores, dtype=np.float32),
+    }
+
+def _normalizar(vetores):
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    normas[normas == 0] = 1
+    return vetores / normas
+
+def avaliar_embeddings(vetores, rotulos, limiar):
+    """
+    Acurácia de verificação (todos os pares, no limiar de distância de cosseno)
+    e de identificação (vizinho mais próximo, deixando a própria foto de fora).
+    """
+    vetores = _normalizar(vetores)
+    rotulos = np.asarray(rotulos)
+    distancias = 1.0 - vetores @ vetores.T
+    mesma_pessoa = rotulos[:, None] == rotulos[None, :]
+    pares = np.triu(np.ones_like(mesma_pessoa), k=1)
+    aceitos = distancias <= limiar
+    genuinos, impostores = pares & mesma_pessoa, pares & ~mesma_pessoa
+    np.fill_diagonal(distancias, np.inf)
+    vizinhos = distancias.argmin(axis=1)
+    return {
+        'taxa_aceitacao_genuinos': float(aceitos[genuinos].mean()) if genuinos.any() else None,
+        'taxa_falsa_aceitacao': float(aceitos[impostores].mean()) if impostores.any() else None,
+        'acuracia_rank1': float((rotulos[vizinhos] == rotulos).mean()),
+    }
+
+def verificar_paridade(especificacoes, pasta, limiar=None):
+    """
+    Compara backends no mesmo conjunto rotulado: carga, latência por imagem, memória,
+    acurácia e, quando os vetores têm a mesma dimensão, a concordância com o primeiro backend.
+    """
+    from face_gallery import LIMIAR_DISTANCIA
+    limiar = LIMIAR_DISTANCIA if limiar is None else limiar
+    caminhos, rotulos = ler_conjunto_rotulado(pasta)
+    if not caminhos:
+        raise ValueError(f"Nenhuma foto encontrada em '{pasta}' (formato: pasta/<pessoa>/<foto>.jpg).")
+    print(f"[PARIDADE] {len(caminhos)} foto(s) de {len(set(rotulos))} pessoa(s).")
+
+    relatorio, referencia = [], None
+    for especificacao in especificacoes:
+        # Um processo novo por backend, para que a memória medida seja só a dele
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            medicao = pool.submit(_medir_backend, especificacao, caminhos).result()
+        latencias = np.asarray(medicao['latencias']) * 1000
+        resultado = {
+            'backend': especificacao,
+            'versao': medicao['versao'],
+            'carga_s': round(medicao['carga_s'], 2),
+            'latencia_p50_ms': round(float(np.percentile(latencias, 50)), 2),
+            'latencia_p95_ms': round(float(np.percentile(latencias, 95)), 2),
+            'memoria_mb': round(medicao['memoria_mb'], 1),
+        }
+        resultado.update(avaliar_embeddings(medicao['vetores'], rotulos, limiar))
+        vetores = _normalizar(medicao['vetores'])
+        if referencia is None:
+            referencia = vetores
+        elif referencia.shape == vetores.shape:
+            similaridade = (referencia * vetores).sum(axis=1)
+            decisoes_ref = (1.0 - referencia @ referencia.T) <= limiar
+            decisoes = (1.0 - vetores @ vetores.T) <= limiar
+            resultado['similaridade_media_com_referencia'] = round(float(similaridade.mean()), 4)
+            resultado['similaridade_minima_com_referencia'] = round(float(similaridade.min()), 4)
+            resultado['concordancia_decisoes'] = round(float((decisoes_ref == decisoes).mean()), 4)
+        relatorio.append(resultado)
+        print(f"[PARIDADE] {especificacao}: carga {resultado['carga_s']}s | "
+              f"p50 {resultado['latencia_p50_ms']} ms, p95 {resultado['latencia_p95_ms']} ms | "
+              f"memória +{resultado['memoria_mb']} MB | rank-1 {resultado['acuracia_rank1']:.3f}"
+              + (f" | concordância {resultado['concordancia_decisoes']:.4f}"
+                 if 'concordancia_decisoes' in resultado else ''))
+    return relatorio
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backends de embeddings: teste de paridade e quantização.')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    paridade = subcomandos.add_parser('paridade', help='Compara backends em um conjunto rotulado local')
+    paridade.add_argument('--pasta', required=True, help='Fotos organizadas como pasta/<pessoa>/<foto>.jpg')
+    paridade.add_argument('--backends', nargs='+', default=['deepface', 'onnx'],
+                          help="Backends a comparar; o primeiro é a referência (ex.: deepface onnx:modelos/f_int8.onnx)")
+    paridade.add_argument('--limiar', type=float, default=None, help='Distância de cosseno máxima (padrão: a da galeria)')
+    paridade.add_argument('--saida', default=None, help='Arquivo JSON para gravar o relatório')
+    quantizar = subcomandos.add_parser('quantizar', help='Gera a variante int8 de um modelo ONNX')
+    quantizar.add_argument('entrada', help='Modelo ONNX em float32')
+    quantizar.add_argument('saida', help='Arquivo de saída do modelo int8')
+    args = parser.parse_args()
+
+    if args.comando == 'quantizar':
+        quantizar_onnx(args.entrada, args.saida)
+    else:
+        relatorio = verificar_paridade(args.backends, args.pasta, args.limiar)
+        if args.saida:
+            with open(args.saida, 'w', encoding='utf-8') as arquivo:
+                json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+            print(f"[PARIDADE] Relatório salvo em '{args.saida}'.")
@@ -0,0 +1,124 @@
+# Importa bibliotecas necessárias para agrupar pedidos de reconhecimento em lotes
+
+# Importa a biblioteca threading para a thread que monta os lotes
+import threading
+# Importa a biblioteca de tempo para controlar o prazo máximo de espera de cada lote
+import time
+# Importa a fila de duas pontas para guardar os pedidos pendentes
+from collections import deque
+# Importa a classe Future para devolver o resultado de cada pedido a quem o fez
+from concurrent.futures import Future
+
+# --- CONFIGURAÇÕES ---
+# Quantidade máxima de rostos em um lote
+TAMANHO_MAXIMO_LOTE = 16
+# Tempo máximo (em segundos) que o primeiro rosto de um lote espera por companhia
+PRAZO_LOTE = 0.020
+
+class AgrupadorLotes:
+    """
+    Junta pedidos vindos de qualquer thread (várias detecções, frames e câmeras) e os entrega
+    em lotes para uma função que processa vários itens de uma vez. Um lote é despachado quando
+    atinge o tamanho máximo ou quando o pedido mais antigo espera mais que o prazo.
+
+    A função de lote recebe a lista de itens e devolve a lista de resultados na mesma ordem,
+    ou um Future que resolverá nessa lista (ex.: um pool de processos). Cada pedido recebe
+    um Future com o seu próprio resultado.
+    """
+
+    def __init__(self, funcao_lote, tamanho_maximo=TAMANHO_MAXIMO_LOTE, prazo=PRAZO_LOTE):
+        self.funcao_lote = funcao_lote
+        self.tamanho_maximo = tamanho_maximo
+        self.prazo = prazo
+        self._pendentes = deque()
+        self._condicao = threading.Condition()
+        self._rodando = True
+
+        # Contadores para acompanhar o tamanho médio dos lotes
+        self.lotes = 0
+        self.itens = 0
+
+        self._thread = threading.Thread(target=self._executar, name='agrupador-lotes', daemon=True)
+        self._thread.start()
+
+    def submeter(self, item):
+        """
+        Adiciona um item ao próximo lote e retorna um Future com o resultado dele.
+        """
+        futuro = Future()
+        with self._condicao:
+            if not self._rodando:
+                raise RuntimeError("O agrupador de lotes já foi encerrado.")
+            self._pendentes.append((item, futuro, time.monotonic()))
+            if len(self._pendentes) == 1 or len(self._pendentes) >= self.tamanho_maximo:
+                self._condicao.notify()
+        return futuro
+
+    def _proximo_lote(self):
+        """
+        Espera até haver um lote pronto (cheio ou com o prazo vencido) e o retira da fila.
+        Retorna None quando o agrupador foi encerrado e não há mais pedidos.
+        """
+        with self._condicao:
+            while True:
+                if self._pendentes:
+                    espera = self._pendentes[0][2] + self.prazo - time.monotonic()
+                    if len(self._pendentes) >= self.tamanho_maximo or espera <= 0 or not self._rodando:
+                        quantidade = min(self.tamanho_maximo, len(self._pendentes))
+                        return [self._pendentes.popleft() for _ in range(quantidade)]
+                    self._condicao.wait(espera)
+                elif not self._rodando:
+                    return None
+                else:
+                    self._condicao.wait()
+
+    def _executar(self):
+        while True:
+            lote = self._proximo_lote()
+            if lote is None:
+                return
+            itens = [item for item, _, _ in lote]
+            futuros = [futuro for _, futuro, _ in lote]
+            self.lotes += 1
+            self.itens += len(itens)
+            try:
+                resultados = self.funcao_lote(itens)
+            except Exception as e:
+                _falhar(futuros, e)
+                continue
+            if isinstance(resultados, Future):
+                # Despacho assíncrono: distribui os resultados quando o lote terminar
+                resultados.add_done_callback(lambda f, futuros=futuros: _distribuir_futuro(f, futuros))
+            else:
+                _distribuir(resultados, futuros)
+
+    def tamanho_medio_lote(self):
+        return self.itens / self.lotes if self.lotes else 0.0
+
+    def encerrar(self):
+        """
+        Para de aceitar pedidos; os pendentes ainda são despachados antes da thread terminar.
+        """
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        self._thread.join()
+
+def _distribuir(resultados, futuros):
+    if len(resultados) != len(futuros):
+        _falhar(futuros, RuntimeError("A função de lote devolveu uma quantidade errada de resultados."))
+        return
+    for futuro, resultado in zip(futuros, resultados):
+        futuro.set_result(resultado)
+
+def _distribuir_futuro(futuro_lote, futuros):
+    try:
+        resultados = futuro_lote.result()
+    except Exception as e:
+        _falhar(futuros, e)
+        return
+    _distribuir(resultados, futuros)
+
+def _falhar(futuros, erro):
+    for futuro in futuros:
+        futuro.set_exception(erro)
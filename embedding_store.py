@@ -0,0 +1,382 @@
+# Importa bibliotecas necessárias para guardar os embeddings em um arquivo compacto, compartilhado entre processos
+
+# Importa a biblioteca OS para criar a pasta do armazém e trocar os arquivos de forma atômica
+import os
+# Importa a biblioteca json para o arquivo que aponta a geração atual
+import json
+# Importa a biblioteca de tempo para esperar a trava de escrita
+import time
+# Importa a biblioteca NumPy para mapear os arquivos na memória (np.load com mmap_mode)
+import numpy as np
+
+# Trava entre processos: fcntl no Linux/macOS, msvcrt no Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# --- CONFIGURAÇÕES ---
+# Formatos aceitos para guardar os vetores
+FORMATOS = ('float32', 'float16', 'int8')
+# Formato padrão: metade da memória do float32, sem perda perceptível nas distâncias
+FORMATO_PADRAO = 'float16'
+# Acima de tantos registros no log (ou de tantos por cento da base), o armazém é compactado
+LIMITE_LOG = 2000
+FRACAO_LOG = 0.10
+# Linhas convertidas para float32 por vez ao comparar com uma base float16/int8
+BLOCO_COMPARACAO = 16384
+
+# Consulta padrão com os embeddings sincronizados: uma linha (chave, embedding) por vetor da versão :versao
+CONSULTA_PADRAO = '''
+    SELECT id AS chave, embedding FROM Usuarios
+    WHERE embedding IS NOT NULL AND modelo_embedding = :versao
+'''
+
+# Operações do log de alterações
+_ADICIONAR = 1
+_REMOVER = 2
+
+def _impressao(vetor_float32):
+    """
+    Identifica um embedding pelos seus primeiros 8 bytes (os mesmos que o SQLite devolve
+    em substr(embedding, 1, 8)), para saber se o vetor de um usuário mudou sem ler o BLOB inteiro.
+    """
+    return int(np.frombuffer(np.ascontiguousarray(vetor_float32, dtype=np.float32).tobytes()[:8], '<i8')[0])
+
+def _quantizar(vetores, formato):
+    """
+    Converte vetores float32 para o formato do armazém. Retorna (vetores, escalas por vetor ou None).
+    """
+    if formato == 'float32':
+        return vetores.astype(np.float32), None
+    if formato == 'float16':
+        return vetores.astype(np.float16), None
+    escalas = np.abs(vetores).max(axis=1) / 127.0
+    escalas[escalas == 0] = 1.0
+    return np.round(vetores / escalas[:, None]).astype(np.int8), escalas.astype(np.float32)
+
+class _TravaArquivo:
+    """
+    Trava exclusiva entre processos, para que só um deles escreva no armazém por vez.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+
+    def __enter__(self):
+        self._arquivo = open(self.caminho, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    self._arquivo.seek(0)
+                    msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        return self
+
+    def __exit__(self, *excecao):
+        if fcntl is not None:
+            fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+        else:
+            self._arquivo.seek(0)
+            msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+        self._arquivo.close()
+        return False
+
+class VisaoEmbeddings:
+    """
+    Visão somente leitura dos embeddings vivos: a base mapeada em memória (compartilhada entre
+    processos pelo cache de páginas do sistema) mais os vetores do log, sem as linhas removidas.
+    Se comporta como a matriz da galeria: `visao @ embedding`, `visao[i]` e `visao.shape`.
+    """
+
+    def __init__(self, base, escalas, vivos, extras):
+        self.base = base
+        self.escalas = escalas
+        self.extras = extras
+        # Índices das linhas vivas na base + extras (None quando todas estão vivas)
+        total = len(base) + len(extras)
+        self._linhas = None if vivos.all() else np.concatenate(
+            [np.flatnonzero(vivos), np.arange(len(base), total)]
+        )
+        self.shape = (total if self._linhas is None else len(self._linhas), base.shape[1])
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _produto_base(self, embedding):
+        if self.base.dtype == np.float32:
+            return np.asarray(self.base @ embedding, dtype=np.float32)
+        resultado = np.empty(len(self.base), dtype=np.float32)
+        for inicio in range(0, len(self.base), BLOCO_COMPARACAO):
+            bloco = self.base[inicio:inicio + BLOCO_COMPARACAO].astype(np.float32)
+            resultado[inicio:inicio + len(bloco)] = bloco @ embedding
+        if self.escalas is not None:
+            resultado *= self.escalas
+        return resultado
+
+    def __matmul__(self, embedding):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        produto = self._produto_base(embedding)
+        if len(self.extras):
+            produto = np.concatenate([produto, self.extras @ embedding])
+        return produto if self._linhas is None else produto[self._linhas]
+
+    def __getitem__(self, i):
+        linha = int(i) if self._linhas is None else int(self._linhas[i])
+        if linha >= len(self.base):
+            return self.extras[linha - len(self.base)]
+        vetor = np.asarray(self.base[linha], dtype=np.float32)
+        return vetor * self.escalas[linha] if self.escalas is not None else vetor
+
+    def como_float32(self):
+        """
+        Copia as linhas vivas para uma matriz float32 comum (deixa de ser compartilhada entre processos).
+        """
+        base = self.base.astype(np.float32)
+        if self.escalas is not None:
+            base *= self.escalas[:, None]
+        matriz = np.concatenate([base, self.extras]) if len(self.extras) else base
+        return matriz if self._linhas is None else matriz[self._linhas]
+
+class ArmazemEmbeddings:
+    """
+    Embeddings identificados por uma chave inteira (ex.: o id do usuário), vindos de uma consulta
+    ao banco, guardados em uma pasta com:
+    - uma base imutável por geração (ids ordenados, vetores em float32/float16/int8 com escala
+      por vetor, impressões), aberta com np.load(mmap_mode='r') e compartilhada sem cópias;
+    - um log de alterações (adições e remoções) anexado entre compactações;
+    - atual.json, trocado de forma atômica, apontando a geração em uso.
+    Só o processo que segura a trava escreve; os outros apenas mapeiam os arquivos.
+    """
+
+    def __init__(self, diretorio, formato=FORMATO_PADRAO, consulta=CONSULTA_PADRAO):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de embeddings inválido: '{formato}'. Use {', '.join(FORMATOS)}.")
+        self.diretorio = diretorio
+        self.formato = formato
+        self.consulta = consulta
+        os.makedirs(diretorio, exist_ok=True)
+        self.meta = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.visao = None
+        self._registros_log = 0
+        self._impressoes_base = None
+        self._impressoes_extras = {}
+
+    # --- Arquivos ---
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def _ler_meta(self):
+        try:
+            with open(self._caminho('atual.json'), encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _tipo_log(self, dimensao):
+        return np.dtype([('op', 'i1'), ('id', '<i8'), ('vetor', '<f4', (dimensao,))])
+
+    def abrir(self):
+        """
+        Mapeia a geração atual e aplica o log. Retorna False se ainda não existe armazém.
+        """
+        meta = self._ler_meta()
+        if meta is None:
+            self.meta, self.visao, self.ids = None, None, np.empty(0, dtype=np.int64)
+            self._registros_log, self._impressoes_base, self._impressoes_extras = 0, None, {}
+            return False
+        prefixo = f"base-{meta['geracao']}"
+        ids_base = np.load(self._caminho(f'{prefixo}.ids.npy'), mmap_mode='r')
+        base = np.load(self._caminho(f'{prefixo}.vetores.npy'), mmap_mode='r')
+        escalas = np.load(self._caminho(f'{prefixo}.escalas.npy')) if meta['formato'] == 'int8' else None
+        impressoes_base = np.load(self._caminho(f'{prefixo}.impressoes.npy'), mmap_mode='r')
+
+        # Aplica o log em ordem: a última operação de cada id vale
+        vivos = np.ones(len(ids_base), dtype=bool)
+        extras = {}
+        tipo = self._tipo_log(meta['dimensao'])
+        caminho_log = self._caminho(f"log-{meta['geracao']}.bin")
+        registros = np.empty(0, dtype=tipo)
+        if os.path.exists(caminho_log):
+            inteiros = os.path.getsize(caminho_log) // tipo.itemsize
+            registros = np.fromfile(caminho_log, dtype=tipo, count=inteiros)
+        if len(registros):
+            posicoes = np.searchsorted(ids_base, registros['id'])
+            na_base = (posicoes < len(ids_base)) & (ids_base[np.minimum(posicoes, len(ids_base) - 1)] == registros['id']) \
+                if len(ids_base) else np.zeros(len(registros), dtype=bool)
+            vivos[posicoes[na_base]] = False
+            for registro in registros:
+                if registro['op'] == _ADICIONAR:
+                    extras[int(registro['id'])] = registro['vetor']
+                else:
+                    extras.pop(int(registro['id']), None)
+
+        ids_extras = np.fromiter(extras.keys(), dtype=np.int64, count=len(extras))
+        vetores_extras = np.array(list(extras.values()), dtype=np.float32).reshape(len(extras), meta['dimensao'])
+        self.meta = meta
+        self.visao = VisaoEmbeddings(base, escalas, vivos, vetores_extras)
+        self.ids = np.concatenate([np.asarray(ids_base)[vivos], ids_extras])
+        self._impressoes_base = (ids_base, impressoes_base, vivos)
+        self._impressoes_extras = {int(i): _impressao(v) for i, v in zip(ids_extras, vetores_extras)}
+        self._registros_log = len(registros)
+        return True
+
+    def _escrever_base(self, versao, ids, vetores):
+        """
+        Grava uma nova geração completa e passa a apontá-la em atual.json.
+        """
+        geracao = max([self.meta['geracao'] if self.meta else 0] + list(self._geracoes_em_disco().values())) + 1
+        prefixo = f"base-{geracao}"
+        ordem = np.argsort(ids)
+        ids, vetores = np.asarray(ids, dtype=np.int64)[ordem], np.asarray(vetores, dtype=np.float32)[ordem]
+        quantizados, escalas = _quantizar(vetores, self.formato)
+        np.save(self._caminho(f'{prefixo}.ids.npy'), ids)
+        np.save(self._caminho(f'{prefixo}.vetores.npy'), quantizados)
+        np.save(self._caminho(f'{prefixo}.impressoes.npy'),
+                np.array([_impressao(v) for v in vetores], dtype=np.int64))
+        if escalas is not None:
+            np.save(self._caminho(f'{prefixo}.escalas.npy'), escalas)
+        meta = {'geracao': geracao, 'versao': versao, 'formato': self.formato,
+                'dimensao': int(vetores.shape[1]), 'linhas': int(len(ids))}
+        temporario = self._caminho('atual.json.tmp')
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(meta, arquivo)
+        os.replace(temporario, self._caminho('atual.json'))
+        self._apagar_geracoes_antigas(geracao)
+
+    def _apagar_geracoes_antigas(self, atual):
+        """
+        Apaga os arquivos de gerações anteriores. Processos que ainda as mapeiam continuam
+        lendo normalmente (no Windows, arquivos em uso ficam para a próxima compactação).
+        """
+        for nome, geracao in self._geracoes_em_disco().items():
+            if geracao < atual:
+                try:
+                    os.remove(self._caminho(nome))
+                except OSError:
+                    pass
+
+    def _geracoes_em_disco(self):
+        """
+        Dicionário nome do arquivo -> geração, para os arquivos de base e de log da pasta.
+        """
+        geracoes = {}
+        for nome in os.listdir(self.diretorio):
+            if not nome.startswith(('base-', 'log-')):
+                continue
+            try:
+                geracoes[nome] = int(nome.split('-', 1)[1].split('.', 1)[0])
+            except ValueError:
+                continue
+        return geracoes
+
+    def _anexar_log(self, adicionados, removidos):
+        tipo = self._tipo_log(self.meta['dimensao'])
+        registros = np.zeros(len(removidos) + len(adicionados), dtype=tipo)
+        registros['op'][:len(removidos)] = _REMOVER
+        registros['id'][:len(removidos)] = removidos
+        for i, (usuario_id, vetor) in enumerate(adicionados, start=len(removidos)):
+            registros[i] = (_ADICIONAR, usuario_id, vetor)
+        with open(self._caminho(f"log-{self.meta['geracao']}.bin"), 'ab') as arquivo:
+            registros.tofile(arquivo)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    # --- Sincronização com o banco ---
+
+    def _impressoes(self):
+        """
+        Dicionário id -> impressão dos vetores vivos (montado só quando é preciso sincronizar).
+        """
+        if self._impressoes_base is None:
+            return {}
+        ids_base, impressoes_base, vivos = self._impressoes_base
+        impressoes = dict(zip(np.asarray(ids_base)[vivos].tolist(), np.asarray(impressoes_base)[vivos].tolist()))
+        impressoes.update(self._impressoes_extras)
+        return impressoes
+
+    def sincronizar(self, conn, versao):
+        """
+        Deixa o armazém igual aos embeddings devolvidos pela consulta para a versão `versao` do modelo.
+        Compara só as impressões (8 bytes por vetor) e lê do banco apenas os vetores novos ou
+        trocados, que vão para o log; com o log grande, ou se o modelo ou o formato mudou,
+        grava uma nova base. Retorna a quantidade de alterações aplicadas.
+        """
+        with _TravaArquivo(self._caminho('escrita.trava')):
+            self.abrir()
+            c = conn.cursor()
+            c.execute(f"SELECT chave, substr(embedding, 1, 8) FROM ({self.consulta})", {'versao': versao})
+            no_banco = {chave: int.from_bytes(inicio, 'little', signed=True) for chave, inicio in c.fetchall()}
+
+            atuais = self._impressoes()
+            compativel = self.meta is not None and self.meta['versao'] == versao and self.meta['formato'] == self.formato
+            removidos = [i for i in atuais if i not in no_banco] if compativel else []
+            alterados = [i for i, impressao in no_banco.items() if atuais.get(i) != impressao] \
+                if compativel else list(no_banco)
+            if compativel and not removidos and not alterados:
+                return 0
+
+            pendentes_log = self._registros_log + len(removidos) + len(alterados) if compativel else None
+            if not compativel or pendentes_log > max(LIMITE_LOG, FRACAO_LOG * (self.meta['linhas'] or 1)):
+                # Grava uma base nova com todos os embeddings do banco
+                c.execute(f"SELECT chave, embedding FROM ({self.consulta})", {'versao': versao})
+                linhas = c.fetchall()
+                if not linhas:
+                    # Nenhum embedding desta versão: o armazém fica vazio até a próxima sincronização
+                    if self.meta is not None:
+                        os.remove(self._caminho('atual.json'))
+                        self._apagar_geracoes_antigas(self.meta['geracao'] + 1)
+                    self.abrir()
+                    return len(atuais)
+                ids = [chave for chave, _ in linhas]
+                vetores = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in linhas])
+                self._escrever_base(versao, ids, vetores)
+                print(f"[EMBEDDINGS] Base compactada com {len(ids)} vetor(es) em {self.formato}.")
+            else:
+                adicionados = []
+                for inicio in range(0, len(alterados), 500):
+                    parte = alterados[inicio:inicio + 500]
+                    parametros = {f'c{i}': chave for i, chave in enumerate(parte)}
+                    parametros['versao'] = versao
+                    c.execute(
+                        f"SELECT chave, embedding FROM ({self.consulta}) "
+                        f"WHERE chave IN ({','.join(':' + nome for nome in parametros if nome != 'versao')})",
+                        parametros
+                    )
+                    adicionados.extend((chave, np.frombuffer(blob, dtype=np.float32)) for chave, blob in c.fetchall())
+                # Um vetor trocado é removido da base e readicionado no log
+                self._anexar_log(adicionados, removidos)
+            self.abrir()
+            return len(removidos) + len(alterados)
+
+    def aplicar(self, versao, adicionados=(), removidos=()):
+        """
+        Anexa ao log vetores já conhecidos ((chave, vetor float32), ex.: um modelo facial que
+        acabou de ser gravado) e remoções, sem consultar o banco. Retorna False, sem mudar nada,
+        se o armazém não estiver na versão `versao` do modelo: a próxima sincronização resolve.
+        """
+        with _TravaArquivo(self._caminho('escrita.trava')):
+            self.abrir()
+            if self.meta is None or self.meta['versao'] != versao or self.meta['formato'] != self.formato:
+                return False
+            self._anexar_log([(chave, np.asarray(vetor, dtype=np.float32)) for chave, vetor in adicionados],
+                             list(removidos))
+            self.abrir()
+            return True
+
+    def memoria_residente_estimada(self):
+        """
+        Bytes que este processo mantém fora do mapeamento compartilhado (ids, escalas e log).
+        """
+        if self.visao is None:
+            return 0
+        escalas = self.visao.escalas.nbytes if self.visao.escalas is not None else 0
+        return self.ids.nbytes + escalas + self.visao.extras.nbytes
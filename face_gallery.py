@@ -0,0 +1,482 @@
+# Importa bibliotecas necessárias para cálculo vetorial, banco de dados e extração de embeddings
+
+# Importa a biblioteca OS para verificar a existência das fotos cadastradas
+import os
+# Importa a biblioteca threading para carregar e aquecer o modelo em segundo plano
+import threading
+# Importa a biblioteca de tempo para medir quanto o carregamento do modelo demorou
+import time
+# Importa a classe namedtuple para devolver o resultado da busca de forma legível
+from collections import namedtuple
+# Importa a biblioteca NumPy para guardar a galeria em uma matriz e calcular as distâncias de uma só vez
+import numpy as np
+# Importa o histograma que mede o tempo de cada etapa do reconhecimento e o medidor de inicialização
+from metrics import ETAPAS, marcar_inicializacao
+# Importa os backends que geram os embeddings (DeepFace, ONNX Runtime ou uma função qualquer)
+from embedding_backends import criar_backend, BackendFuncao
+
+# --- CONFIGURAÇÕES ---
+# Distância de cosseno máxima para considerar duas faces da mesma pessoa (mesmo limiar do DeepFace para o Facenet512)
+LIMIAR_DISTANCIA = 0.30
+# Como os vários modelos faciais de um usuário são comparados: 'melhor' (o mais próximo decide)
+# ou 'centroide' (uma média por usuário; gasta menos na busca, mas tira a galeria do mapeamento em disco)
+AGREGACAO_MODELOS = 'melhor'
+
+# Todos os modelos faciais da versão atual do modelo: a foto principal de cada usuário
+# (chave = id do usuário) e os modelos extras de ModelosFaciais (chave = -id do modelo)
+CONSULTA_MODELOS = '''
+    SELECT id AS chave, id AS usuario_id, embedding FROM Usuarios
+    WHERE embedding IS NOT NULL AND modelo_embedding = :versao
+    UNION ALL
+    SELECT -m.id, m.usuario_id, m.embedding FROM ModelosFaciais m JOIN Usuarios u ON u.id = m.usuario_id
+    WHERE m.embedding IS NOT NULL AND m.modelo_embedding = :versao
+'''
+
+# Backend que gera os embeddings neste processo (escolhido por FACEIN_BACKEND; nada pesado é carregado aqui)
+_backend = criar_backend()
+
+# Identificação do modelo salva junto com cada embedding; se mudar, os embeddings são recalculados
+VERSAO_MODELO = _backend.versao
+
+def usar_backend(backend):
+    """
+    Troca o backend de embeddings do processo. A versão dele passa a identificar os embeddings
+    no banco, para que vetores de modelos diferentes nunca sejam misturados.
+    """
+    global _backend, VERSAO_MODELO, _modelo_carregado
+    _backend = backend
+    VERSAO_MODELO = backend.versao
+    _modelo_carregado = False
+
+def usar_gerador_embeddings(funcao, versao):
+    """
+    Troca o modelo de reconhecimento por uma função que recebe uma lista de imagens e devolve
+    uma matriz de vetores (ex.: o stub dos benchmarks).
+    """
+    usar_backend(BackendFuncao(funcao, versao))
+
+def obter_backend():
+    """
+    Retorna o backend de embeddings em uso neste processo.
+    """
+    return _backend
+
+# Resultado de uma busca na galeria: melhor candidato, distância dele e folga para o segundo colocado
+# (chave identifica qual modelo facial do usuário ficou mais próximo)
+ResultadoBusca = namedtuple('ResultadoBusca', ['usuario_id', 'distancia', 'margem', 'chave'], defaults=(None,))
+
+# Estado do modelo no processo: 'parado', 'carregando', 'pronto' ou 'falhou'
+_estado_modelo = 'parado'
+_modelo_carregado = False
+_erro_modelo = None
+_modelo_pronto = threading.Event()
+_trava_modelo = threading.Lock()
+_thread_aquecimento = None
+
+def carregar_modelo():
+    """
+    Carrega o modelo do backend na memória do processo atual.
+    Se outra thread já estiver carregando, espera por ela em vez de carregar de novo.
+    """
+    global _modelo_carregado, _estado_modelo, _erro_modelo
+    if _modelo_carregado:
+        return _backend
+    with _trava_modelo:
+        if not _modelo_carregado:
+            _estado_modelo = 'carregando'
+            try:
+                _backend.carregar()
+            except Exception as erro:
+                _estado_modelo, _erro_modelo = 'falhou', erro
+                raise
+            _modelo_carregado = True
+    return _backend
+
+def aquecer_modelo():
+    """
+    Carrega o modelo e passa uma imagem fictícia pelo pré-processamento e pela rede,
+    para que a primeira pessoa no portão não pague a montagem do grafo nem a criação do detector.
+    Retorna o tempo gasto em segundos.
+    """
+    global _estado_modelo, _erro_modelo
+    inicio = time.perf_counter()
+    try:
+        carregar_modelo().aquecer()
+    except Exception as erro:
+        _estado_modelo, _erro_modelo = 'falhou', erro
+        _modelo_pronto.set()
+        raise
+    duracao = time.perf_counter() - inicio
+    _estado_modelo = 'pronto'
+    marcar_inicializacao('modelo_pronto')
+    _modelo_pronto.set()
+    return duracao
+
+def iniciar_aquecimento():
+    """
+    Carrega e aquece o modelo em uma thread em segundo plano (apenas uma vez por processo).
+    Retorna a thread.
+    """
+    global _thread_aquecimento
+    with _trava_modelo:
+        if _thread_aquecimento is None:
+            def executar():
+                try:
+                    duracao = aquecer_modelo()
+                    print(f"[MODELO] {VERSAO_MODELO} pronto em {duracao:.1f}s.")
+                except Exception as erro:
+                    print(f"[ERRO] Falha ao carregar o modelo de reconhecimento: {erro}")
+            _thread_aquecimento = threading.Thread(target=executar, name='aquecimento-modelo', daemon=True)
+            _thread_aquecimento.start()
+    return _thread_aquecimento
+
+def estado_modelo():
+    """
+    Retorna o estado do modelo neste processo: 'parado', 'carregando', 'pronto' ou 'falhou'.
+    """
+    if _estado_modelo == 'parado' and _thread_aquecimento is not None:
+        return 'carregando'
+    return _estado_modelo
+
+def aguardar_modelo(timeout=None):
+    """
+    Espera o aquecimento em segundo plano terminar. Retorna True se o modelo ficou pronto.
+    """
+    _modelo_pronto.wait(timeout)
+    return _estado_modelo == 'pronto'
+
+def gerar_embeddings_lote(imagens):
+    """
+    Gera os embeddings normalizados de várias imagens com uma única chamada ao modelo.
+    Aceita caminhos de arquivo ou imagens BGR carregadas pelo OpenCV.
+    Retorna uma matriz (quantidade de imagens x dimensão).
+    """
+    # Rostos que chegam enquanto o modelo aquece em segundo plano esperam aqui, em vez de falhar
+    if _thread_aquecimento is not None and not _modelo_pronto.is_set():
+        _modelo_pronto.wait()
+    backend = carregar_modelo()
+    with ETAPAS.medir('preprocessamento'):
+        lote = backend.preparar(imagens)
+    with ETAPAS.medir('modelo'):
+        vetores = backend.inferir(lote)
+    # Normaliza os vetores para que a distância de cosseno vire um simples produto escalar
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    normas[normas == 0] = 1
+    return vetores / normas
+
+def gerar_embedding(imagem):
+    """
+    Gera o embedding normalizado (norma 1) de uma imagem de rosto.
+    Aceita tanto o caminho de um arquivo quanto uma imagem BGR já carregada pelo OpenCV.
+    """
+    return gerar_embeddings_lote([imagem])[0]
+
+def embedding_para_blob(vetor):
+    """
+    Converte um embedding em bytes para ser salvo em uma coluna BLOB.
+    """
+    return np.asarray(vetor, dtype=np.float32).tobytes()
+
+def blob_para_embedding(blob):
+    """
+    Converte os bytes salvos no banco de volta em um embedding.
+    """
+    return np.frombuffer(blob, dtype=np.float32)
+
+def atualizar_embeddings(conn):
+    """
+    Gera e salva o embedding de cada usuário (e de cada modelo facial extra) que ainda não tem um,
+    ou cujo embedding foi gerado por outra versão do modelo.
+    Retorna a quantidade de embeddings atualizados.
+    """
+    c = conn.cursor()
+    c.execute('''
+        SELECT id, nome_completo, caminho_foto_rosto FROM Usuarios
+        WHERE embedding IS NULL OR modelo_embedding IS NULL OR modelo_embedding != ?
+    ''', (VERSAO_MODELO,))
+    pendentes = c.fetchall()
+
+    atualizados = 0
+    for user_id, nome, arquivo_rosto_db in pendentes:
+        # Pula se a imagem do rosto do usuário não existir
+        if not arquivo_rosto_db or not os.path.exists(arquivo_rosto_db):
+            print(f"[AVISO] Foto de {nome} não encontrada em '{arquivo_rosto_db}'.")
+            continue
+        try:
+            vetor = gerar_embedding(arquivo_rosto_db)
+        except Exception as e:
+            print(f"[ERRO] Não foi possível gerar o embedding de {nome}. Detalhe: {e}")
+            continue
+        c.execute(
+            "UPDATE Usuarios SET embedding = ?, modelo_embedding = ? WHERE id = ?",
+            (embedding_para_blob(vetor), VERSAO_MODELO, user_id)
+        )
+        atualizados += 1
+
+    # Modelos extras: capturas cuja foto já foi apagada pela retenção não podem ser recalculadas e saem
+    c.execute('''
+        SELECT id, caminho_foto, origem FROM ModelosFaciais
+        WHERE embedding IS NULL OR modelo_embedding IS NULL OR modelo_embedding != ?
+    ''', (VERSAO_MODELO,))
+    for modelo_id, caminho, origem in c.fetchall():
+        if not caminho or not os.path.exists(caminho):
+            if origem == 'captura':
+                c.execute("DELETE FROM ModelosFaciais WHERE id = ?", (modelo_id,))
+            else:
+                print(f"[AVISO] Foto do modelo facial {modelo_id} não encontrada em '{caminho}'.")
+            continue
+        try:
+            vetor = gerar_embedding(caminho)
+        except Exception as e:
+            print(f"[ERRO] Não foi possível gerar o embedding do modelo facial {modelo_id}. Detalhe: {e}")
+            continue
+        c.execute(
+            "UPDATE ModelosFaciais SET embedding = ?, modelo_embedding = ? WHERE id = ?",
+            (embedding_para_blob(vetor), VERSAO_MODELO, modelo_id)
+        )
+        atualizados += 1
+
+    conn.commit()
+    if atualizados:
+        print(f"[GALERIA] {atualizados} embedding(s) gerado(s).")
+    return atualizados
+
+def _ler_usuarios(conn):
+    """
+    Dicionário id -> (nome_completo, tipo, situacao) de todos os usuários.
+    """
+    c = conn.cursor()
+    c.execute("SELECT id, nome_completo, tipo, situacao FROM Usuarios")
+    return {user_id: (nome, tipo_usuario, situacao) for user_id, nome, tipo_usuario, situacao in c.fetchall()}
+
+class Galeria:
+    """
+    Mantém os embeddings de todos os modelos faciais em uma única matriz NumPy,
+    permitindo comparar um rosto com a galeria inteira em uma só operação.
+    Um usuário pode ocupar várias linhas (foto principal e modelos extras); a busca
+    devolve o usuário do modelo mais próximo e a margem para o melhor de outro usuário.
+    """
+
+    def __init__(self, ids, matriz, usuarios, chaves=None):
+        # ID do usuário dono de cada linha da matriz
+        self.ids = np.asarray(ids, dtype=np.int64)
+        # Chave do modelo facial de cada linha (id do usuário para a foto principal, -id em ModelosFaciais)
+        self.chaves = self.ids if chaves is None else np.asarray(chaves, dtype=np.int64)
+        # Matriz (N x dimensão) com um embedding normalizado por linha
+        self.matriz = matriz
+        # Dicionário id -> (nome_completo, tipo, situacao)
+        self.usuarios = usuarios
+        # Índice aproximado opcional (ver ann_index.py); sem ele a busca é exata
+        self.indice = None
+        # Sem usuários repetidos, a busca usa o caminho rápido dos dois menores valores
+        self.um_por_usuario = len(np.unique(self.ids)) == len(self.ids)
+        self._dono_da_chave = None if self.um_por_usuario else dict(zip(self.chaves.tolist(), self.ids.tolist()))
+        # Quantas vezes cada modelo facial decidiu um reconhecimento (usado para descartar os menos úteis)
+        self.usos = {}
+        # Armazém de onde a matriz foi mapeada (ver do_armazem), usado nas alterações incrementais
+        self.armazem = None
+
+    @classmethod
+    def carregar(cls, conn):
+        """
+        Lê do banco todos os modelos faciais que já possuem embedding da versão atual do modelo.
+        """
+        c = conn.cursor()
+        c.execute(CONSULTA_MODELOS, {'versao': VERSAO_MODELO})
+        chaves, ids, vetores = [], [], []
+        for chave, user_id, blob in c.fetchall():
+            chaves.append(chave)
+            ids.append(user_id)
+            vetores.append(blob_para_embedding(blob))
+
+        if vetores:
+            matriz = np.vstack(vetores)
+        else:
+            matriz = np.empty((0, 0), dtype=np.float32)
+        galeria = cls(ids, matriz, _ler_usuarios(conn), chaves)
+        print(f"[GALERIA] {len(set(ids))} usuário(s) e {len(ids)} modelo(s) facial(is) carregado(s) na galeria.")
+        return galeria
+
+    @classmethod
+    def do_armazem(cls, armazem, conn):
+        """
+        Monta a galeria sobre o armazém de embeddings (ver embedding_store.py), depois de
+        sincronizá-lo com o banco: a matriz fica mapeada do disco e é compartilhada entre
+        os processos, em vez de ser copiada dos BLOBs para a memória de cada um.
+        O armazém deve usar CONSULTA_MODELOS.
+        """
+        armazem.sincronizar(conn, VERSAO_MODELO)
+        if armazem.visao is None:
+            chaves, matriz = np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        else:
+            chaves, matriz = armazem.ids, armazem.visao
+        # Chaves positivas são o próprio usuário; as negativas são modelos extras
+        ids = chaves.copy()
+        extras = chaves < 0
+        if extras.any():
+            c = conn.cursor()
+            c.execute("SELECT -id, usuario_id FROM ModelosFaciais")
+            dono = dict(c.fetchall())
+            ids[extras] = [dono.get(int(chave), 0) for chave in chaves[extras]]
+        galeria = cls(ids, matriz, _ler_usuarios(conn), chaves)
+        galeria.armazem = armazem
+        print(f"[GALERIA] {len(np.unique(ids))} usuário(s) e {len(ids)} modelo(s) facial(is) carregado(s) "
+              f"na galeria ({armazem.formato}, mapeada do disco).")
+        return galeria
+
+    def com_modelos(self, adicionados=(), removidos=(), conn=None):
+        """
+        Retorna uma nova galeria com os modelos `adicionados` ((chave, usuario_id, embedding)) e sem
+        as chaves `removidos`, sem recarregar a galeria: o armazém e o índice (se houver) recebem só
+        as alterações. A galeria atual continua válida para as buscas que já estão em andamento.
+        O armazém é compartilhado, então também traz o que outros processos anexaram ao log;
+        o dono desses modelos é lido de ModelosFaciais por `conn`.
+        Retorna None se a galeria precisar ser recarregada (o armazém recusou a alteração ou há
+        modelos de outros processos cujo dono não pôde ser resolvido).
+        """
+        existentes = set(self.chaves.tolist())
+        adicionados = [(int(chave), int(dono), np.asarray(vetor, dtype=np.float32))
+                       for chave, dono, vetor in adicionados if int(chave) not in existentes]
+        removidos = [int(chave) for chave in removidos if int(chave) in existentes]
+        if not adicionados and not removidos:
+            return self
+
+        donos = dict(zip(self.chaves.tolist(), self.ids.tolist()))
+        for chave, dono, _ in adicionados:
+            donos[chave] = dono
+
+        if self.armazem is not None:
+            if not self.armazem.aplicar(VERSAO_MODELO, [(chave, vetor) for chave, _, vetor in adicionados], removidos):
+                return None
+            chaves, matriz = self.armazem.ids, self.armazem.visao
+        else:
+            manter = ~np.isin(self.chaves, removidos)
+            chaves = np.concatenate([self.chaves[manter], [chave for chave, _, _ in adicionados]]).astype(np.int64)
+            atual = np.asarray(self.matriz)[manter] if len(self) else np.empty((0, 0), dtype=np.float32)
+            novos = [vetor[None, :] for _, _, vetor in adicionados]
+            matriz = np.vstack(([atual] if len(atual) else []) + novos) if novos else atual
+
+        lista_chaves = chaves.tolist()
+        # Chaves anexadas por outros processos: positivas são o próprio usuário, negativas vêm de ModelosFaciais
+        desconhecidas = [chave for chave in lista_chaves if chave not in donos]
+        for chave in desconhecidas:
+            if chave > 0:
+                donos[chave] = chave
+        negativas = [-chave for chave in desconhecidas if chave < 0]
+        if negativas:
+            if conn is None:
+                return None
+            for inicio in range(0, len(negativas), 500):
+                parte = negativas[inicio:inicio + 500]
+                c = conn.cursor()
+                c.execute(f"SELECT -id, usuario_id FROM ModelosFaciais WHERE id IN ({','.join('?' * len(parte))})",
+                          parte)
+                donos.update(c.fetchall())
+        ids = [donos.get(chave) for chave in lista_chaves]
+        if any(dono is None or dono not in self.usuarios for dono in ids):
+            # Modelo apagado nesse meio tempo ou usuário que esta galeria ainda não conhece
+            return None
+
+        galeria = Galeria(ids, matriz, self.usuarios, chaves)
+        galeria.armazem = self.armazem
+        # Os usos ainda não gravados no banco continuam sendo contados
+        galeria.usos = self.usos
+        galeria.indice = self.indice
+        if self.indice is not None:
+            # Além das alterações deste processo, o índice recebe as que vieram pelo armazém
+            atuais = set(lista_chaves)
+            for chave in existentes - atuais:
+                self.indice.remover(chave)
+            for i, chave in enumerate(lista_chaves):
+                if chave not in existentes:
+                    self.indice.adicionar(chave, matriz[i])
+        return galeria
+
+    def por_centroide(self):
+        """
+        Retorna uma nova galeria com uma linha por usuário: a média normalizada dos seus modelos.
+        """
+        if self.um_por_usuario or len(self) == 0:
+            return self
+        matriz = self.matriz.como_float32() if hasattr(self.matriz, 'como_float32') else np.asarray(self.matriz)
+        donos, posicoes = np.unique(self.ids, return_inverse=True)
+        somas = np.zeros((len(donos), matriz.shape[1]), dtype=np.float32)
+        np.add.at(somas, posicoes, matriz)
+        normas = np.linalg.norm(somas, axis=1, keepdims=True)
+        normas[normas == 0] = 1
+        return Galeria(donos, somas / normas, self.usuarios)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def modelos_do_usuario(self, usuario_id):
+        """
+        Posições (linhas da matriz) dos modelos faciais de um usuário.
+        """
+        return np.flatnonzero(self.ids == usuario_id)
+
+    def distancias(self, embedding):
+        """
+        Calcula a distância de cosseno entre o embedding e todos os rostos da galeria de uma vez.
+        """
+        return 1.0 - self.matriz @ embedding
+
+    def buscar(self, embedding):
+        """
+        Retorna o usuário mais próximo do embedding, a distância até ele e a margem
+        para o segundo colocado. Retorna None se a galeria estiver vazia.
+        """
+        with ETAPAS.medir('comparacao'):
+            resultado = self._buscar(embedding)
+        if resultado is not None and resultado.distancia <= LIMIAR_DISTANCIA:
+            self.usos[resultado.chave] = self.usos.get(resultado.chave, 0) + 1
+        return resultado
+
+    def _dono(self, chave):
+        if self._dono_da_chave is None:
+            return chave if chave in self.usuarios else None
+        return self._dono_da_chave.get(chave)
+
+    def _buscar(self, embedding):
+        if len(self) == 0:
+            return None
+
+        if self.indice is not None:
+            # O índice guarda chaves de modelos; busca alguns a mais para achar dois usuários diferentes
+            chaves, distancias = self.indice.buscar(embedding, k=2 if self.um_por_usuario else 8)
+            if len(chaves) == 0:
+                return None
+            # O índice é compartilhado com as galerias mais novas (ver com_modelos): chaves que
+            # esta galeria não conhece entraram depois dela e são ignoradas
+            encontrados = [(self._dono(int(ch)), int(ch), float(d)) for ch, d in zip(chaves, distancias)]
+            encontrados = [item for item in encontrados if item[0] is not None]
+            if not encontrados:
+                return None
+            dono, chave, distancia = encontrados[0]
+            segundo = next((d for outro, _, d in encontrados if outro != dono), None)
+            margem = segundo - distancia if segundo is not None else float('inf')
+            return ResultadoBusca(dono, distancia, margem, chave)
+
+        distancias = self.distancias(embedding)
+        if len(distancias) == 1:
+            return ResultadoBusca(int(self.ids[0]), float(distancias[0]), float('inf'), int(self.chaves[0]))
+
+        if not self.um_por_usuario:
+            # Vários modelos por usuário: o mais próximo decide, e a margem é para o melhor de outro usuário
+            melhor = int(np.argmin(distancias))
+            dono = self.ids[melhor]
+            outros = distancias[self.ids != dono]
+            margem = float(outros.min() - distancias[melhor]) if len(outros) else float('inf')
+            return ResultadoBusca(int(dono), float(distancias[melhor]), margem, int(self.chaves[melhor]))
+
+        # Separa apenas os dois menores valores, sem ordenar a galeria toda
+        dois_melhores = np.argpartition(distancias, 1)[:2]
+        if distancias[dois_melhores[1]] < distancias[dois_melhores[0]]:
+            dois_melhores = dois_melhores[::-1]
+        melhor, segundo = dois_melhores
+        return ResultadoBusca(
+            int(self.ids[melhor]),
+            float(distancias[melhor]),
+            float(distancias[segundo] - distancias[melhor]),
+            int(self.chaves[melhor])
+        )
@@ -0,0 +1,120 @@
+# Importa bibliotecas necessárias para avaliar a qualidade dos rostos recortados
+
+# Importa a biblioteca OpenCV para calcular a nitidez (variância do Laplaciano)
+import cv2
+# Importa a biblioteca threading para proteger os candidatos (acessados por mais de uma thread no servidor)
+import threading
+
+# --- CONFIGURAÇÕES ---
+# Variância do Laplaciano a partir da qual o rosto é considerado totalmente nítido
+NITIDEZ_REFERENCIA = 120.0
+# Lado (em pixels) a partir do qual o rosto é considerado grande o suficiente
+TAMANHO_REFERENCIA = 112
+# Abaixo deste lado (em pixels) o rosto é pequeno demais para ser reconhecido
+TAMANHO_MINIMO = 40
+# Janela (em segundos) em que o melhor recorte de cada pessoa é escolhido
+JANELA_SELECAO = 0.6
+# Se nenhum recorte atingir a qualidade mínima, envia o melhor mesmo assim após esta janela
+JANELA_MAXIMA = 2.0
+# Qualidade mínima para enviar o recorte ao fim da janela normal
+QUALIDADE_MINIMA = 0.35
+# Qualidade a partir da qual o recorte é enviado imediatamente, sem esperar a janela
+QUALIDADE_EXCELENTE = 0.85
+
+def nitidez(recorte):
+    """
+    Mede a nitidez do recorte pela variância do Laplaciano (imagens borradas têm valor baixo).
+    """
+    cinza = cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY)
+    return cv2.Laplacian(cinza, cv2.CV_64F).var()
+
+def frontalidade(deteccao):
+    """
+    Estima, pelos pontos-chave do MediaPipe, o quanto o rosto está de frente (1) ou de perfil (0):
+    compara a posição do nariz com o ponto médio entre os olhos.
+    """
+    pontos = deteccao.location_data.relative_keypoints
+    if len(pontos) < 3:
+        return 1.0
+    olho_direito, olho_esquerdo, nariz = pontos[0], pontos[1], pontos[2]
+    distancia_olhos = abs(olho_esquerdo.x - olho_direito.x)
+    if distancia_olhos <= 1e-6:
+        return 0.0
+    meio_x = (olho_esquerdo.x + olho_direito.x) / 2
+    desvio = abs(nariz.x - meio_x) / distancia_olhos
+    # Desvio de meia distância entre os olhos já é um rosto praticamente de perfil
+    return max(0.0, 1.0 - 2.0 * desvio)
+
+def pontuar_qualidade(recorte, deteccao):
+    """
+    Calcula uma nota de 0 a 1 para o recorte, combinando nitidez, tamanho em pixels,
+    confiança do MediaPipe e pose. Retorna (nota, detalhes).
+    """
+    altura, largura = recorte.shape[:2]
+    lado = min(altura, largura)
+    detalhes = {
+        'nitidez': nitidez(recorte),
+        'tamanho': lado,
+        'confianca': float(deteccao.score[0]) if deteccao.score else 0.0,
+        'frontalidade': frontalidade(deteccao),
+    }
+    if lado < TAMANHO_MINIMO:
+        return 0.0, detalhes
+
+    nota = (
+        min(1.0, detalhes['nitidez'] / NITIDEZ_REFERENCIA)
+        * min(1.0, lado / TAMANHO_REFERENCIA)
+        * detalhes['confianca']
+        * detalhes['frontalidade']
+    )
+    # Média geométrica: um único critério ruim derruba a nota, mas sem zerar rostos medianos
+    return nota ** 0.25, detalhes
+
+class SeletorMelhorRecorte:
+    """
+    Guarda, para cada pessoa (rastro), o recorte com a melhor nota dentro de uma janela curta
+    e o libera para verificação só ao fim da janela (ou antes, se a nota for excelente).
+    """
+
+    def __init__(self, janela=JANELA_SELECAO, janela_maxima=JANELA_MAXIMA,
+                 qualidade_minima=QUALIDADE_MINIMA, qualidade_excelente=QUALIDADE_EXCELENTE):
+        self.janela = janela
+        self.janela_maxima = janela_maxima
+        self.qualidade_minima = qualidade_minima
+        self.qualidade_excelente = qualidade_excelente
+        # rastro_id -> [início da janela, melhor nota, melhor recorte]
+        self._candidatos = {}
+        self._trava = threading.Lock()
+
+    def oferecer(self, rastro_id, recorte, nota, agora):
+        """
+        Considera um novo recorte do rastro e retorna o melhor recorte se ele já deve ser verificado
+        (ou None se ainda vale esperar por um frame melhor).
+        """
+        with self._trava:
+            candidato = self._candidatos.get(rastro_id)
+            if candidato is None:
+                candidato = [agora, -1.0, None]
+                self._candidatos[rastro_id] = candidato
+            if nota > candidato[1]:
+                candidato[1], candidato[2] = nota, recorte
+
+            inicio, melhor_nota, melhor_recorte = candidato
+            decorrido = agora - inicio
+            pronto = (
+                melhor_nota >= self.qualidade_excelente
+                or (decorrido >= self.janela and melhor_nota >= self.qualidade_minima)
+                or (decorrido >= self.janela_maxima and melhor_nota > 0)
+            )
+            if not pronto:
+                return None
+            del self._candidatos[rastro_id]
+            return melhor_recorte
+
+    def limpar(self, rastros_ativos):
+        """
+        Esquece os candidatos de rastros que não existem mais.
+        """
+        with self._trava:
+            for rastro_id in [i for i in self._candidatos if i not in rastros_ativos]:
+                del self._candidatos[rastro_id]
@@ -0,0 +1,148 @@
+# Importa bibliotecas necessárias para manter vários modelos faciais (fotos de referência) por usuário
+
+# Importa a biblioteca OS para conferir as fotos informadas na linha de comando
+import os
+# Importa a biblioteca sqlite3 para gravar os modelos faciais
+import sqlite3
+# Importa a biblioteca argparse para ler as opções da linha de comando
+import argparse
+# Importa as classes de data para registrar quando cada modelo foi criado ou usado
+from datetime import datetime, timedelta
+# Importa a biblioteca NumPy para medir a distância do novo rosto aos modelos já guardados
+import numpy as np
+
+# Importa funções internas do sistema
+
+# Importa a função que cria o banco de dados e tabelas
+from database_setup import criar_banco_de_dados
+# Importa a geração de embeddings e a versão do modelo gravada junto com cada um
+import face_gallery
+
+# --- CONFIGURAÇÕES ---
+# Define diretório base onde está o arquivo atual
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Caminho completo do banco de dados SQLite
+db_path = os.path.join(BASE_DIR, 'database.db')
+# Máximo de modelos extras por usuário (além da foto principal de Usuarios)
+MAXIMO_MODELOS_POR_USUARIO = 5
+# Se ligado, capturas 'Aceito' muito confiáveis viram novos modelos do usuário
+INCORPORAR_CAPTURAS = False
+# Distância máxima (bem abaixo de LIMIAR_DISTANCIA) para uma captura ser incorporada
+LIMIAR_INCORPORACAO = 0.15
+# Margem mínima para o segundo usuário mais próximo (evita incorporar um rosto ambíguo)
+MARGEM_INCORPORACAO = 0.15
+# Distância mínima para todos os modelos do usuário: capturas quase iguais não acrescentam nada
+NOVIDADE_MINIMA = 0.05
+# Intervalo mínimo (em horas) entre duas incorporações do mesmo usuário
+INTERVALO_INCORPORACAO_HORAS = 24
+
+def _agora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def adicionar_modelo(conn, usuario_id, caminho_foto, origem='cadastro', embedding=None):
+    """
+    Grava um novo modelo facial do usuário. Sem embedding, ele é gerado na próxima
+    carga da galeria (ver atualizar_embeddings). Retorna o id do modelo.
+    """
+    blob = face_gallery.embedding_para_blob(embedding) if embedding is not None else None
+    versao = face_gallery.VERSAO_MODELO if embedding is not None else None
+    c = conn.cursor()
+    c.execute('''
+        INSERT INTO ModelosFaciais (usuario_id, caminho_foto, origem, embedding, modelo_embedding, criado_em)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (usuario_id, caminho_foto, origem, blob, versao, _agora()))
+    conn.commit()
+    return c.lastrowid
+
+def registrar_usos(conn, galeria):
+    """
+    Soma ao banco os usos de cada modelo extra contados pela galeria desde a última chamada.
+    """
+    usos, galeria.usos = galeria.usos, {}
+    extras = [(quantidade, -chave) for chave, quantidade in usos.items() if chave is not None and chave < 0]
+    if extras:
+        agora = _agora()
+        conn.executemany(
+            "UPDATE ModelosFaciais SET usos = usos + ?, ultimo_uso = ? WHERE id = ?",
+            [(quantidade, agora, modelo_id) for quantidade, modelo_id in extras]
+        )
+        conn.commit()
+
+def _descartar_excedentes(conn, usuario_id, maximo, manter=None):
+    """
+    Remove os modelos vindos de capturas menos usados (no empate, os mais antigos)
+    até o usuário ficar com no máximo `maximo` modelos extras. Fotos de cadastro nunca saem,
+    nem o modelo `manter` (o que acabou de entrar ainda não teve chance de ser usado).
+    Retorna a lista de ids dos modelos removidos.
+    """
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM ModelosFaciais WHERE usuario_id = ?", (usuario_id,))
+    excedentes = c.fetchone()[0] - maximo
+    if excedentes <= 0:
+        return []
+    c.execute('''
+        SELECT id FROM ModelosFaciais WHERE usuario_id = ? AND origem = 'captura' AND id IS NOT ?
+        ORDER BY usos, COALESCE(ultimo_uso, criado_em), id LIMIT ?
+    ''', (usuario_id, manter, excedentes))
+    descartados = [modelo_id for modelo_id, in c.fetchall()]
+    c.executemany("DELETE FROM ModelosFaciais WHERE id = ?", [(modelo_id,) for modelo_id in descartados])
+    return descartados
+
+def incorporar_captura(conn, galeria, resultado, embedding, caminho_captura):
+    """
+    Guarda a captura como novo modelo do usuário reconhecido se ela for muito confiável,
+    trouxer informação nova (o rosto mudou: corte de cabelo, óculos, iluminação) e o
+    usuário não tiver recebido outra recentemente. Se passar do limite de modelos,
+    descarta os menos úteis. Retorna (id do novo modelo, ids dos modelos descartados),
+    para a galeria em memória ser atualizada sem recarregar (ver Galeria.com_modelos),
+    ou None se a captura não foi incorporada.
+    """
+    if resultado is None or resultado.distancia > LIMIAR_INCORPORACAO or resultado.margem < MARGEM_INCORPORACAO:
+        return None
+    usuario_id = resultado.usuario_id
+
+    # Perto demais de algum modelo já guardado: não acrescenta nada
+    linhas = galeria.modelos_do_usuario(usuario_id)
+    if len(linhas):
+        proximidade = max(float(np.dot(galeria.matriz[i], embedding)) for i in linhas)
+        if 1.0 - proximidade < NOVIDADE_MINIMA:
+            return None
+
+    c = conn.cursor()
+    limite = (datetime.now() - timedelta(hours=INTERVALO_INCORPORACAO_HORAS)).strftime('%Y-%m-%d %H:%M:%S')
+    c.execute('''
+        SELECT 1 FROM ModelosFaciais WHERE usuario_id = ? AND origem = 'captura' AND criado_em > ? LIMIT 1
+    ''', (usuario_id, limite))
+    if c.fetchone():
+        return None
+
+    # Os usos decidem quem sai, então precisam estar no banco antes do descarte
+    registrar_usos(conn, galeria)
+    modelo_id = adicionar_modelo(conn, usuario_id, caminho_captura, 'captura', embedding)
+    descartados = _descartar_excedentes(conn, usuario_id, MAXIMO_MODELOS_POR_USUARIO, manter=modelo_id)
+    conn.commit()
+    return modelo_id, descartados
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Adiciona fotos de referência extras a um usuário.')
+    parser.add_argument('matricula', help='Matrícula do usuário')
+    parser.add_argument('fotos', nargs='+', help='Fotos do rosto (já recortadas)')
+    args = parser.parse_args()
+
+    criar_banco_de_dados(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        linha = conn.execute("SELECT id, nome_completo FROM Usuarios WHERE matricula = ?", (args.matricula,)).fetchone()
+        if linha is None:
+            raise SystemExit(f"[ERRO] Matrícula {args.matricula} não encontrada.")
+        usuario_id, nome = linha
+        for foto in args.fotos:
+            if not os.path.exists(foto):
+                print(f"[AVISO] Foto '{foto}' não encontrada.")
+                continue
+            adicionar_modelo(conn, usuario_id, os.path.abspath(foto))
+            print(f"[MODELOS] Foto '{foto}' adicionada a {nome}.")
+        # Gera os embeddings agora, para a próxima carga da galeria não esperar pelo modelo
+        face_gallery.atualizar_embeddings(conn)
+    finally:
+        conn.close()
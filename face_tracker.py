@@ -0,0 +1,170 @@
+# Importa bibliotecas necessárias para acompanhar os rostos entre um frame e outro
+
+# Importa a biblioteca threading para proteger os rastros (o resultado chega de outra thread)
+import threading
+# Importa a biblioteca itertools para gerar IDs de rastreio sequenciais
+import itertools
+# Importa o contador de rostos que dispensaram verificação graças à identidade em cache
+from metrics import CACHE_IDENTIDADE
+
+# --- CONFIGURAÇÕES ---
+# IoU mínima para considerar que duas caixas em frames seguidos são o mesmo rosto
+LIMIAR_IOU = 0.3
+# Distância máxima entre centros (em múltiplos da largura da caixa) para o casamento por centróide
+LIMIAR_CENTROIDE = 0.6
+# Tempo (em segundos) sem ver um rosto até o rastro ser encerrado
+TEMPO_PERDIDO = 1.0
+# Tempo (em segundos) que a identidade reconhecida continua válida para o rastro
+TTL_IDENTIDADE = 30.0
+# Espera (em segundos) antes de tentar de novo quando o rosto não foi reconhecido
+INTERVALO_NOVA_TENTATIVA = 3.0
+# Tempo máximo (em segundos) esperando um resultado antes de considerar o pedido perdido
+TEMPO_MAXIMO_PENDENTE = 10.0
+
+def iou(a, b):
+    """
+    Calcula a interseção sobre união entre duas caixas (x1, y1, x2, y2).
+    """
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    intersecao = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if intersecao == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return intersecao / float(area_a + area_b - intersecao)
+
+def _distancia_centros(a, b):
+    """
+    Distância entre os centros de duas caixas, relativa à largura da caixa a.
+    """
+    cx_a, cy_a = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    cx_b, cy_b = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    largura = max(1, a[2] - a[0])
+    return ((cx_a - cx_b) ** 2 + (cy_a - cy_b) ** 2) ** 0.5 / largura
+
+class Rastro:
+    """
+    Um rosto acompanhado ao longo dos frames, com a identidade reconhecida em cache.
+    """
+
+    def __init__(self, rastro_id, caixa, agora):
+        self.id = rastro_id
+        self.caixa = caixa
+        self.criado_em = agora
+        self.ultimo_visto = agora
+        # Último ResultadoVerificacao do rastro e até quando ele vale
+        self.identidade = None
+        self.identidade_expira = 0.0
+        # Momento em que um pedido de verificação foi enviado (None se não há pedido em andamento)
+        self.pendente_desde = None
+        self.ultima_tentativa = None
+
+class RastreadorFaces:
+    """
+    Associa as detecções do MediaPipe entre frames (por IoU e, em último caso, por centróide)
+    e decide quando cada rastro precisa ser verificado: uma vez quando aparece e de novo
+    apenas quando a identidade em cache expira ou o reconhecimento falhou.
+    """
+
+    def __init__(self, limiar_iou=LIMIAR_IOU, tempo_perdido=TEMPO_PERDIDO, ttl_identidade=TTL_IDENTIDADE,
+                 intervalo_nova_tentativa=INTERVALO_NOVA_TENTATIVA):
+        self.limiar_iou = limiar_iou
+        self.tempo_perdido = tempo_perdido
+        self.ttl_identidade = ttl_identidade
+        self.intervalo_nova_tentativa = intervalo_nova_tentativa
+        self.rastros = {}
+        self._proximo_id = itertools.count(1)
+        self._trava = threading.Lock()
+
+    def atualizar(self, caixas, agora):
+        """
+        Associa as caixas detectadas no frame atual aos rastros existentes, cria rastros
+        para rostos novos e encerra os que sumiram. Retorna a lista de rastros na mesma
+        ordem das caixas.
+        """
+        with self._trava:
+            # Remove rastros que não aparecem há algum tempo
+            for rastro_id in [i for i, r in self.rastros.items() if agora - r.ultimo_visto > self.tempo_perdido]:
+                del self.rastros[rastro_id]
+
+            # Casamento guloso: pares com maior IoU primeiro
+            pares = []
+            for i, caixa in enumerate(caixas):
+                for rastro in self.rastros.values():
+                    sobreposicao = iou(caixa, rastro.caixa)
+                    if sobreposicao >= self.limiar_iou:
+                        pares.append((sobreposicao, i, rastro.id))
+            pares.sort(reverse=True)
+
+            associados = [None] * len(caixas)
+            usados = set()
+            for _, i, rastro_id in pares:
+                if associados[i] is None and rastro_id not in usados:
+                    associados[i] = self.rastros[rastro_id]
+                    usados.add(rastro_id)
+
+            # Rostos que se moveram rápido demais para a IoU: tenta pelo centro mais próximo
+            for i, caixa in enumerate(caixas):
+                if associados[i] is not None:
+                    continue
+                candidatos = [
+                    (_distancia_centros(rastro.caixa, caixa), rastro.id)
+                    for rastro in self.rastros.values() if rastro.id not in usados
+                ]
+                candidatos = [c for c in candidatos if c[0] <= LIMIAR_CENTROIDE]
+                if candidatos:
+                    _, rastro_id = min(candidatos)
+                    associados[i] = self.rastros[rastro_id]
+                    usados.add(rastro_id)
+
+            # Atualiza os rastros associados e cria os novos
+            for i, caixa in enumerate(caixas):
+                rastro = associados[i]
+                if rastro is None:
+                    rastro = Rastro(next(self._proximo_id), caixa, agora)
+                    self.rastros[rastro.id] = rastro
+                    associados[i] = rastro
+                rastro.caixa = caixa
+                rastro.ultimo_visto = agora
+            return associados
+
+    def precisa_verificar(self, rastro, agora):
+        """
+        Diz se o rastro deve ser enviado para verificação neste momento.
+        """
+        with self._trava:
+            if rastro.pendente_desde is not None and agora - rastro.pendente_desde < TEMPO_MAXIMO_PENDENTE:
+                return False
+            if rastro.identidade is not None and agora < rastro.identidade_expira:
+                CACHE_IDENTIDADE.incrementar()
+                return False
+            if rastro.ultima_tentativa is not None and agora - rastro.ultima_tentativa < self.intervalo_nova_tentativa:
+                return False
+            return True
+
+    def marcar_pendente(self, rastro, agora):
+        """
+        Registra que um pedido de verificação foi enviado para o rastro.
+        """
+        with self._trava:
+            rastro.pendente_desde = agora
+            rastro.ultima_tentativa = agora
+
+    def registrar_resultado(self, rastro_id, resultado, agora):
+        """
+        Guarda o resultado da verificação no rastro. Pessoas identificadas ficam em cache
+        pelo TTL; rostos não reconhecidos ganham nova tentativa após o intervalo.
+        """
+        with self._trava:
+            rastro = self.rastros.get(rastro_id)
+            if rastro is None:
+                return
+            rastro.pendente_desde = None
+            if resultado is None:
+                return
+            rastro.identidade = resultado
+            if resultado.usuario_id is not None:
+                rastro.identidade_expira = agora + self.ttl_identidade
+            else:
+                rastro.identidade_expira = agora + self.intervalo_nova_tentativa
@@ -0,0 +1,324 @@
+# Camada de dados do painel: lê o banco dos portões (database.db) e guarda em cache os números pesados
+
+# Importa a biblioteca sqlite3 para ler o banco escrito pelos processos do portão
+import sqlite3
+# Importa a biblioteca threading para manter uma conexão somente leitura por thread
+import threading
+# Importa a biblioteca de tempo para medir a idade dos valores em cache
+import time
+# Importa as classes de data para os períodos de hoje e ontem
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Consultas de logs compartilhadas com os processos do portão (índices, resumos e paginação por chave)
+from log_queries import listar_logs, totais_por_status, hoje, FORMATO_TIMESTAMP
+
+# Quantidade de itens por página nas listagens do painel
+TAMANHO_PAGINA = 50
+# Quantidade de registros exibidos na lateral do dashboard
+REGISTROS_RECENTES = 10
+
+_local = threading.local()
+
+
+def _conexao():
+	"""
+	Retorna a conexão somente leitura desta thread com o banco dos portões.
+	Em modo WAL, leitores não bloqueiam o escritor de logs nem são bloqueados por ele.
+	"""
+	conn = getattr(_local, 'conn', None)
+	if conn is None or getattr(_local, 'caminho', None) != str(settings.FACEIN_DATABASE):
+		caminho = str(settings.FACEIN_DATABASE)
+		conn = sqlite3.connect(f"{settings.FACEIN_DATABASE.as_uri()}?mode=ro", uri=True, timeout=5)
+		_local.conn, _local.caminho = conn, caminho
+	return conn
+
+
+def _versoes(*tabelas):
+	"""
+	Retorna as versões atuais das tabelas de cadastro (mantidas por gatilhos em VersoesTabelas).
+	"""
+	c = _conexao().cursor()
+	c.execute(
+		f"SELECT tabela, versao FROM VersoesTabelas WHERE tabela IN ({', '.join('?' * len(tabelas))}) ORDER BY tabela",
+		tabelas
+	)
+	return tuple(c.fetchall())
+
+
+def _ultimo_log():
+	"""
+	Retorna o id do log mais recente (consulta direta pela chave primária, sem varrer a tabela).
+	"""
+	c = _conexao().cursor()
+	c.execute("SELECT MAX(id) FROM LogsAcesso")
+	return c.fetchone()[0] or 0
+
+
+def _em_cache(chave, versao_cadastros, calcular, ultimo_log=None):
+	"""
+	Devolve o valor em cache de `chave` se os cadastros não mudaram desde o cálculo.
+	Para valores que dependem dos logs, aceita o cache enquanto não houver logs novos
+	ou enquanto ele tiver menos de FACEIN_ATRASO_MAXIMO_LOGS segundos: com os portões
+	gravando sem parar, o painel recalcula no máximo uma vez por esse intervalo.
+	"""
+	agora = time.monotonic()
+	guardado = cache.get(chave)
+	if guardado is not None:
+		versao, log, calculado_em, valor = guardado
+		if versao == versao_cadastros and (
+			log == ultimo_log or agora - calculado_em < settings.FACEIN_ATRASO_MAXIMO_LOGS
+		):
+			return valor
+	valor = calcular()
+	cache.set(chave, (versao_cadastros, ultimo_log, agora, valor), settings.FACEIN_CACHE_TIMEOUT)
+	return valor
+
+
+def _nomes_usuarios(ids):
+	"""
+	Busca de uma vez o nome dos usuários de uma página de logs.
+	"""
+	ids = sorted({i for i in ids if i is not None})
+	if not ids:
+		return {}
+	c = _conexao().cursor()
+	c.execute(f"SELECT id, nome_completo FROM Usuarios WHERE id IN ({', '.join('?' * len(ids))})", ids)
+	return dict(c.fetchall())
+
+
+def _variacao(atual, anterior):
+	"""
+	Variação percentual em relação ao dia anterior (None quando não há base de comparação).
+	"""
+	if not anterior:
+		return None
+	return round(100 * (atual - anterior) / anterior)
+
+
+# --- Dashboard ---
+
+def _presentes(inicio, fim):
+	"""
+	Conta os alunos (Discentes) distintos com acesso aceito no período.
+	"""
+	c = _conexao().cursor()
+	c.execute('''
+		SELECT COUNT(DISTINCT l.usuario_id)
+		FROM LogsAcesso l
+		JOIN Usuarios u ON u.id = l.usuario_id
+		WHERE l.status = 'Aceito' AND l.timestamp_acesso >= ? AND l.timestamp_acesso < ?
+		  AND u.tipo = 'Discente'
+	''', (inicio, fim))
+	return c.fetchone()[0]
+
+
+def _calcular_estatisticas(inicio_hoje):
+	conn = _conexao()
+	inicio = datetime.strptime(inicio_hoje, FORMATO_TIMESTAMP)
+	inicio_ontem = (inicio - timedelta(days=1)).strftime(FORMATO_TIMESTAMP)
+	inicio_amanha = (inicio + timedelta(days=1)).strftime(FORMATO_TIMESTAMP)
+
+	# Totais por status vêm da tabela de resumo diário, sem percorrer os logs
+	totais_hoje = totais_por_status(conn, inicio=inicio_hoje, fim=inicio_amanha)
+	totais_ontem = totais_por_status(conn, inicio=inicio_ontem, fim=inicio_hoje)
+	acessos = (sum(totais_hoje.values()), sum(totais_ontem.values()))
+	negados = (totais_hoje.get('Negado', 0), totais_ontem.get('Negado', 0))
+	presentes = (_presentes(inicio_hoje, inicio_amanha), _presentes(inicio_ontem, inicio_hoje))
+
+	return {
+		'acessos_hoje': acessos[0],
+		'acessos_variacao': _variacao(*acessos),
+		'presentes_hoje': presentes[0],
+		'presentes_variacao': _variacao(*presentes),
+		'negados_hoje': negados[0],
+		'negados_variacao': _variacao(*negados),
+	}
+
+
+def estatisticas_dashboard():
+	"""
+	Retorna os números do dashboard (acessos, alunos presentes e acessos negados hoje,
+	com a variação em relação a ontem), em cache até mudarem os cadastros ou os logs.
+	"""
+	inicio_hoje = hoje()
+	return _em_cache(
+		f'facein:estatisticas:{inicio_hoje}',
+		_versoes('Usuarios'),
+		lambda: _calcular_estatisticas(inicio_hoje),
+		ultimo_log=_ultimo_log(),
+	)
+
+
+def registros_recentes(limite=REGISTROS_RECENTES):
+	"""
+	Retorna os últimos logs de acesso com o nome de cada pessoa, para a lateral do dashboard.
+	"""
+	def calcular():
+		linhas, _ = listar_logs(_conexao(), limite=limite)
+		return _montar_logs(linhas)
+	return _em_cache(f'facein:recentes:{limite}', _versoes('Usuarios'), calcular, ultimo_log=_ultimo_log())
+
+
+# --- Listagens paginadas ---
+
+def _montar_logs(linhas):
+	nomes = _nomes_usuarios(linha[3] for linha in linhas)
+	registros = []
+	for log_id, timestamp, status, usuario_id, visitante_id, caminho_foto, portao in linhas:
+		registros.append({
+			'id': log_id,
+			'timestamp': timestamp,
+			'data': timestamp[:10],
+			'hora': timestamp[11:16],
+			'status': status,
+			'usuario_id': usuario_id,
+			'nome': nomes.get(usuario_id, 'Desconhecido'),
+			'portao': portao or '',
+			'caminho_foto': caminho_foto,
+		})
+	return registros
+
+
+def codificar_cursor(cursor):
+	"""
+	Converte o cursor de listar_logs ((timestamp, id)) em texto para a URL.
+	"""
+	return None if cursor is None else f"{cursor[0]}|{cursor[1]}"
+
+
+def decodificar_cursor(texto):
+	"""
+	Converte o cursor vindo da URL de volta para (timestamp, id); texto inválido volta ao início.
+	"""
+	if not texto or '|' not in texto:
+		return None
+	timestamp, _, log_id = texto.rpartition('|')
+	try:
+		return timestamp, int(log_id)
+	except ValueError:
+		return None
+
+
+def pagina_logs(cursor=None, status=None, portao=None, usuario_id=None, inicio=None, fim=None,
+				limite=TAMANHO_PAGINA):
+	"""
+	Retorna (registros, proximo_cursor) de uma página de logs, do mais recente para o mais antigo.
+	A paginação por chave mantém o custo de cada página constante, por mais funda que seja.
+	"""
+	linhas, proximo = listar_logs(
+		_conexao(), limite=limite, cursor=decodificar_cursor(cursor), inicio=inicio, fim=fim,
+		usuario_id=usuario_id, status=status, portao=portao
+	)
+	return _montar_logs(linhas), codificar_cursor(proximo)
+
+
+def _pagina_por_id(sql, parametros, apos, limite):
+	"""
+	Executa uma listagem paginada por id crescente (a consulta deve terminar em WHERE ...).
+	Retorna (linhas, proximo_apos).
+	"""
+	c = _conexao().cursor()
+	c.execute(f"{sql} AND t.id > ? ORDER BY t.id LIMIT ?", parametros + [apos or 0, limite + 1])
+	linhas = c.fetchall()
+	proximo = None
+	if len(linhas) > limite:
+		linhas = linhas[:limite]
+		proximo = linhas[-1][0]
+	return linhas, proximo
+
+
+def pagina_usuarios(busca=None, apos=None, limite=TAMANHO_PAGINA):
+	"""
+	Lista os usuários por id, com busca opcional por nome ou matrícula. Retorna (usuarios, proximo_apos).
+	"""
+	def calcular():
+		sql = "SELECT t.id, t.nome_completo, t.matricula, t.tipo, t.situacao FROM Usuarios t WHERE 1 = 1"
+		parametros = []
+		if busca:
+			sql += " AND (t.nome_completo LIKE ? OR t.matricula LIKE ?)"
+			parametros += [f'%{busca}%', f'%{busca}%']
+		linhas, proximo = _pagina_por_id(sql, parametros, apos, limite)
+		campos = ('id', 'nome', 'matricula', 'tipo', 'situacao')
+		return [dict(zip(campos, linha)) for linha in linhas], proximo
+	return _em_cache(f'facein:usuarios:{busca}:{apos}:{limite}', _versoes('Usuarios'), calcular)
+
+
+def listar_turmas():
+	"""
+	Lista as turmas com o curso e a quantidade de alunos de cada uma.
+	"""
+	def calcular():
+		c = _conexao().cursor()
+		c.execute('''
+			SELECT t.id, t.nome_turma, c.nome_curso, t.ano, t.turno,
+				   (SELECT COUNT(*) FROM UsuarioTurma ut WHERE ut.turma_id = t.id)
+			FROM Turmas t
+			LEFT JOIN Cursos c ON c.id = t.curso_id
+			ORDER BY t.ano DESC, t.nome_turma
+		''')
+		campos = ('id', 'nome', 'curso', 'ano', 'turno', 'alunos')
+		return [dict(zip(campos, linha)) for linha in c.fetchall()]
+	return _em_cache('facein:turmas', _versoes('Turmas', 'UsuarioTurma'), calcular)
+
+
+def pagina_acoes(tipo=None, apos=None, limite=TAMANHO_PAGINA):
+	"""
+	Lista as ações disciplinares (opcionalmente só 'Advertência' ou 'Suspensão') com o nome do aluno.
+	Retorna (acoes, proximo_apos).
+	"""
+	def calcular():
+		sql = '''
+			SELECT t.id, u.nome_completo, t.tipo, t.motivo, t.data_inicio, t.data_fim
+			FROM AcoesDisciplinares t
+			LEFT JOIN Usuarios u ON u.id = t.usuario_id
+			WHERE 1 = 1
+		'''
+		parametros = []
+		if tipo:
+			sql += " AND t.tipo = ?"
+			parametros.append(tipo)
+		linhas, proximo = _pagina_por_id(sql, parametros, apos, limite)
+		campos = ('id', 'nome', 'tipo', 'motivo', 'data_inicio', 'data_fim')
+		return [dict(zip(campos, linha)) for linha in linhas], proximo
+	return _em_cache(
+		f'facein:acoes:{tipo}:{apos}:{limite}', _versoes('AcoesDisciplinares', 'Usuarios'), calcular
+	)
+
+
+def pagina_permissoes(apos=None, limite=TAMANHO_PAGINA):
+	"""
+	Lista as permissões especiais concedidas, com o nome do usuário. Retorna (permissoes, proximo_apos).
+	"""
+	def calcular():
+		sql = '''
+			SELECT t.id, u.nome_completo, t.justificativa, t.data_hora_permissao
+			FROM PermissoesEspeciais t
+			LEFT JOIN Usuarios u ON u.id = t.usuario_id
+			WHERE 1 = 1
+		'''
+		linhas, proximo = _pagina_por_id(sql, [], apos, limite)
+		campos = ('id', 'nome', 'justificativa', 'data_hora')
+		return [dict(zip(campos, linha)) for linha in linhas], proximo
+	return _em_cache(
+		f'facein:permissoes:{apos}:{limite}', _versoes('PermissoesEspeciais', 'Usuarios'), calcular
+	)
+
+
+def pagina_visitantes(apos=None, limite=TAMANHO_PAGINA):
+	"""
+	Lista os visitantes cadastrados. Retorna (visitantes, proximo_apos).
+	"""
+	def calcular():
+		sql = '''
+			SELECT t.id, t.nome_completo, t.documento, t.empresa, t.motivo_acesso,
+				   t.horario_programado_inicio, t.horario_programado_fim
+			FROM Visitantes t
+			WHERE 1 = 1
+		'''
+		linhas, proximo = _pagina_por_id(sql, [], apos, limite)
+		campos = ('id', 'nome', 'documento', 'empresa', 'motivo', 'inicio', 'fim')
+		return [dict(zip(campos, linha)) for linha in linhas], proximo
+	return _em_cache(f'facein:visitantes:{apos}:{limite}', _versoes('Visitantes'), calcular)
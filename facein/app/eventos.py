@@ -0,0 +1,91 @@
+# Canal de eventos ao vivo: recebe os acessos publicados pelos portões (UDP local) e os repassa aos painéis conectados
+
+# Importa a biblioteca asyncio para escutar o UDP e atender as conexões sem uma thread por navegador
+import asyncio
+# Importa a biblioteca json para validar e reenviar os eventos
+import json
+
+from django.conf import settings
+
+# Intervalo (em segundos) entre comentários de "batimento" que mantêm a conexão aberta em proxies
+INTERVALO_BATIMENTO = 15
+# Quantidade de eventos guardados para um navegador lento antes de descartar os mais antigos
+TAMANHO_FILA_CLIENTE = 32
+
+
+class _ProtocoloEventos(asyncio.DatagramProtocol):
+
+	def __init__(self, canal):
+		self.canal = canal
+
+	def datagram_received(self, dados, endereco):
+		self.canal.distribuir(dados)
+
+
+class CanalEventos:
+	"""
+	Escuta, no loop do servidor ASGI, o endereço UDP onde os portões publicam os acessos
+	e entrega cada evento à fila de todos os navegadores conectados. A mensagem SSE é montada
+	uma única vez por evento; conexões paradas só ocupam uma fila vazia, sem consultar o banco.
+	"""
+
+	def __init__(self):
+		self._assinantes = set()
+		self._transporte = None
+		self._trava = None
+
+	async def _iniciar(self):
+		if self._trava is None:
+			self._trava = asyncio.Lock()
+		async with self._trava:
+			if self._transporte is None:
+				loop = asyncio.get_running_loop()
+				self._transporte, _ = await loop.create_datagram_endpoint(
+					lambda: _ProtocoloEventos(self), local_addr=tuple(settings.FACEIN_EVENTOS_ENDERECO)
+				)
+
+	async def assinar(self):
+		"""
+		Cria e registra a fila de eventos de uma nova conexão.
+		"""
+		await self._iniciar()
+		fila = asyncio.Queue(maxsize=TAMANHO_FILA_CLIENTE)
+		self._assinantes.add(fila)
+		return fila
+
+	def cancelar(self, fila):
+		self._assinantes.discard(fila)
+
+	def conexoes(self):
+		return len(self._assinantes)
+
+	def distribuir(self, dados):
+		"""
+		Repassa um datagrama recebido para todas as conexões (descartando o mais antigo de quem estiver atrasado).
+		"""
+		try:
+			evento = json.loads(dados)
+		except ValueError:
+			return
+		mensagem = f"event: acesso\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
+		for fila in self._assinantes:
+			if fila.full():
+				fila.get_nowait()
+			fila.put_nowait(mensagem)
+
+	async def transmitir(self, fila):
+		"""
+		Gera o fluxo SSE de uma conexão até o navegador desconectar.
+		"""
+		try:
+			yield "retry: 3000\n\n"
+			while True:
+				try:
+					yield await asyncio.wait_for(fila.get(), INTERVALO_BATIMENTO)
+				except asyncio.TimeoutError:
+					yield ": batimento\n\n"
+		finally:
+			self.cancelar(fila)
+
+
+canal = CanalEventos()
@@ -0,0 +1,158 @@
+# Teste de carga do painel contra um banco sintético com muitos logs, enquanto um "portão" continua gravando
+
+# Importa a biblioteca sqlite3 para gerar o banco sintético
+import sqlite3
+# Importa a biblioteca random para gerar usuários e logs aleatórios
+import random
+# Importa a biblioteca tempfile para criar o banco sintético em uma pasta temporária
+import tempfile
+# Importa a biblioteca threading para simular o portão gravando logs durante o teste
+import threading
+# Importa a biblioteca de tempo para medir a latência de cada página
+import time
+# Importa as classes de data para espalhar os logs pelos últimos meses
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment
+
+from database_setup import criar_banco_de_dados
+from access_log_writer import EscritorLogs
+from log_queries import FORMATO_TIMESTAMP
+
+# Quantidade de linhas inseridas por executemany ao gerar o banco
+TAMANHO_BLOCO = 50000
+
+
+def _percentil(valores, p):
+	ordenados = sorted(valores)
+	return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+	help = "Mede a latência das páginas do painel em um banco sintético com ~1 milhão de logs."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--banco", help="Banco sintético a usar (gerado se não existir)")
+		parser.add_argument("--logs", type=int, default=1000000, help="Quantidade de logs a gerar")
+		parser.add_argument("--usuarios", type=int, default=3000, help="Quantidade de usuários a gerar")
+		parser.add_argument("--dias", type=int, default=180, help="Período (em dias) coberto pelos logs")
+		parser.add_argument("--requisicoes", type=int, default=50, help="Requisições medidas por página")
+		parser.add_argument("--escritas", type=float, default=20.0, help="Logs por segundo gravados durante o teste")
+
+	def handle(self, *args, **opcoes):
+		caminho = opcoes["banco"] or str(Path(tempfile.mkdtemp()) / "carga.db")
+		if not Path(caminho).exists():
+			self._gerar_banco(caminho, opcoes["logs"], opcoes["usuarios"], opcoes["dias"])
+
+		setup_test_environment()
+		with override_settings(FACEIN_DATABASE=Path(caminho)):
+			cache.clear()
+			escritor = EscritorLogs(caminho)
+			parar = threading.Event()
+			portao = threading.Thread(
+				target=self._simular_portao, args=(escritor, opcoes["usuarios"], opcoes["escritas"], parar), daemon=True
+			)
+			portao.start()
+			try:
+				self._medir(Client(), opcoes["requisicoes"])
+			finally:
+				parar.set()
+				portao.join()
+				escritor.encerrar()
+			self.stdout.write(f"Logs gravados pelo portão simulado durante o teste: {escritor.eventos_gravados}")
+
+	def _gerar_banco(self, caminho, total_logs, total_usuarios, dias):
+		self.stdout.write(f"Gerando banco sintético em {caminho} ({total_logs} logs)...")
+		inicio = time.perf_counter()
+		criar_banco_de_dados(caminho)
+		conn = sqlite3.connect(caminho)
+		conn.execute("PRAGMA journal_mode=WAL")
+		conn.execute("PRAGMA synchronous=OFF")
+		aleatorio = random.Random(42)
+		with conn:
+			conn.execute("INSERT INTO Cursos (nome_curso) VALUES ('Informática'), ('Edificações')")
+			conn.executemany(
+				"INSERT INTO Turmas (nome_turma, curso_id, ano, turno) VALUES (?, ?, ?, ?)",
+				[(f"{ano}.{serie}", 1 + serie % 2, ano, "Matutino") for ano in (2023, 2024, 2025) for serie in range(1, 9)]
+			)
+			tipos = ["Discente"] * 8 + ["Docente", "Servidor"]
+			conn.executemany(
+				"INSERT INTO Usuarios (nome_completo, matricula, tipo, situacao, caminho_foto_rosto) VALUES (?, ?, ?, ?, ?)",
+				[
+					(f"Usuário {i} Silva" if i % 7 == 0 else f"Usuário {i}", f"2025{i:06d}", aleatorio.choice(tipos),
+					 "Suspenso" if i % 97 == 0 else "Normal", f"fotos_rostos/{i}.jpg")
+					for i in range(1, total_usuarios + 1)
+				]
+			)
+			conn.executemany(
+				"INSERT INTO UsuarioTurma (usuario_id, turma_id) VALUES (?, ?)",
+				[(i, 1 + i % 24) for i in range(1, total_usuarios + 1)]
+			)
+			conn.execute("INSERT INTO Operadores (nome, login, senha_hash, papel) VALUES ('Admin', 'admin', '-', 'Administrador')")
+			conn.executemany(
+				"INSERT INTO AcoesDisciplinares (usuario_id, operador_id, tipo, motivo, data_inicio, data_fim) VALUES (?, 1, ?, ?, ?, ?)",
+				[(i, "Suspensão" if i % 2 else "Advertência", "Teste de carga", "2025-01-01", "2025-01-05")
+				 for i in range(97, total_usuarios + 1, 97)]
+			)
+
+		# Logs em ordem de tempo, como o portão grava, terminando agora
+		agora = datetime.now()
+		passo = timedelta(days=dias) / max(1, total_logs)
+		status = ["Aceito"] * 17 + ["Negado", "Não Encontrado", "Não Encontrado"]
+		gerados = 0
+		while gerados < total_logs:
+			bloco = []
+			for i in range(gerados, min(total_logs, gerados + TAMANHO_BLOCO)):
+				momento = agora - passo * (total_logs - i)
+				situacao = aleatorio.choice(status)
+				usuario = aleatorio.randint(1, total_usuarios) if situacao != "Não Encontrado" else None
+				bloco.append((momento.strftime(FORMATO_TIMESTAMP), situacao, usuario, None, aleatorio.choice(["principal", "fundos"])))
+			with conn:
+				conn.executemany(
+					"INSERT INTO LogsAcesso (timestamp_acesso, status, usuario_id, caminho_foto_capturada, portao) VALUES (?, ?, ?, ?, ?)",
+					bloco
+				)
+			gerados += len(bloco)
+		conn.execute("ANALYZE")
+		conn.close()
+		self.stdout.write(f"Banco gerado em {time.perf_counter() - inicio:.1f}s.")
+
+	def _simular_portao(self, escritor, total_usuarios, por_segundo, parar):
+		aleatorio = random.Random()
+		while not parar.wait(1.0 / por_segundo):
+			escritor.registrar((
+				datetime.now().strftime(FORMATO_TIMESTAMP), "Aceito", aleatorio.randint(1, total_usuarios), None, "principal"
+			))
+
+	def _medir(self, cliente, requisicoes):
+		# Página funda do registro: segue o cursor por 20 páginas para mostrar que o custo não cresce
+		url_funda = "/registro/"
+		for _ in range(20):
+			resposta = cliente.get(url_funda)
+			proximo = resposta.context["proximo"] if resposta.context else None
+			if not proximo:
+				break
+			url_funda = f"/registro/?{proximo}"
+
+		paginas = [
+			"/dashboard/", "/usuarios/", "/usuarios/?q=Silva", "/turmas/", "/registro/",
+			"/registro/?status=Negado&portao=fundos", url_funda, "/suspensoes/", "/permissoes", "/acessoExterno/",
+		]
+		self.stdout.write(f"{'página':45} {'1ª (ms)':>8} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+		for url in paginas:
+			latencias = []
+			for _ in range(requisicoes + 1):
+				inicio = time.perf_counter()
+				resposta = cliente.get(url)
+				latencias.append((time.perf_counter() - inicio) * 1000)
+				if resposta.status_code != 200:
+					self.stderr.write(f"{url}: status {resposta.status_code}")
+					break
+			primeira, demais = latencias[0], latencias[1:] or latencias
+			self.stdout.write(
+				f"{url[:45]:45} {primeira:8.1f} {_percentil(demais, 50):9.1f} {_percentil(demais, 95):9.1f}"
+			)
@@ -1,35 +1,77 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, redirect
 
+from . import dados
+from .eventos import canal
+
 # Create your views here.
 
 
+def _inteiro(valor):
+	try:
+		return int(valor)
+	except (TypeError, ValueError):
+		return None
+
+
 def index(request):
 	return redirect("dashboard")
 
 
 def dashboard(request):
-	return render(request, "dashboard.html")
+	contexto = dados.estatisticas_dashboard()
+	contexto["registros"] = dados.registros_recentes()
+	return render(request, "dashboard.html", contexto)
 
 
 def usuarios(request):
-	return render(request, "usuarios.html")
+	busca = request.GET.get("q", "").strip()
+	lista, proximo = dados.pagina_usuarios(busca=busca or None, apos=_inteiro(request.GET.get("apos")))
+	return render(request, "usuarios.html", {"usuarios": lista, "proximo": proximo, "busca": busca})
 
 
 def turmas(request):
-	return render(request, "turmas.html")
+	return render(request, "turmas.html", {"turmas": dados.listar_turmas()})
 
 
 def registro(request):
-	return render(request, "registro.html")
+	filtros = {
+		"status": request.GET.get("status") or None,
+		"portao": request.GET.get("portao") or None,
+		"usuario_id": _inteiro(request.GET.get("usuario")),
+	}
+	registros, proximo = dados.pagina_logs(cursor=request.GET.get("cursor"), **filtros)
+	# Mantém os filtros no link da próxima página
+	parametros = request.GET.copy()
+	parametros.pop("cursor", None)
+	if proximo:
+		parametros["cursor"] = proximo
+	return render(request, "registro.html", {
+		"registros": registros,
+		"proximo": parametros.urlencode() if proximo else None,
+		"filtros": filtros,
+	})
 
 
 def permissoes(request):
-	return render(request, "permissoes.html")
+	lista, proximo = dados.pagina_permissoes(apos=_inteiro(request.GET.get("apos")))
+	return render(request, "permissoes.html", {"permissoes": lista, "proximo": proximo})
 
 
 def suspensoes(request):
-	return render(request, "suspensoes.html")
+	lista, proximo = dados.pagina_acoes(tipo="Suspensão", apos=_inteiro(request.GET.get("apos")))
+	return render(request, "suspensoes.html", {"acoes": lista, "proximo": proximo})
 
 
 def acessoExterno(request):
-	return render(request, "acessoExterno.html")	
+	lista, proximo = dados.pagina_visitantes(apos=_inteiro(request.GET.get("apos")))
+	return render(request, "acessoExterno.html", {"visitantes": lista, "proximo": proximo})
+
+
+async def eventos(request):
+	# Fluxo SSE com os acessos ao vivo (requer um servidor ASGI, ex.: uvicorn facein.asgi:application)
+	fila = await canal.assinar()
+	resposta = StreamingHttpResponse(canal.transmitir(fila), content_type="text/event-stream")
+	resposta["Cache-Control"] = "no-cache"
+	resposta["X-Accel-Buffering"] = "no"
+	return resposta
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -80,6 +81,28 @@ DATABASES = {
     }
 }
 
+# Banco de dados escrito pelos processos do portão (core_functions); o painel só lê dele
+FACEIN_DATABASE = BASE_DIR.parent / 'database.db'
+
+# Permite importar os módulos compartilhados da raiz do projeto (ex.: log_queries)
+if str(BASE_DIR.parent) not in sys.path:
+    sys.path.append(str(BASE_DIR.parent))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'facein',
+    }
+}
+
+# Tempo máximo (em segundos) que os números do painel ficam em cache, mesmo sem mudanças no banco
+FACEIN_CACHE_TIMEOUT = 300
+# Atraso máximo (em segundos) aceito nos números do painel enquanto os portões gravam logs novos
+FACEIN_ATRASO_MAXIMO_LOGS = 2
+
+# Endereço UDP onde os portões publicam os acessos ao vivo (o mesmo de access_events.ENDERECO_EVENTOS)
+FACEIN_EVENTOS_ENDERECO = ('127.0.0.1', 8765)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
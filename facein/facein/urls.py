@@ -27,5 +27,6 @@ urlpatterns = [
     path('permissoes', views.permissoes, name="permissoes"),
     path('registro/', views.registro, name="registro"),
     path('suspensoes/', views.suspensoes, name="suspensoes"),
-    path('acessoExterno/', views.acessoExterno, name="acessoExterno")
+    path('acessoExterno/', views.acessoExterno, name="acessoExterno"),
+    path('eventos/', views.eventos, name="eventos")
 ]
@@ -0,0 +1,350 @@
+# Importa as bibliotecas necessárias para atender várias câmeras em um único serviço
+
+# Importa a biblioteca MediaPipe para detecção facial em cada câmera
+import mediapipe as mp
+# Importa a biblioteca de tempo para medir FPS e latência
+import time
+# Importa a biblioteca OS para montar o caminho do arquivo de configuração
+import os
+# Importa a biblioteca json para ler a lista de câmeras do arquivo de configuração
+import json
+# Importa a biblioteca argparse para ler as opções da linha de comando
+import argparse
+# Importa a biblioteca threading para rodar captura e detecção de cada câmera em paralelo
+import threading
+# Importa o pool de processos onde o modelo de reconhecimento é carregado uma única vez por processo
+from concurrent.futures import ProcessPoolExecutor, Future
+# Importa a fila de duas pontas para guardar as últimas latências de cada câmera
+from collections import deque
+
+# Importa a função que cria o banco de dados e tabelas, garantindo que tudo esteja pronto antes de rodar o sistema
+from database_setup import criar_banco_de_dados
+# Importa as funções que convertem e recortam as detecções do MediaPipe
+from detection_utils import caixa_em_pixels, recortar_rosto
+# Importa a captura que lê cada câmera em uma thread própria, entrega só o frame mais novo e reconecta sozinha
+from camera_capture import CapturaCamera
+# Importa a frente de detecção que pula cenas paradas, reduz o frame e limita a região de interesse
+from adaptive_detection import DetectorAdaptativo, LARGURA_DETECCAO
+# Importa o rastreador que acompanha cada rosto entre os frames
+from face_tracker import RastreadorFaces, TTL_IDENTIDADE
+# Importa a avaliação de qualidade que escolhe o melhor recorte de cada pessoa
+from face_quality import pontuar_qualidade, SeletorMelhorRecorte
+# Importa o agrupador que junta rostos de todas as câmeras em lotes para o modelo
+from embedding_batcher import AgrupadorLotes, TAMANHO_MAXIMO_LOTE, PRAZO_LOTE
+# Importa as métricas de tempo por etapa e os contadores expostos no endpoint /metrics
+from metrics import (ETAPAS, FRAMES, ROSTOS_DETECTADOS, FILAS, PORTA_METRICAS, ENDERECO_METRICAS, LATENCIA_QUADRO,
+                     LATENCIA_DECISAO,
+                     iniciar_servidor_metricas, iniciar_log_periodico, retirar_parciais, somar_parciais)
+
+# --- CONFIGURAÇÕES ---
+# Define diretório base onde está o arquivo atual
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Arquivo padrão com a lista de câmeras
+CONFIG_PADRAO = os.path.join(BASE_DIR, 'cameras.json')
+# Quantos rostos de uma mesma câmera podem estar sendo verificados ao mesmo tempo
+MAXIMO_PENDENTES_POR_CAMERA = 8
+
+# --- FUNÇÕES EXECUTADAS NOS PROCESSOS DE RECONHECIMENTO ---
+
+def _inicializar_worker():
+    """
+    Executada uma vez em cada processo do pool: carrega o modelo e a galeria,
+    que passam a atender rostos de todas as câmeras.
+    """
+    # Importa aqui para que o processo principal não precise carregar o TensorFlow
+    from face_gallery import aquecer_modelo
+    from core_functions import obter_galeria
+    aquecer_modelo()
+    obter_galeria()
+    print(f"[SERVIDOR] Processo de reconhecimento {os.getpid()} pronto.")
+
+def _verificar_lote_no_worker(pedidos):
+    """
+    Verifica um lote de pedidos (recorte, nome da câmera) dentro de um processo do pool e devolve
+    a lista de resultados e as métricas medidas no processo desde o lote anterior (modelo,
+    comparação, gravações, verificações por status), que o processo principal soma às suas.
+    """
+    from core_functions import verificar_pessoas_lote
+    resultados = verificar_pessoas_lote([recorte for recorte, _ in pedidos], [portao for _, portao in pedidos])
+    return resultados, retirar_parciais()
+
+def _despachar_lote(pool, pedidos):
+    """
+    Envia o lote a um processo do pool e retorna um Future só com a lista de resultados.
+    As métricas que voltam com o lote entram nas do processo principal, expostas em /metrics.
+    """
+    futuro = Future()
+
+    def concluir(futuro_lote):
+        try:
+            resultados, parciais = futuro_lote.result()
+        except Exception as e:
+            futuro.set_exception(e)
+            return
+        somar_parciais(parciais)
+        futuro.set_result(resultados)
+
+    pool.submit(_verificar_lote_no_worker, pedidos).add_done_callback(concluir)
+    return futuro
+
+# --- ESTATÍSTICAS ---
+
+def percentil(valores, p):
+    """
+    Retorna o percentil p (0 a 100) de uma lista de valores, ou None se estiver vazia.
+    """
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[posicao]
+
+class EstatisticasCamera:
+    """
+    Acumula contadores de uma câmera (frames, rostos, verificações) e as latências
+    recentes de reconhecimento, para o relatório periódico.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.frames = 0
+        self.rostos = 0
+        self.verificacoes = 0
+        self.descartados = 0
+        self.latencias = deque(maxlen=1000)
+        self._frames_relatorio = 0
+        self._verificacoes_relatorio = 0
+        self._tempo_relatorio = time.time()
+
+    def registrar_latencia(self, segundos):
+        with self._trava:
+            self.verificacoes += 1
+            self.latencias.append(segundos)
+
+    def resumo(self):
+        """
+        Retorna um dicionário com taxas desde o último resumo e latências (ms) recentes.
+        """
+        with self._trava:
+            agora = time.time()
+            decorrido = max(1e-6, agora - self._tempo_relatorio)
+            latencias = list(self.latencias)
+            resumo = {
+                'fps': (self.frames - self._frames_relatorio) / decorrido,
+                'verificacoes_por_s': (self.verificacoes - self._verificacoes_relatorio) / decorrido,
+                'frames': self.frames,
+                'rostos': self.rostos,
+                'verificacoes': self.verificacoes,
+                'descartados': self.descartados,
+            }
+            self._frames_relatorio = self.frames
+            self._verificacoes_relatorio = self.verificacoes
+            self._tempo_relatorio = agora
+        for p in (50, 95, 99):
+            valor = percentil(latencias, p)
+            resumo[f'latencia_p{p}_ms'] = None if valor is None else valor * 1000
+        return resumo
+
+# --- CÂMERAS ---
+
+class ProcessadorCamera(threading.Thread):
+    """
+    Thread responsável por uma câmera: pega o frame mais novo da captura, detecta rostos com o
+    MediaPipe e envia os recortes para o agrupador de lotes compartilhado entre as câmeras.
+    """
+
+    def __init__(self, nome, fonte, agrupador, ttl_identidade=TTL_IDENTIDADE, repetir=False,
+                 regiao=None, largura_deteccao=LARGURA_DETECCAO):
+        super().__init__(name=f'camera-{nome}', daemon=True)
+        self.nome = nome
+        self.fonte = fonte
+        self.agrupador = agrupador
+        # Região de interesse (x1, y1, x2, y2, de 0 a 1) e largura do frame entregue ao MediaPipe
+        self.regiao = regiao
+        self.largura_deteccao = largura_deteccao
+        self.detector = None
+        self.captura = None
+        # Cada pessoa é verificada uma vez por rastro; a identidade vale pelo TTL
+        self.rastreador = RastreadorFaces(ttl_identidade=ttl_identidade)
+        # Só o melhor recorte de cada pessoa dentro de uma janela curta vai para o reconhecimento
+        self.seletor = SeletorMelhorRecorte()
+        # Para arquivos de vídeo: volta ao início quando o arquivo acaba
+        self.repetir = repetir
+        self.estatisticas = EstatisticasCamera()
+        self._parar = threading.Event()
+        self._pendentes = 0
+        self._trava = threading.Lock()
+
+    def parar(self):
+        self._parar.set()
+
+    def _ao_concluir(self, futuro, inicio, rastro_id, instante_captura):
+        with self._trava:
+            self._pendentes -= 1
+        self.estatisticas.registrar_latencia(time.time() - inicio)
+        ETAPAS.observar(time.time() - inicio, 'reconhecimento')
+        LATENCIA_DECISAO.observar(time.monotonic() - instante_captura, self.nome)
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            print(f"[ERRO] [{self.nome}] Falha no reconhecimento: {e}")
+            resultado = None
+        self.rastreador.registrar_resultado(rastro_id, resultado, time.time())
+        if resultado is not None:
+            print(f"[{self.nome}] {resultado.status}" + (f": {resultado.nome}" if resultado.nome else ""))
+
+    def _enviar(self, recorte, rastro_id, instante_captura):
+        """
+        Envia o recorte para o agrupador. Retorna False se a câmera já tem pedidos demais em andamento.
+        """
+        with self._trava:
+            if self._pendentes >= MAXIMO_PENDENTES_POR_CAMERA:
+                self.estatisticas.descartados += 1
+                return False
+            self._pendentes += 1
+        inicio = time.time()
+        futuro = self.agrupador.submeter((recorte, self.nome))
+        futuro.add_done_callback(lambda f: self._ao_concluir(f, inicio, rastro_id, instante_captura))
+        return True
+
+    def run(self):
+        self.captura = captura = CapturaCamera(self.fonte, self.nome, repetir=self.repetir)
+        with mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.6) as face_detection:
+            self.detector = DetectorAdaptativo(face_detection, regiao=self.regiao,
+                                               largura_deteccao=self.largura_deteccao, camera=self.nome)
+            while not self._parar.is_set():
+                with ETAPAS.medir('leitura_frame'):
+                    frame, instante_captura = captura.ler(timeout=1.0)
+                if frame is None:
+                    if captura.terminou:
+                        break
+                    continue
+
+                self.estatisticas.frames += 1
+                tempo_atual = time.time()
+                deteccoes = self.detector.detectar(frame, tempo_atual)
+                self.estatisticas.rostos += len(deteccoes)
+                FRAMES.incrementar(valor_rotulo=self.nome)
+                ROSTOS_DETECTADOS.incrementar(len(deteccoes), self.nome)
+
+                # Associa os rostos aos rastros e verifica apenas os novos (ou com identidade expirada)
+                ih, iw = frame.shape[:2]
+                rastros = self.rastreador.atualizar([caixa_em_pixels(d, iw, ih) for d in deteccoes], tempo_atual)
+                for rastro, detection in zip(rastros, deteccoes):
+                    if not self.rastreador.precisa_verificar(rastro, tempo_atual):
+                        continue
+                    with ETAPAS.medir('recorte'):
+                        recorte = recortar_rosto(frame, detection)
+                    if recorte is None:
+                        continue
+                    with ETAPAS.medir('qualidade'):
+                        nota, _ = pontuar_qualidade(recorte, detection)
+                    melhor_recorte = self.seletor.oferecer(rastro.id, recorte, nota, tempo_atual)
+                    if melhor_recorte is not None and self._enviar(melhor_recorte, rastro.id, instante_captura):
+                        self.rastreador.marcar_pendente(rastro, tempo_atual)
+                self.seletor.limpar(self.rastreador.rastros)
+                LATENCIA_QUADRO.observar(time.monotonic() - instante_captura, self.nome)
+        captura.encerrar()
+
+# --- SERVIÇO ---
+
+def carregar_configuracao(caminho):
+    """
+    Lê o arquivo JSON com as câmeras. Formato:
+    {"workers": 2, "lote": 16, "prazo_lote_ms": 20,
+     "cameras": [{"nome": "portao_1", "fonte": "http://.../video",
+                  "regiao": [0.2, 0.0, 0.8, 1.0], "largura_deteccao": 480}, ...]}
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        config = json.load(arquivo)
+    if not config.get('cameras'):
+        raise ValueError(f"Nenhuma câmera configurada em '{caminho}'.")
+    return config
+
+def imprimir_relatorio(processadores):
+    print("\n[RELATÓRIO] Desempenho por câmera:")
+    for processador in processadores:
+        r = processador.estatisticas.resumo()
+        p50 = '-' if r['latencia_p50_ms'] is None else f"{r['latencia_p50_ms']:.0f}"
+        p95 = '-' if r['latencia_p95_ms'] is None else f"{r['latencia_p95_ms']:.0f}"
+        taxa = processador.detector.taxa_deteccao() if processador.detector is not None else None
+        deteccao = '-' if taxa is None else f"{taxa:.0%}"
+        captura = processador.captura
+        quadros = '-' if captura is None else f"{captura.descartados} descartado(s), {captura.reconexoes} reconexão(ões)"
+        decisao = LATENCIA_DECISAO.percentil(95, processador.nome)
+        decisao = '-' if decisao is None else f"{decisao * 1000:.0f}"
+        print(f"  {processador.nome}: {r['fps']:.1f} FPS | detecção em {deteccao} dos frames | "
+              f"{r['verificacoes_por_s']:.2f} verif/s | latência p50 {p50} ms, p95 {p95} ms | "
+              f"captura até decisão p95 ≤ {decisao} ms | rostos {r['rostos']} | descartados {r['descartados']} | "
+              f"frames {quadros}")
+
+def executar(config, intervalo_relatorio=10.0, porta_metricas=PORTA_METRICAS, intervalo_log_metricas=None,
+             endereco_metricas=ENDERECO_METRICAS):
+    """
+    Inicia o pool de reconhecimento e uma thread por câmera, imprimindo o relatório
+    periodicamente até todas as câmeras terminarem ou o usuário interromper (Ctrl+C).
+    As métricas ficam em http://endereco_metricas:porta_metricas/metrics (porta None ou 0 desativa).
+    """
+    criar_banco_de_dados()
+    num_workers = int(config.get('workers', 1))
+    print(f"[SERVIDOR] Iniciando {num_workers} processo(s) de reconhecimento...")
+    servidor_metricas = iniciar_servidor_metricas(porta_metricas, endereco_metricas) if porta_metricas else None
+    parar_log_metricas = iniciar_log_periodico(intervalo_log_metricas) if intervalo_log_metricas else None
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_inicializar_worker) as pool:
+        # Rostos de todas as câmeras são agrupados e cada lote vai inteiro para um processo
+        agrupador = AgrupadorLotes(
+            lambda recortes: _despachar_lote(pool, recortes),
+            tamanho_maximo=int(config.get('lote', TAMANHO_MAXIMO_LOTE)),
+            prazo=float(config.get('prazo_lote_ms', PRAZO_LOTE * 1000)) / 1000
+        )
+        processadores = [
+            ProcessadorCamera(
+                camera['nome'], camera['fonte'], agrupador,
+                ttl_identidade=camera.get('ttl_identidade', TTL_IDENTIDADE),
+                repetir=camera.get('repetir', False),
+                regiao=camera.get('regiao'),
+                largura_deteccao=camera.get('largura_deteccao', LARGURA_DETECCAO)
+            )
+            for camera in config['cameras']
+        ]
+        for processador in processadores:
+            processador.start()
+            FILAS.definir(lambda p=processador: p._pendentes, f'camera_{processador.nome}')
+
+        proximo_relatorio = time.time() + intervalo_relatorio
+        try:
+            while any(p.is_alive() for p in processadores):
+                time.sleep(min(1.0, intervalo_relatorio))
+                if time.time() >= proximo_relatorio:
+                    imprimir_relatorio(processadores)
+                    proximo_relatorio += intervalo_relatorio
+        except KeyboardInterrupt:
+            print("\n[SERVIDOR] Encerrando...")
+        finally:
+            for processador in processadores:
+                processador.parar()
+            for processador in processadores:
+                processador.join()
+            agrupador.encerrar()
+            if servidor_metricas is not None:
+                servidor_metricas.shutdown()
+            if parar_log_metricas is not None:
+                parar_log_metricas.set()
+    imprimir_relatorio(processadores)
+    print(f"[SERVIDOR] Tamanho médio dos lotes: {agrupador.tamanho_medio_lote():.1f} rosto(s).")
+    return processadores
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor de portões com várias câmeras.')
+    parser.add_argument('--config', default=CONFIG_PADRAO, help='Arquivo JSON com a lista de câmeras')
+    parser.add_argument('--relatorio', type=float, default=10.0, help='Intervalo (s) entre relatórios de desempenho')
+    parser.add_argument('--metricas-porta', type=int, default=PORTA_METRICAS,
+                        help='Porta do endpoint /metrics (0 desativa)')
+    parser.add_argument('--metricas-endereco', default=ENDERECO_METRICAS,
+                        help='Endereço do endpoint /metrics (0.0.0.0 expõe para outras máquinas)')
+    parser.add_argument('--log-metricas', type=float, default=None,
+                        help='Intervalo (s) entre linhas JSON com o resumo das métricas (padrão: desativado)')
+    args = parser.parse_args()
+    executar(carregar_configuracao(args.config), args.relatorio, args.metricas_porta, args.log_metricas,
+             args.metricas_endereco)
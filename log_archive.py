@@ -0,0 +1,401 @@
+# Importa bibliotecas necessárias para arquivar os logs de acesso antigos em bancos separados por mês
+
+# Importa a biblioteca OS para montar os caminhos dos arquivos de cada mês
+import os
+# Importa a biblioteca re para reconhecer os arquivos de partição pelo nome
+import re
+# Importa a biblioteca sqlite3 para mover os logs entre o banco principal e os arquivos
+import sqlite3
+# Importa a biblioteca csv para a exportação em planilha
+import csv
+# Importa a biblioteca de tempo para medir a duração do arquivamento
+import time
+# Importa a biblioteca argparse para ler as opções da linha de comando
+import argparse
+# Importa a classe Path para abrir os arquivos como URIs somente leitura
+from pathlib import Path
+# Importa as classes de data para calcular quais meses já estão fechados
+from datetime import datetime, date, timedelta
+
+# --- CONFIGURAÇÕES ---
+# Define diretório base onde está o arquivo atual
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Caminho completo do banco de dados SQLite
+db_path = os.path.join(BASE_DIR, 'database.db')
+# Meses fechados que continuam no banco principal, além do mês atual
+MESES_NO_BANCO = 3
+# Logs movidos por transação (transações curtas não seguram o escritor dos logs do portão)
+LOTE_ARQUIVAMENTO = 5000
+# Linhas por grupo na exportação em Parquet (limita a memória usada)
+LINHAS_POR_GRUPO = 50000
+
+# Colunas de LogsAcesso, na ordem em que são copiadas e exportadas
+COLUNAS_LOGS = ['id', 'timestamp_acesso', 'status', 'usuario_id', 'visitante_id', 'caminho_foto_capturada', 'portao']
+# Colunas acrescentadas na exportação, vindas de Usuarios
+COLUNAS_USUARIO = ['matricula', 'nome_completo']
+# Nome dos arquivos de partição: logs-AAAA-MM.db
+_PADRAO_PARTICAO = re.compile(r'^logs-(\d{4}-\d{2})\.db$')
+
+def pasta_arquivo_de(db_path):
+    """
+    Pasta dos arquivos de logs de um banco: fica ao lado dele, em 'arquivo_logs'.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'arquivo_logs')
+
+def _inicio_do_mes(periodo):
+    return f'{periodo}-01 00:00:00'
+
+def _mes_seguinte(periodo):
+    ano, mes = map(int, periodo.split('-'))
+    ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return f'{ano:04d}-{mes:02d}'
+
+def listar_particoes(pasta):
+    """
+    Retorna a lista de (periodo 'AAAA-MM', caminho) dos meses arquivados, do mais antigo ao mais novo.
+    """
+    if not os.path.isdir(pasta):
+        return []
+    particoes = []
+    for nome in os.listdir(pasta):
+        encontrado = _PADRAO_PARTICAO.match(nome)
+        if encontrado:
+            particoes.append((encontrado.group(1), os.path.join(pasta, nome)))
+    return sorted(particoes)
+
+def _particoes_no_intervalo(pasta, inicio=None, fim=None):
+    """
+    Partições cujo mês tem alguma parte dentro de [inicio, fim).
+    """
+    return [
+        (periodo, caminho) for periodo, caminho in listar_particoes(pasta)
+        if (inicio is None or _inicio_do_mes(_mes_seguinte(periodo)) > inicio)
+        and (fim is None or _inicio_do_mes(periodo) < fim)
+    ]
+
+def _abrir_particao(caminho):
+    """
+    Abre (criando, se preciso) o arquivo de um mês, com a mesma tabela e os mesmos índices do banco principal.
+    """
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    conn = sqlite3.connect(caminho, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS LogsAcesso (
+            id INTEGER PRIMARY KEY,
+            timestamp_acesso TEXT NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('Aceito', 'Negado', 'Não Encontrado')),
+            usuario_id INTEGER,
+            visitante_id INTEGER,
+            caminho_foto_capturada TEXT,
+            portao TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON LogsAcesso(timestamp_acesso, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_usuario ON LogsAcesso(usuario_id, timestamp_acesso)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_status ON LogsAcesso(status, timestamp_acesso)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_portao ON LogsAcesso(portao, timestamp_acesso)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_foto ON LogsAcesso(caminho_foto_capturada)')
+    return conn
+
+# --- ARQUIVAMENTO ---
+
+def periodos_fechados(conn, meses_no_banco=MESES_NO_BANCO, agora=None):
+    """
+    Meses ('AAAA-MM') com logs no banco principal que já podem ser arquivados:
+    todos antes dos `meses_no_banco` meses fechados mais recentes.
+    """
+    agora = agora or datetime.now()
+    ano, mes = agora.year, agora.month - meses_no_banco
+    while mes < 1:
+        ano, mes = ano - 1, mes + 12
+    limite = f'{ano:04d}-{mes:02d}'
+
+    # O mais antigo vem do índice por timestamp; a partir dele, percorre mês a mês
+    c = conn.cursor()
+    c.execute("SELECT MIN(timestamp_acesso) FROM LogsAcesso")
+    mais_antigo = c.fetchone()[0]
+    periodos = []
+    periodo = mais_antigo[:7] if mais_antigo else limite
+    while periodo < limite:
+        c.execute('''
+            SELECT 1 FROM LogsAcesso WHERE timestamp_acesso >= ? AND timestamp_acesso < ? LIMIT 1
+        ''', (_inicio_do_mes(periodo), _inicio_do_mes(_mes_seguinte(periodo))))
+        if c.fetchone():
+            periodos.append(periodo)
+        periodo = _mes_seguinte(periodo)
+    return periodos
+
+def arquivar_periodo(conn, pasta, periodo, lote=LOTE_ARQUIVAMENTO):
+    """
+    Move os logs de um mês do banco principal para o arquivo do mês, em lotes.
+    Cada lote é primeiro gravado no arquivo (mantendo o id) e só depois apagado do banco;
+    se o processo for interrompido, basta rodar de novo. Retorna a quantidade de logs movidos.
+    """
+    inicio, fim = _inicio_do_mes(periodo), _inicio_do_mes(_mes_seguinte(periodo))
+    colunas = ', '.join(COLUNAS_LOGS)
+    arquivo = _abrir_particao(os.path.join(pasta, f'logs-{periodo}.db'))
+    movidos = 0
+    try:
+        while True:
+            # Os primeiros logs do mês pela ordem do índice: não há ordenação nem lista de ids
+            linhas = conn.execute(f'''
+                SELECT {colunas} FROM LogsAcesso
+                WHERE timestamp_acesso >= ? AND timestamp_acesso < ?
+                ORDER BY timestamp_acesso, id LIMIT ?
+            ''', (inicio, fim, lote)).fetchall()
+            if not linhas:
+                break
+            with arquivo:
+                arquivo.executemany(
+                    f"INSERT OR IGNORE INTO LogsAcesso ({colunas}) VALUES ({', '.join('?' * len(COLUNAS_LOGS))})",
+                    linhas
+                )
+            ultimo_id, ultimo_timestamp = linhas[-1][0], linhas[-1][1]
+            with conn:
+                conn.execute('''
+                    DELETE FROM LogsAcesso
+                    WHERE timestamp_acesso >= ?
+                      AND (timestamp_acesso < ? OR (timestamp_acesso = ? AND id <= ?))
+                ''', (inicio, ultimo_timestamp, ultimo_timestamp, ultimo_id))
+            movidos += len(linhas)
+    finally:
+        arquivo.close()
+    return movidos
+
+def arquivar(db_path=db_path, pasta=None, meses_no_banco=MESES_NO_BANCO, compactar=False):
+    """
+    Arquiva todos os meses fechados além dos `meses_no_banco` mais recentes.
+    As tabelas de resumo (ResumoAcessosHora/Dia) continuam no banco principal e seguem
+    contando os meses arquivados. Com `compactar`, devolve ao disco o espaço liberado (VACUUM).
+    Retorna um dicionário periodo -> logs movidos.
+    """
+    pasta = pasta or pasta_arquivo_de(db_path)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    movidos = {}
+    try:
+        for periodo in periodos_fechados(conn, meses_no_banco):
+            inicio = time.perf_counter()
+            movidos[periodo] = arquivar_periodo(conn, pasta, periodo)
+            print(f"[ARQUIVO] {periodo}: {movidos[periodo]} log(s) arquivado(s) em "
+                  f"{time.perf_counter() - inicio:.1f}s.")
+        if movidos:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            if compactar:
+                # VACUUM reescreve o banco inteiro e bloqueia as gravações: rode fora do horário de pico
+                conn.execute('VACUUM')
+    finally:
+        conn.close()
+    if not movidos:
+        print("[ARQUIVO] Nenhum mês fechado para arquivar.")
+    return movidos
+
+def desligar_capturas_arquivadas(db_path, caminhos):
+    """
+    Nos meses arquivados, deixa com caminho_foto_capturada = NULL os logs das capturas apagadas
+    (o mesmo que a retenção de capturas faz no banco principal).
+    """
+    for _, caminho in listar_particoes(pasta_arquivo_de(db_path)):
+        conn = sqlite3.connect(caminho, timeout=30)
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE LogsAcesso SET caminho_foto_capturada = NULL WHERE caminho_foto_capturada = ?",
+                    [(caminho_captura,) for caminho_captura in caminhos]
+                )
+        finally:
+            conn.close()
+
+# --- CONSULTAS SOBRE O BANCO E O ARQUIVO ---
+
+def _uri_somente_leitura(caminho):
+    return Path(os.path.abspath(caminho)).as_uri() + '?mode=ro'
+
+def _conectar_principal(db_path):
+    """
+    Abre o banco principal como URI: só assim os ATTACH de 'file:...?mode=ro' são entendidos
+    como URIs em qualquer build do SQLite (sem SQLITE_USE_URI, o Windows os trataria como nomes de arquivo).
+    """
+    return sqlite3.connect(Path(os.path.abspath(db_path)).as_uri(), uri=True, timeout=30)
+
+def _criar_visao(conn, particoes, com_principal=True):
+    """
+    Anexa os meses informados e cria a visão temporária `LogsAcesso` que os junta
+    (e, com `com_principal`, também o banco principal).
+    """
+    colunas = ', '.join(COLUNAS_LOGS)
+    partes = [f'SELECT {colunas} FROM main.LogsAcesso'] if com_principal else []
+    for i, (_, caminho) in enumerate(particoes):
+        conn.execute(f'ATTACH DATABASE ? AS arquivo{i}', (_uri_somente_leitura(caminho),))
+        partes.append(f'SELECT {colunas} FROM arquivo{i}.LogsAcesso')
+    # Objetos temporários têm precedência sobre os do banco principal com o mesmo nome
+    conn.execute(f"CREATE TEMP VIEW LogsAcesso AS {' UNION ALL '.join(partes)}")
+
+def _remover_visao(conn, particoes):
+    conn.execute('DROP VIEW temp.LogsAcesso')
+    for i in range(len(particoes)):
+        conn.execute(f'DETACH DATABASE arquivo{i}')
+
+def conectar_consulta(db_path=db_path, inicio=None, fim=None, pasta=None):
+    """
+    Abre uma conexão somente leitura para relatórios em que `LogsAcesso` é uma visão temporária
+    que junta o banco principal e os meses arquivados que tocam [inicio, fim). As consultas
+    existentes (ex.: log_queries.listar_logs) funcionam sem mudanças, e os filtros por data
+    chegam aos índices de cada mês. Como o SQLite limita a quantidade de bancos anexados,
+    intervalos muito longos precisam ser lidos com consultar_em_partes.
+    """
+    inicio, fim = _formatar(inicio), _formatar(fim)
+    # O banco principal (em modo WAL) é aberto normalmente; o query_only impede gravações
+    conn = _conectar_principal(db_path)
+    particoes = _particoes_no_intervalo(pasta or pasta_arquivo_de(db_path), inicio, fim)
+    if particoes:
+        limite = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(particoes) > limite:
+            conn.close()
+            raise ValueError(f"O intervalo abrange {len(particoes)} meses arquivados; o máximo por consulta é "
+                             f"{limite}. Use consultar_em_partes.")
+        _criar_visao(conn, particoes)
+    conn.execute('PRAGMA query_only = ON')
+    return conn
+
+def consultar_em_partes(consulta, parametros=(), db_path=db_path, inicio=None, fim=None, pasta=None):
+    """
+    Executa `consulta` (escrita sobre LogsAcesso, como em conectar_consulta) nos meses arquivados
+    que tocam [inicio, fim) e no banco principal, anexando de cada vez no máximo o limite de bancos
+    do SQLite, e gera as linhas em fluxo. ORDER BY, GROUP BY e LIMIT valem dentro de cada grupo de
+    meses (os grupos vêm do mais antigo ao banco principal), não sobre o resultado inteiro.
+    """
+    inicio, fim = _formatar(inicio), _formatar(fim)
+    particoes = _particoes_no_intervalo(pasta or pasta_arquivo_de(db_path), inicio, fim)
+    conn = _conectar_principal(db_path)
+    try:
+        limite = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        grupos = [particoes[i:i + limite] for i in range(0, len(particoes), limite)]
+        for numero, grupo in enumerate(grupos or [[]]):
+            # O banco principal entra uma única vez, junto com o último grupo
+            _criar_visao(conn, grupo, com_principal=numero == len(grupos) - 1 or not grupos)
+            conn.execute('PRAGMA query_only = ON')
+            try:
+                yield from conn.execute(consulta, parametros)
+            finally:
+                conn.execute('PRAGMA query_only = OFF')
+                _remover_visao(conn, grupo)
+    finally:
+        conn.close()
+
+def _formatar(valor):
+    if valor is None or isinstance(valor, str):
+        return valor
+    return valor.strftime('%Y-%m-%d %H:%M:%S')
+
+# --- EXPORTAÇÃO ---
+
+def _consultas_exportacao(db_path, pasta, inicio, fim):
+    """
+    Gera, em ordem cronológica, cursores com os logs de cada mês arquivado e, por último,
+    do banco principal. Cada mês é anexado sozinho, lido pela ordem do índice e desanexado.
+    """
+    condicoes, parametros = [], []
+    if inicio is not None:
+        condicoes.append('l.timestamp_acesso >= ?')
+        parametros.append(inicio)
+    if fim is not None:
+        condicoes.append('l.timestamp_acesso < ?')
+        parametros.append(fim)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+    colunas = ', '.join([f'l.{coluna}' for coluna in COLUNAS_LOGS] + [f'u.{coluna}' for coluna in COLUNAS_USUARIO])
+
+    fontes = [(f'arquivo_{periodo.replace("-", "_")}', caminho)
+              for periodo, caminho in _particoes_no_intervalo(pasta, inicio, fim)]
+    conn = _conectar_principal(db_path)
+    try:
+        for esquema, caminho in fontes + [('main', None)]:
+            if caminho is not None:
+                conn.execute(f'ATTACH DATABASE ? AS {esquema}', (_uri_somente_leitura(caminho),))
+            yield conn.execute(f'''
+                SELECT {colunas} FROM {esquema}.LogsAcesso l LEFT JOIN main.Usuarios u ON u.id = l.usuario_id
+                {where}
+                ORDER BY l.timestamp_acesso, l.id
+            ''', parametros)
+            if caminho is not None:
+                conn.execute(f'DETACH DATABASE {esquema}')
+    finally:
+        conn.close()
+
+def exportar_logs(saida, db_path=db_path, inicio=None, fim=None, pasta=None):
+    """
+    Exporta os logs de [inicio, fim) do banco principal e dos meses arquivados, com a matrícula
+    e o nome do usuário, em CSV ou Parquet (pela extensão de `saida`). Os logs são lidos e gravados
+    em fluxo, então a memória usada não depende do tamanho do período. Retorna a quantidade exportada.
+    """
+    inicio, fim = _formatar(inicio), _formatar(fim)
+    pasta = pasta or pasta_arquivo_de(db_path)
+    colunas = COLUNAS_LOGS + COLUNAS_USUARIO
+    extensao = os.path.splitext(saida)[1].lower()
+    exportados = 0
+
+    if extensao == '.csv':
+        # utf-8-sig para o Excel reconhecer os acentos
+        with open(saida, 'w', encoding='utf-8-sig', newline='') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(colunas)
+            for cursor in _consultas_exportacao(db_path, pasta, inicio, fim):
+                for linha in cursor:
+                    escritor.writerow(linha)
+                    exportados += 1
+    elif extensao == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Exportar em Parquet requer o pacote pyarrow (pip install pyarrow).")
+        esquema = pa.schema([
+            ('id', pa.int64()), ('timestamp_acesso', pa.string()), ('status', pa.string()),
+            ('usuario_id', pa.int64()), ('visitante_id', pa.int64()), ('caminho_foto_capturada', pa.string()),
+            ('portao', pa.string()), ('matricula', pa.string()), ('nome_completo', pa.string()),
+        ])
+        with pq.ParquetWriter(saida, esquema) as escritor:
+            for cursor in _consultas_exportacao(db_path, pasta, inicio, fim):
+                while True:
+                    linhas = cursor.fetchmany(LINHAS_POR_GRUPO)
+                    if not linhas:
+                        break
+                    escritor.write_table(pa.Table.from_arrays(
+                        [pa.array(valores, type=campo.type) for valores, campo in zip(zip(*linhas), esquema)],
+                        schema=esquema
+                    ))
+                    exportados += len(linhas)
+    else:
+        raise ValueError(f"Formato de exportação inválido: '{saida}'. Use .csv ou .parquet.")
+
+    print(f"[ARQUIVO] {exportados} log(s) exportado(s) para '{saida}'.")
+    return exportados
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Arquiva e exporta os logs de acesso.')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    arquivamento = comandos.add_parser('arquivar', help='Move os meses fechados para arquivos separados')
+    arquivamento.add_argument('--meses-no-banco', type=int, default=MESES_NO_BANCO,
+                              help='Meses fechados que continuam no banco principal')
+    arquivamento.add_argument('--compactar', action='store_true',
+                              help='Roda VACUUM depois (bloqueia as gravações; use fora do horário de pico)')
+    exportacao = comandos.add_parser('exportar', help='Exporta os logs (banco e arquivo) para CSV ou Parquet')
+    exportacao.add_argument('saida', help='Arquivo de saída (.csv ou .parquet)')
+    exportacao.add_argument('--desde', help="Data inicial (AAAA-MM-DD)")
+    exportacao.add_argument('--ate', help="Data final, inclusiva (AAAA-MM-DD)")
+    comandos.add_parser('particoes', help='Lista os meses arquivados')
+    args = parser.parse_args()
+
+    if args.comando == 'arquivar':
+        arquivar(meses_no_banco=args.meses_no_banco, compactar=args.compactar)
+    elif args.comando == 'exportar':
+        fim = (date.fromisoformat(args.ate) + timedelta(days=1)).isoformat() if args.ate else None
+        exportar_logs(args.saida, inicio=args.desde, fim=fim)
+    else:
+        for periodo, caminho in listar_particoes(pasta_arquivo_de(db_path)):
+            conn = sqlite3.connect(_uri_somente_leitura(caminho), uri=True)
+            try:
+                total = conn.execute("SELECT COUNT(*) FROM LogsAcesso").fetchone()[0]
+            finally:
+                conn.close()
+            print(f"{periodo}: {total} log(s), {os.path.getsize(caminho) / 1024 ** 2:.1f} MB")
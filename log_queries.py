@@ -0,0 +1,184 @@
+# Importa bibliotecas necessárias para consultar os logs de acesso de forma eficiente
+
+# Importa a classe datetime para aceitar datas tanto como texto quanto como objetos de data
+from datetime import datetime
+
+# Formato canônico de LogsAcesso.timestamp_acesso (texto ordenável como data)
+FORMATO_TIMESTAMP = '%Y-%m-%d %H:%M:%S'
+# Tamanho padrão de uma página de logs
+TAMANHO_PAGINA = 50
+
+# Tabelas de resumo mantidas por gatilhos: nome -> formato do período ('AAAA-MM-DD HH' ou 'AAAA-MM-DD')
+_RESUMOS = {
+    'ResumoAcessosHora': '%Y-%m-%d %H',
+    'ResumoAcessosDia': '%Y-%m-%d',
+}
+
+def migrar_logs(conn):
+    """
+    Prepara a tabela LogsAcesso para consultas rápidas: padroniza os timestamps,
+    cria os índices, as tabelas de resumo (por hora e por dia x status x portão) e os
+    gatilhos que as mantêm atualizadas a cada log gravado. Pode ser executada várias vezes.
+    """
+    c = conn.cursor()
+
+    # Padroniza timestamps gravados em outros formatos (ex.: com 'T' ou frações de segundo)
+    c.execute('''
+        UPDATE LogsAcesso
+        SET timestamp_acesso = strftime('%Y-%m-%d %H:%M:%S', timestamp_acesso)
+        WHERE strftime('%Y-%m-%d %H:%M:%S', timestamp_acesso) IS NOT NULL
+          AND timestamp_acesso != strftime('%Y-%m-%d %H:%M:%S', timestamp_acesso)
+    ''')
+    if c.rowcount > 0:
+        print(f"[DB SETUP] {c.rowcount} timestamp(s) de LogsAcesso padronizado(s).")
+
+    # Índices para as consultas por período, usuário, status e portão
+    c.execute('CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON LogsAcesso(timestamp_acesso, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_logs_usuario ON LogsAcesso(usuario_id, timestamp_acesso)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_logs_status ON LogsAcesso(status, timestamp_acesso)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_logs_portao ON LogsAcesso(portao, timestamp_acesso)')
+
+    for tabela, formato in _RESUMOS.items():
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS {tabela} (
+                periodo TEXT NOT NULL,
+                status TEXT NOT NULL,
+                portao TEXT NOT NULL DEFAULT '',
+                total INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (periodo, status, portao)
+            ) WITHOUT ROWID
+        ''')
+        # Cria o gatilho e preenche o resumo com os logs antigos na mesma transação
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f'trg_{tabela}',))
+        if c.fetchone() is None:
+            c.execute(f'''
+                CREATE TRIGGER trg_{tabela} AFTER INSERT ON LogsAcesso
+                BEGIN
+                    INSERT INTO {tabela} (periodo, status, portao, total)
+                    VALUES (COALESCE(strftime('{formato}', NEW.timestamp_acesso), NEW.timestamp_acesso),
+                            NEW.status, COALESCE(NEW.portao, ''), 1)
+                    ON CONFLICT (periodo, status, portao) DO UPDATE SET total = total + 1;
+                END
+            ''')
+            c.execute(f'DELETE FROM {tabela}')
+            c.execute(f'''
+                INSERT INTO {tabela} (periodo, status, portao, total)
+                SELECT strftime('{formato}', timestamp_acesso), status, COALESCE(portao, ''), COUNT(*)
+                FROM LogsAcesso
+                WHERE strftime('{formato}', timestamp_acesso) IS NOT NULL
+                GROUP BY 1, 2, 3
+            ''')
+            print(f"[DB SETUP] Tabela de resumo {tabela} criada a partir dos logs existentes.")
+
+def formatar_timestamp(valor):
+    """
+    Converte uma data (datetime ou texto) para o formato canônico de timestamp_acesso.
+    """
+    if valor is None or isinstance(valor, str):
+        return valor
+    return valor.strftime(FORMATO_TIMESTAMP)
+
+def _filtros(inicio=None, fim=None, usuario_id=None, status=None, portao=None):
+    """
+    Monta as condições WHERE (com os parâmetros) comuns às consultas de LogsAcesso.
+    """
+    condicoes, parametros = [], []
+    if inicio is not None:
+        condicoes.append('timestamp_acesso >= ?')
+        parametros.append(formatar_timestamp(inicio))
+    if fim is not None:
+        condicoes.append('timestamp_acesso < ?')
+        parametros.append(formatar_timestamp(fim))
+    if usuario_id is not None:
+        condicoes.append('usuario_id = ?')
+        parametros.append(usuario_id)
+    if status is not None:
+        condicoes.append('status = ?')
+        parametros.append(status)
+    if portao is not None:
+        condicoes.append('portao = ?')
+        parametros.append(portao)
+    return condicoes, parametros
+
+def listar_logs(conn, limite=TAMANHO_PAGINA, cursor=None, inicio=None, fim=None,
+                usuario_id=None, status=None, portao=None):
+    """
+    Lista os logs do mais recente para o mais antigo, com paginação por chave (keyset):
+    o cursor é o par (timestamp_acesso, id) do último log da página anterior, então cada
+    página custa o mesmo, não importa quão fundo se navegue.
+    Retorna (linhas, proximo_cursor); proximo_cursor é None na última página.
+    """
+    condicoes, parametros = _filtros(inicio, fim, usuario_id, status, portao)
+    if cursor is not None:
+        condicoes.append('(timestamp_acesso < ? OR (timestamp_acesso = ? AND id < ?))')
+        parametros.extend([cursor[0], cursor[0], cursor[1]])
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT id, timestamp_acesso, status, usuario_id, visitante_id, caminho_foto_capturada, portao
+        FROM LogsAcesso
+        {where}
+        ORDER BY timestamp_acesso DESC, id DESC
+        LIMIT ?
+    ''', parametros + [limite + 1])
+    linhas = c.fetchall()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = (linhas[-1][1], linhas[-1][0])
+    return linhas, proximo_cursor
+
+def resumo_acessos(conn, granularidade='dia', inicio=None, fim=None, status=None, portao=None):
+    """
+    Retorna os totais de acessos por período, status e portão a partir das tabelas de resumo,
+    como lista de (periodo, status, portao, total). granularidade é 'hora' ou 'dia'.
+    """
+    tabela = {'hora': 'ResumoAcessosHora', 'dia': 'ResumoAcessosDia'}[granularidade]
+    # Quantidade de caracteres do timestamp que formam o período ('AAAA-MM-DD HH' ou 'AAAA-MM-DD')
+    tamanho = 13 if granularidade == 'hora' else 10
+    condicoes, parametros = [], []
+    if inicio is not None:
+        condicoes.append('periodo >= ?')
+        parametros.append(formatar_timestamp(inicio)[:tamanho])
+    if fim is not None:
+        condicoes.append('periodo < ?')
+        parametros.append(formatar_timestamp(fim)[:tamanho])
+    if status is not None:
+        condicoes.append('status = ?')
+        parametros.append(status)
+    if portao is not None:
+        condicoes.append('portao = ?')
+        parametros.append(portao)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+    c = conn.cursor()
+    c.execute(f'SELECT periodo, status, portao, total FROM {tabela} {where} ORDER BY periodo', parametros)
+    return c.fetchall()
+
+def totais_por_status(conn, inicio=None, fim=None, portao=None):
+    """
+    Retorna um dicionário status -> total de acessos no intervalo, somando o resumo diário.
+    """
+    condicoes, parametros = [], []
+    if inicio is not None:
+        condicoes.append('periodo >= ?')
+        parametros.append(formatar_timestamp(inicio)[:10])
+    if fim is not None:
+        condicoes.append('periodo < ?')
+        parametros.append(formatar_timestamp(fim)[:10])
+    if portao is not None:
+        condicoes.append('portao = ?')
+        parametros.append(portao)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+    c = conn.cursor()
+    c.execute(f'SELECT status, SUM(total) FROM ResumoAcessosDia {where} GROUP BY status', parametros)
+    return dict(c.fetchall())
+
+def hoje():
+    """
+    Retorna o início do dia atual no formato de timestamp_acesso (útil para os filtros).
+    """
+    return datetime.now().strftime('%Y-%m-%d 00:00:00')
@@ -8,17 +8,60 @@ import mediapipe as mp
 import time
 # Importa a biblioteca OS para manipulação de caminhos de arquivos e diretórios (usada para salvar capturas e organizar pastas)
 import os
+# Importa a biblioteca argparse para escolher entre janela local e modo sem interface gráfica
+import argparse
+# Importa a biblioteca signal para encerrar com limpeza ao receber Ctrl+C ou SIGTERM
+import signal
+# Importa a biblioteca threading para sinalizar o encerramento ao loop principal
+import threading
 
 # Importa funções internas do sistema
 
 # Importa a função que cria o banco de dados e tabelas, garantindo que tudo esteja pronto antes de rodar o sistema
 from database_setup import criar_banco_de_dados
-# Importa a função que realiza a verificação facial comparando com dados existentes no banco
-from core_functions import verificar_pessoa
+# Importa o serviço que executa a verificação facial em segundo plano, sem travar a câmera
+from recognition_worker import ServicoReconhecimento
+# Importa a função que verifica vários rostos de uma vez (usada pelo serviço em segundo plano)
+from core_functions import verificar_pessoas_lote, preparar_em_segundo_plano, estado_prontidao
+# Importa as funções que convertem e recortam as detecções do MediaPipe
+from detection_utils import caixa_em_pixels, recortar_rosto
+# Importa a frente de detecção que pula cenas paradas, reduz o frame e limita a região de interesse
+from adaptive_detection import DetectorAdaptativo, LARGURA_DETECCAO
+# Importa o rastreador que acompanha cada rosto entre os frames
+from face_tracker import RastreadorFaces
+# Importa a avaliação de qualidade que escolhe o melhor recorte de cada pessoa
+from face_quality import pontuar_qualidade, SeletorMelhorRecorte
+# Importa a captura que lê a câmera em uma thread própria, entrega só o frame mais novo e reconecta sozinha
+from camera_capture import CapturaCamera
+# Importa a prévia MJPEG usada para acompanhar a câmera pelo navegador quando não há monitor
+from preview_stream import TransmissorPreview, FPS_PREVIEW, LARGURA_PREVIEW
+# Importa as métricas de tempo por etapa e os contadores expostos no endpoint /metrics
+from metrics import (ETAPAS, FRAMES, ROSTOS_DETECTADOS, iniciar_servidor_metricas, iniciar_log_periodico,
+                     PORTA_METRICAS, ENDERECO_METRICAS, marcar_inicializacao, LATENCIA_QUADRO, LATENCIA_DECISAO)
+
+# Lê as opções de execução
+parser = argparse.ArgumentParser(description='Reconhecimento facial contínuo de um portão.')
+parser.add_argument('--sem-janela', action='store_true',
+                    help='Roda sem interface gráfica (máquinas do portão sem monitor); encerre com Ctrl+C ou SIGTERM')
+parser.add_argument('--preview-porta', type=int, default=None,
+                    help='Porta da prévia MJPEG no navegador (desligada por padrão)')
+parser.add_argument('--preview-fps', type=float, default=FPS_PREVIEW,
+                    help='Quadros por segundo máximos da prévia')
+parser.add_argument('--preview-largura', type=int, default=LARGURA_PREVIEW,
+                    help='Largura máxima (em pixels) dos quadros da prévia')
+parser.add_argument('--metricas-porta', type=int, default=PORTA_METRICAS,
+                    help='Porta do endpoint /metrics (0 desativa)')
+parser.add_argument('--metricas-endereco', default=ENDERECO_METRICAS,
+                    help='Endereço do endpoint /metrics (0.0.0.0 expõe para outras máquinas)')
+args = parser.parse_args()
+MOSTRAR_JANELA = not args.sem_janela
 
 # Garante que o banco de dados e tabelas sejam criados ao iniciar
 criar_banco_de_dados()
 
+# Carrega e aquece o modelo de reconhecimento em segundo plano enquanto a câmera conecta
+preparar_em_segundo_plano()
+
 # Define caminhos das pastas principais
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 rostos_dir = os.path.join(BASE_DIR, 'rostos_cadastrados')
@@ -30,73 +73,176 @@ if not os.path.exists(rostos_dir):
 if not os.path.exists(capturas_dir):
     os.makedirs(capturas_dir)
 
-# Abre o stream de vídeo do IP Webcam (mude a URL conforme seu IP)
-video_capture = cv2.VideoCapture('http://192.168.0.0:8080/video') 
-
 # Inicializa os módulos do MediaPipe
 mp_face_detection = mp.solutions.face_detection
 mp_drawing = mp.solutions.drawing_utils
 
-# Define o intervalo entre verificações faciais
-INTERVALO_VERIFICACAO = 3.0
-ultimo_tempo_verificacao = 0
+# Cores (BGR) usadas para desenhar cada status
+CORES_STATUS = {'Aceito': (0, 200, 0), 'Negado': (0, 0, 255), 'Não Encontrado': (0, 165, 255)}
+
+# Nome do portão gravado nos logs de acesso desta câmera
+PORTAO = 'principal'
+
+# Abre o stream de vídeo do IP Webcam (mude a URL conforme seu IP); a leitura acontece em segundo plano
+video_capture = CapturaCamera('http://192.168.0.0:8080/video', nome=PORTAO)
+
+# Região de interesse (x1, y1, x2, y2, de 0 a 1) onde os rostos são procurados; None usa o frame inteiro
+REGIAO_INTERESSE = None
+# Largura (em pixels) do frame reduzido entregue ao MediaPipe
+LARGURA_DETECCAO_MAIN = LARGURA_DETECCAO
+
+# Porta e endereço do endpoint de métricas no formato do Prometheus (porta 0 desativa)
+PORTA_METRICAS_HTTP = args.metricas_porta
+ENDERECO_METRICAS_HTTP = args.metricas_endereco
+# Intervalo (em segundos) entre linhas de log com o resumo das métricas (None desativa)
+INTERVALO_LOG_METRICAS = None
+
+# Inicia o serviço de reconhecimento em segundo plano
+servico_reconhecimento = ServicoReconhecimento(funcao_lote=lambda recortes: verificar_pessoas_lote(recortes, PORTAO))
+# Acompanha os rostos entre frames: cada pessoa é verificada uma vez e a identidade fica em cache
+rastreador = RastreadorFaces()
+# Guarda o recorte mais nítido, frontal e bem enquadrado de cada rastro antes da verificação
+seletor_recortes = SeletorMelhorRecorte()
+# Instante de captura do frame de onde saiu o recorte enviado por cada rastro (latência até a decisão)
+instantes_captura = {}
+
+def desenhar_rastro(frame, rastro):
+    """
+    Escreve acima do rosto a identidade em cache do rastro (ou que ele está sendo verificado).
+    """
+    x1, y1, _, _ = rastro.caixa
+    if rastro.identidade is not None:
+        texto = rastro.identidade.status
+        if rastro.identidade.nome:
+            texto = f"{rastro.identidade.status}: {rastro.identidade.nome}"
+        cor = CORES_STATUS.get(rastro.identidade.status, (255, 255, 255))
+    elif rastro.pendente_desde is not None:
+        texto, cor = "Verificando...", (255, 255, 0)
+    else:
+        return
+    cv2.putText(frame, texto, (x1, max(20, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.7, cor, 2)
+
+def desenhar_prontidao(frame):
+    """
+    Avisa no canto do vídeo enquanto o reconhecimento ainda está sendo preparado.
+    """
+    estado = estado_prontidao()
+    if estado == 'pronto':
+        return
+    texto = "Reconhecimento indisponivel" if estado == 'falhou' else f"Preparando: {estado}..."
+    cv2.putText(frame, texto, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+# Expõe as métricas de cada etapa (leitura, detecção, recorte, modelo, comparação, gravações)
+if PORTA_METRICAS_HTTP:
+    iniciar_servidor_metricas(PORTA_METRICAS_HTTP, ENDERECO_METRICAS_HTTP)
+if INTERVALO_LOG_METRICAS:
+    iniciar_log_periodico(INTERVALO_LOG_METRICAS)
+
+# Prévia no navegador: só anota e comprime quadros enquanto alguém está assistindo
+preview = None
+if args.preview_porta:
+    preview = TransmissorPreview(args.preview_porta, fps=args.preview_fps, largura=args.preview_largura)
+
+# Ctrl+C e SIGTERM (systemd, docker stop) terminam o loop e liberam câmera, fila e logs
+encerrar = threading.Event()
+
+def ao_receber_sinal(sinal, _):
+    print(f"\n[INFO] Sinal {signal.Signals(sinal).name} recebido.")
+    encerrar.set()
+
+signal.signal(signal.SIGINT, ao_receber_sinal)
+signal.signal(signal.SIGTERM, ao_receber_sinal)
 
 # Mensagens iniciais no terminal
 print("\n[INFO] Sistema de reconhecimento facial contínuo iniciado.")
-print("Pressione 'Q' na janela da câmera para sair.")
+if MOSTRAR_JANELA:
+    print("Pressione 'Q' na janela da câmera para sair.")
+else:
+    print("Modo sem janela. Pressione Ctrl+C (ou envie SIGTERM) para sair.")
 
 # Inicia o loop principal com detecção facial ativa
 with mp_face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.6) as face_detection:
-    while True:
-        # Captura um frame do vídeo
-        ret, frame = video_capture.read()
-        if not ret:
-            print("[ERRO] Não foi possível capturar frame da câmera. Tentando novamente...")
-            time.sleep(2)
+    detector = DetectorAdaptativo(face_detection, regiao=REGIAO_INTERESSE, largura_deteccao=LARGURA_DETECCAO_MAIN,
+                                  camera=PORTAO)
+    while not encerrar.is_set():
+        # Pega o frame mais novo da câmera (a reconexão, se o stream cair, acontece na thread de captura)
+        with ETAPAS.medir('leitura_frame'):
+            frame, instante_captura = video_capture.ler(timeout=1.0)
+        if frame is None:
+            if video_capture.terminou:
+                break
             continue
+        ETAPAS.observar(time.monotonic() - instante_captura, 'idade_quadro')
 
-        # Converte a imagem para RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_detection.process(rgb_frame)
-
-        # Verifica se algum rosto foi detectado
-        rosto_detectado_na_frame = bool(results.detections)
-        if rosto_detectado_na_frame:
-            for detection in results.detections:
-                mp_drawing.draw_detection(frame, detection)
-
-        # Exibe o vídeo com deteções
-        cv2.imshow('Sistema de Reconhecimento Facial - Pressione Q para Sair', frame)
-
-        # Verificação automática após intervalo
+        # Detecta os rostos (pulando cenas paradas, no frame reduzido e só na região de interesse)
         tempo_atual = time.time()
-        if rosto_detectado_na_frame and (tempo_atual - ultimo_tempo_verificacao > INTERVALO_VERIFICACAO):
-            print("\n[INFO] Rosto detectado. Iniciando verificação...")
-
-            # Extrai coordenadas da caixa delimitadora do rosto
-            detection = results.detections[0]
-            bboxC = detection.location_data.relative_bounding_box
-            ih, iw, _ = frame.shape
-            x, y, w, h = int(bboxC.xmin * iw), int(bboxC.ymin * ih), int(bboxC.width * iw), int(bboxC.height * ih)
-            x1, y1 = max(0, x), max(0, y)
-            x2, y2 = min(iw, x + w), min(ih, y + h)
-
-            # Recorta o rosto da imagem
-            rosto_img_recortado = frame[y1:y2, x1:x2]
-
-            # Se a imagem for válida, chama a verificação
-            if rosto_img_recortado.size != 0:
-                verificar_pessoa(rosto_img_recortado)
+        deteccoes = detector.detectar(frame, tempo_atual)
+
+        # Recolhe os resultados que ficaram prontos desde o último frame e guarda no rastro correspondente
+        for rastro_id, resultado in servico_reconhecimento.obter_resultados():
+            rastreador.registrar_resultado(rastro_id, resultado, tempo_atual)
+            capturado_em = instantes_captura.pop(rastro_id, None)
+            if capturado_em is not None:
+                LATENCIA_DECISAO.observar(time.monotonic() - capturado_em, PORTAO)
+            decorrido = marcar_inicializacao('primeiro_reconhecimento')
+            if decorrido is not None:
+                print(f"[INFO] Primeiro reconhecimento {decorrido:.1f}s após o início.")
+
+        # Associa os rostos detectados aos rastros dos frames anteriores
+        FRAMES.incrementar(valor_rotulo=PORTAO)
+        ROSTOS_DETECTADOS.incrementar(len(deteccoes), PORTAO)
+        ih, iw = frame.shape[:2]
+        rastros = rastreador.atualizar([caixa_em_pixels(d, iw, ih) for d in deteccoes], tempo_atual)
+
+        # Envia para verificação apenas rostos novos (ou cuja identidade em cache expirou),
+        # recortando antes de desenhar qualquer coisa no frame e escolhendo o recorte de melhor qualidade
+        for rastro, detection in zip(rastros, deteccoes):
+            if not rastreador.precisa_verificar(rastro, tempo_atual):
+                continue
+            with ETAPAS.medir('recorte'):
+                rosto_img_recortado = recortar_rosto(frame, detection)
+            if rosto_img_recortado is None:
+                continue
+            # Só o melhor recorte da pessoa dentro de uma janela curta vai para verificação
+            with ETAPAS.medir('qualidade'):
+                nota, _ = pontuar_qualidade(rosto_img_recortado, detection)
+            melhor_recorte = seletor_recortes.oferecer(rastro.id, rosto_img_recortado, nota, tempo_atual)
+            if melhor_recorte is not None and servico_reconhecimento.submeter(melhor_recorte, chave=rastro.id):
+                rastreador.marcar_pendente(rastro, tempo_atual)
+                instantes_captura[rastro.id] = instante_captura
+                print(f"\n[INFO] Rosto detectado (rastro {rastro.id}). Iniciando verificação...")
+        seletor_recortes.limpar(rastreador.rastros)
+        LATENCIA_QUADRO.observar(time.monotonic() - instante_captura, PORTAO)
+
+        decorrido = marcar_inicializacao('primeiro_frame')
+        if decorrido is not None:
+            print(f"[INFO] Primeiro frame processado {decorrido:.1f}s após o início.")
+
+        # Desenha as detecções e a identidade de cada rastro apenas se alguém vai ver o frame
+        enviar_preview = preview is not None and preview.quer_quadro()
+        if not (MOSTRAR_JANELA or enviar_preview):
+            continue
+        for rastro, detection in zip(rastros, deteccoes):
+            mp_drawing.draw_detection(frame, detection)
+            desenhar_rastro(frame, rastro)
+        desenhar_prontidao(frame)
+        if enviar_preview:
+            preview.publicar(frame)
 
-            # Atualiza o tempo da última verificação
-            ultimo_tempo_verificacao = tempo_atual
+        if MOSTRAR_JANELA:
+            # Exibe o vídeo com deteções
+            cv2.imshow('Sistema de Reconhecimento Facial - Pressione Q para Sair', frame)
 
-        # Encerra o loop se 'q' for pressionado
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            # Encerra o loop se 'q' for pressionado
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
 
 # Libera recursos após o fim do programa
 print("\n[INFO] Encerrando o sistema...")
-video_capture.release()
-cv2.destroyAllWindows()
+servico_reconhecimento.encerrar()
+video_capture.encerrar()
+if preview is not None:
+    preview.encerrar()
+if MOSTRAR_JANELA:
+    cv2.destroyAllWindows()
 print("[INFO] Sistema finalizado.")
@@ -0,0 +1,373 @@
+# Importa bibliotecas necessárias para medir cada etapa do sistema e expor as medições
+
+# Importa a biblioteca threading para proteger os contadores e rodar o servidor de métricas
+import threading
+# Importa a biblioteca de tempo para cronometrar as etapas
+import time
+# Importa a biblioteca json para as linhas de log estruturadas
+import json
+# Importa a busca binária para achar o balde do histograma sem percorrer todos
+from bisect import bisect_left
+# Importa o servidor HTTP da biblioteca padrão para o endpoint no formato do Prometheus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# --- CONFIGURAÇÕES ---
+# Limites (em segundos) dos baldes dos histogramas de latência
+BALDES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Porta padrão do endpoint /metrics
+PORTA_METRICAS = 9100
+# Endereço padrão do endpoint /metrics: só a própria máquina; use '0.0.0.0' para um Prometheus em outra máquina
+ENDERECO_METRICAS = '127.0.0.1'
+
+# Todas as métricas criadas no processo, na ordem de criação
+_metricas = []
+_trava_metricas = threading.Lock()
+
+def _rotulos(pares):
+    """
+    Monta o trecho {nome="valor",...} de uma série, ignorando os pares sem valor.
+    """
+    itens = []
+    for nome, valor in pares:
+        if nome is None or valor is None:
+            continue
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        itens.append(f'{nome}="{valor}"')
+    return '{' + ','.join(itens) + '}' if itens else ''
+
+class _Metrica:
+    """
+    Base das métricas: nome, texto de ajuda e um rótulo opcional (ex.: etapa, status).
+    """
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulo=None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulo = rotulo
+        self._trava = threading.Lock()
+        with _trava_metricas:
+            _metricas.append(self)
+
+    def _linhas(self):
+        raise NotImplementedError
+
+    def exportar(self):
+        return [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}'] + self._linhas()
+
+class Contador(_Metrica):
+    """
+    Valor que só cresce (ex.: rostos detectados, verificações por status).
+    """
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulo=None):
+        super().__init__(nome, ajuda, rotulo)
+        self._valores = {}
+
+    def incrementar(self, quantidade=1, valor_rotulo=None):
+        with self._trava:
+            self._valores[valor_rotulo] = self._valores.get(valor_rotulo, 0) + quantidade
+
+    def valores(self):
+        with self._trava:
+            return dict(self._valores)
+
+    def retirar(self):
+        """
+        Retorna os valores acumulados e zera o contador (ver retirar_parciais).
+        """
+        with self._trava:
+            valores, self._valores = self._valores, {}
+        return valores
+
+    def somar(self, valores):
+        with self._trava:
+            for rotulo, quantidade in valores.items():
+                self._valores[rotulo] = self._valores.get(rotulo, 0) + quantidade
+
+    def _linhas(self):
+        return [
+            f'{self.nome}{_rotulos([(self.rotulo, r)])} {v}'
+            for r, v in self.valores().items()
+        ]
+
+class Medidor(_Metrica):
+    """
+    Valor que sobe e desce (ex.: profundidade de uma fila). Pode ser um número definido
+    diretamente ou uma função consultada só no momento da exportação (custo zero no caminho quente).
+    """
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, rotulo=None):
+        super().__init__(nome, ajuda, rotulo)
+        self._valores = {}
+
+    def definir(self, valor, valor_rotulo=None):
+        """
+        Define o valor (número ou função sem argumentos que devolve o número).
+        """
+        with self._trava:
+            self._valores[valor_rotulo] = valor
+
+    def valores(self):
+        with self._trava:
+            itens = list(self._valores.items())
+        resultado = {}
+        for rotulo, valor in itens:
+            try:
+                resultado[rotulo] = valor() if callable(valor) else valor
+            except Exception:
+                continue
+        return resultado
+
+    def _linhas(self):
+        return [
+            f'{self.nome}{_rotulos([(self.rotulo, r)])} {v}'
+            for r, v in self.valores().items()
+        ]
+
+class _Cronometro:
+    """
+    Gerenciador de contexto que mede o tempo de um bloco e o registra no histograma.
+    """
+    __slots__ = ('histograma', 'valor_rotulo', 'inicio')
+
+    def __init__(self, histograma, valor_rotulo):
+        self.histograma = histograma
+        self.valor_rotulo = valor_rotulo
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self.histograma.observar(time.perf_counter() - self.inicio, self.valor_rotulo)
+        return False
+
+class Histograma(_Metrica):
+    """
+    Distribuição de valores em baldes fixos (como no Prometheus). Registrar uma medição custa
+    uma busca binária e um incremento, então pode ficar ligado em todos os frames.
+    """
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulo=None, baldes=BALDES_LATENCIA):
+        super().__init__(nome, ajuda, rotulo)
+        self.baldes = tuple(baldes)
+        # valor do rótulo -> [contagem por balde (+ balde infinito), soma, total]
+        self._series = {}
+
+    def observar(self, valor, valor_rotulo=None):
+        indice = bisect_left(self.baldes, valor)
+        with self._trava:
+            serie = self._series.get(valor_rotulo)
+            if serie is None:
+                serie = self._series[valor_rotulo] = [[0] * (len(self.baldes) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def medir(self, valor_rotulo=None):
+        """
+        Uso: with HISTOGRAMA.medir('etapa'): ...
+        """
+        return _Cronometro(self, valor_rotulo)
+
+    def series(self):
+        with self._trava:
+            return {r: (list(s[0]), s[1], s[2]) for r, s in self._series.items()}
+
+    def retirar(self):
+        """
+        Retorna as séries acumuladas e zera o histograma (ver retirar_parciais).
+        """
+        with self._trava:
+            series, self._series = self._series, {}
+        return {r: (s[0], s[1], s[2]) for r, s in series.items()}
+
+    def somar(self, series):
+        with self._trava:
+            for rotulo, (contagens, soma, total) in series.items():
+                serie = self._series.get(rotulo)
+                if serie is None:
+                    serie = self._series[rotulo] = [[0] * (len(self.baldes) + 1), 0.0, 0]
+                serie[0] = [a + b for a, b in zip(serie[0], contagens)]
+                serie[1] += soma
+                serie[2] += total
+
+    def percentil(self, p, valor_rotulo=None):
+        """
+        Estima o percentil p (0 a 100) pelo limite superior do balde onde ele cai.
+        """
+        serie = self.series().get(valor_rotulo)
+        if serie is None or serie[2] == 0:
+            return None
+        alvo, acumulado = p / 100 * serie[2], 0
+        for limite, contagem in zip(self.baldes + (float('inf'),), serie[0]):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float('inf')
+
+    def _linhas(self):
+        linhas = []
+        for rotulo, (contagens, soma, total) in self.series().items():
+            base = [(self.rotulo, rotulo)]
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + (float('inf'),), contagens):
+                acumulado += contagem
+                le = '+Inf' if limite == float('inf') else repr(limite)
+                linhas.append(f'{self.nome}_bucket{_rotulos(base + [("le", le)])} {acumulado}')
+            linhas.append(f'{self.nome}_sum{_rotulos(base)} {soma}')
+            linhas.append(f'{self.nome}_count{_rotulos(base)} {total}')
+        return linhas
+
+# --- MÉTRICAS DO SISTEMA ---
+
+# Tempo de cada etapa: leitura do frame, detecção, recorte, qualidade, gravação da captura,
+# pré-processamento, modelo, comparação com a galeria e gravação dos logs
+ETAPAS = Histograma('facein_etapa_segundos', 'Tempo gasto em cada etapa do pipeline.', rotulo='etapa')
+ROSTOS_DETECTADOS = Contador('facein_rostos_detectados_total', 'Rostos detectados pelo MediaPipe.', rotulo='camera')
+FRAMES = Contador('facein_frames_total', 'Frames processados.', rotulo='camera')
+DETECCOES_PULADAS = Contador(
+    'facein_deteccoes_puladas_total', 'Frames sem movimento em que a detecção de rostos foi pulada.', rotulo='camera'
+)
+VERIFICACOES = Contador('facein_verificacoes_total', 'Verificações concluídas, por resultado.', rotulo='status')
+CACHE_IDENTIDADE = Contador(
+    'facein_cache_identidade_total', 'Rostos que dispensaram verificação por já terem identidade em cache.'
+)
+FILAS = Medidor('facein_fila_profundidade', 'Itens esperando em cada fila.', rotulo='fila')
+QUADROS_DESCARTADOS = Contador(
+    'facein_quadros_descartados_total', 'Frames lidos da câmera e substituídos por um mais novo antes de serem '
+    'processados.', rotulo='camera'
+)
+RECONEXOES = Contador('facein_reconexoes_total', 'Reaberturas da fonte de vídeo após uma falha.', rotulo='camera')
+CAMERA_CONECTADA = Medidor('facein_camera_conectada', '1 enquanto a fonte de vídeo entrega frames.', rotulo='camera')
+LATENCIA_QUADRO = Histograma(
+    'facein_captura_quadro_segundos', 'Tempo entre a captura do frame e o fim do seu processamento '
+    '(detecção, rastreio e envio para verificação).', rotulo='camera'
+)
+LATENCIA_DECISAO = Histograma(
+    'facein_captura_decisao_segundos', 'Tempo entre a captura do frame de um rosto e a decisão de acesso.',
+    rotulo='camera'
+)
+PRONTO = Medidor('facein_pronto', '1 quando o modelo e a galeria já estão carregados e aquecidos.')
+INICIALIZACAO = Medidor(
+    'facein_inicializacao_segundos', 'Tempo desde o início do processo até cada marco (primeiro frame, '
+    'modelo pronto, primeiro reconhecimento).', rotulo='marco'
+)
+
+# Momento em que o processo começou a subir (importação deste módulo)
+_inicio_processo = time.perf_counter()
+
+def marcar_inicializacao(marco):
+    """
+    Registra (apenas na primeira vez) quantos segundos se passaram desde o início do processo
+    até o marco informado. Retorna esse tempo, ou None se o marco já tinha sido registrado.
+    """
+    if marco in INICIALIZACAO.valores():
+        return None
+    decorrido = time.perf_counter() - _inicio_processo
+    INICIALIZACAO.definir(decorrido, marco)
+    return decorrido
+
+def exportar_texto():
+    """
+    Gera o texto de todas as métricas no formato de exposição do Prometheus.
+    """
+    with _trava_metricas:
+        metricas = list(_metricas)
+    linhas = []
+    for metrica in metricas:
+        linhas.extend(metrica.exportar())
+    return '\n'.join(linhas) + '\n'
+
+def retirar_parciais():
+    """
+    Retorna e zera, por nome da métrica, o que os contadores e histogramas acumularam no processo.
+    Usada pelos processos de reconhecimento do gate_server para entregar ao processo principal, junto
+    com cada lote, o que mediram; medidores não entram, pois não faz sentido somá-los entre processos.
+    """
+    with _trava_metricas:
+        metricas = [m for m in _metricas if isinstance(m, (Contador, Histograma))]
+    parciais = {}
+    for metrica in metricas:
+        valores = metrica.retirar()
+        if valores:
+            parciais[metrica.nome] = valores
+    return parciais
+
+def somar_parciais(parciais):
+    """
+    Soma às métricas deste processo os valores devolvidos por retirar_parciais em outro processo.
+    """
+    with _trava_metricas:
+        por_nome = {m.nome: m for m in _metricas}
+    for nome, valores in parciais.items():
+        metrica = por_nome.get(nome)
+        if metrica is not None:
+            metrica.somar(valores)
+
+def resumo_estruturado():
+    """
+    Resume as métricas em um dicionário (contadores, medidores e, por etapa, total, média e p95 em ms).
+    """
+    resumo = {}
+    with _trava_metricas:
+        metricas = list(_metricas)
+    for metrica in metricas:
+        if isinstance(metrica, Histograma):
+            resumo[metrica.nome] = {
+                str(rotulo): {
+                    'total': total,
+                    'media_ms': round(1000 * soma / total, 3) if total else None,
+                    'p95_ms': round(1000 * metrica.percentil(95, rotulo), 3) if total else None,
+                }
+                for rotulo, (_, soma, total) in metrica.series().items()
+            }
+        else:
+            resumo[metrica.nome] = {str(rotulo): valor for rotulo, valor in metrica.valores().items()}
+    return resumo
+
+class _TratadorMetricas(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        corpo = exportar_texto().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        # Não polui o terminal com uma linha por coleta
+        pass
+
+def iniciar_servidor_metricas(porta=PORTA_METRICAS, endereco=ENDERECO_METRICAS):
+    """
+    Sobe o endpoint http://endereco:porta/metrics em uma thread em segundo plano.
+    Retorna o servidor (use .shutdown() para parar).
+    """
+    servidor = ThreadingHTTPServer((endereco, porta), _TratadorMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='servidor-metricas', daemon=True).start()
+    print(f"[MÉTRICAS] Endpoint disponível em http://{endereco}:{porta}/metrics")
+    return servidor
+
+def iniciar_log_periodico(intervalo, prefixo='[MÉTRICAS]'):
+    """
+    Imprime, a cada `intervalo` segundos, uma linha JSON com o resumo das métricas.
+    Retorna o evento que interrompe o log quando ativado.
+    """
+    parar = threading.Event()
+
+    def executar():
+        while not parar.wait(intervalo):
+            print(f"{prefixo} {json.dumps(resumo_estruturado(), ensure_ascii=False)}")
+
+    threading.Thread(target=executar, name='log-metricas', daemon=True).start()
+    return parar
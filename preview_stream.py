@@ -0,0 +1,134 @@
+# Importa bibliotecas necessárias para acompanhar a câmera pelo navegador quando o sistema roda sem janela
+
+# Importa a biblioteca threading para servir o vídeo sem travar o loop de detecção
+import threading
+# Importa a biblioteca de tempo para limitar a taxa de quadros da prévia
+import time
+# Importa o servidor HTTP da biblioteca padrão para o stream MJPEG
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+# Importa a biblioteca OpenCV para reduzir e comprimir os quadros da prévia
+import cv2
+
+# --- CONFIGURAÇÕES ---
+# Porta padrão da prévia (http://maquina:porta/)
+PORTA_PREVIEW = 8081
+# Quadros por segundo máximos da prévia (independente da taxa da câmera)
+FPS_PREVIEW = 5
+# Largura máxima (em pixels) dos quadros da prévia
+LARGURA_PREVIEW = 640
+# Qualidade JPEG dos quadros da prévia
+QUALIDADE_PREVIEW = 70
+# Separador entre os quadros no stream multipart
+FRONTEIRA = 'quadro'
+
+# Página simples que exibe o stream no navegador
+PAGINA = """<!doctype html><html><head><meta charset="utf-8"><title>FaceIn - Prévia</title></head>
+<body style="margin:0;background:#111"><img src="/preview.mjpg" style="display:block;margin:auto;max-width:100%"></body></html>""".encode('utf-8')
+
+class TransmissorPreview:
+    """
+    Prévia MJPEG do vídeo anotado. O loop principal pergunta `quer_quadro()` antes de desenhar:
+    sem ninguém assistindo (ou antes do próximo intervalo) a resposta é não, e nenhum quadro é
+    anotado, reduzido ou comprimido.
+    """
+
+    def __init__(self, porta=PORTA_PREVIEW, fps=FPS_PREVIEW, largura=LARGURA_PREVIEW,
+                 qualidade=QUALIDADE_PREVIEW, endereco='0.0.0.0'):
+        self.intervalo = 1.0 / fps
+        self.largura = largura
+        self.qualidade = qualidade
+        self.clientes = 0
+        self._ultimo_envio = 0.0
+        self._jpeg = None
+        self._numero = 0
+        self._condicao = threading.Condition()
+
+        transmissor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                caminho = self.path.split('?')[0]
+                if caminho == '/':
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(PAGINA)))
+                    self.end_headers()
+                    self.wfile.write(PAGINA)
+                elif caminho == '/preview.mjpg':
+                    transmissor._transmitir(self)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, formato, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((endereco, porta), Tratador)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name='servidor-preview', daemon=True).start()
+        print(f"[PRÉVIA] Vídeo disponível em http://{endereco}:{porta}/")
+
+    def quer_quadro(self, agora=None):
+        """
+        Retorna True se há alguém assistindo e já passou o intervalo mínimo desde o último quadro.
+        """
+        if self.clientes == 0:
+            return False
+        agora = time.monotonic() if agora is None else agora
+        return agora - self._ultimo_envio >= self.intervalo
+
+    def publicar(self, frame):
+        """
+        Reduz, comprime e entrega o quadro (já anotado) a todos os clientes conectados.
+        """
+        self._ultimo_envio = time.monotonic()
+        altura, largura = frame.shape[:2]
+        if largura > self.largura:
+            frame = cv2.resize(frame, (self.largura, int(altura * self.largura / largura)),
+                               interpolation=cv2.INTER_AREA)
+        ok, dados = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.qualidade])
+        if not ok:
+            return
+        with self._condicao:
+            self._jpeg = dados.tobytes()
+            self._numero += 1
+            self._condicao.notify_all()
+
+    def _transmitir(self, tratador):
+        """
+        Envia os quadros a um cliente até ele desconectar ou a prévia ser encerrada.
+        """
+        tratador.send_response(200)
+        tratador.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={FRONTEIRA}')
+        tratador.send_header('Cache-Control', 'no-cache')
+        tratador.end_headers()
+        with self._condicao:
+            self.clientes += 1
+        visto = 0
+        try:
+            while True:
+                with self._condicao:
+                    if not self._condicao.wait_for(lambda: self._numero != visto or self._servidor is None, 5):
+                        continue
+                    if self._servidor is None:
+                        return
+                    jpeg, visto = self._jpeg, self._numero
+                tratador.wfile.write(
+                    f'--{FRONTEIRA}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n'.encode('ascii')
+                )
+                tratador.wfile.write(jpeg)
+                tratador.wfile.write(b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._condicao:
+                self.clientes -= 1
+
+    def encerrar(self):
+        servidor = self._servidor
+        with self._condicao:
+            self._servidor = None
+            self._condicao.notify_all()
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
@@ -0,0 +1,166 @@
+# Importa bibliotecas necessárias para executar o reconhecimento fora do loop da câmera
+
+# Importa a biblioteca threading para criar as threads de reconhecimento e sincronizar a fila
+import threading
+# Importa a biblioteca de tempo para marcar quando cada pedido entrou na fila
+import time
+# Importa a fila de duas pontas (usada como fila limitada de pedidos) e a fila de resultados
+from collections import deque
+import queue
+
+# Importa a função que verifica vários rostos com uma única chamada ao modelo
+from core_functions import verificar_pessoas_lote
+# Importa os limites padrão dos lotes de reconhecimento
+from embedding_batcher import TAMANHO_MAXIMO_LOTE, PRAZO_LOTE
+# Importa o medidor de profundidade das filas
+from metrics import FILAS
+
+# --- POLÍTICAS DE FILA CHEIA ---
+# Descarta o pedido mais antigo para abrir espaço para o novo (o rosto mais recente é o mais útil)
+DESCARTAR_ANTIGO = 'descartar_antigo'
+# Recusa o pedido novo e mantém os que já estavam na fila
+DESCARTAR_NOVO = 'descartar_novo'
+# Se já existe um pedido pendente para o mesmo rosto, apenas troca a imagem dele pela mais nova
+COALESCER = 'coalescer'
+
+class ServicoReconhecimento:
+    """
+    Executa verificar_pessoas_lote em um conjunto de threads, alimentado por uma fila limitada
+    de rostos recortados. O loop da câmera apenas enfileira os rostos e lê os resultados,
+    sem nunca esperar pela comparação facial. Cada thread retira da fila até 'tamanho_lote'
+    rostos (esperando no máximo 'prazo_lote' segundos por companhia) e os verifica juntos.
+    """
+
+    def __init__(self, funcao_lote=verificar_pessoas_lote, num_workers=1, tamanho_fila=32,
+                 politica=COALESCER, callback=None, tamanho_lote=TAMANHO_MAXIMO_LOTE, prazo_lote=PRAZO_LOTE):
+        # Função chamada para cada lote (recebe a lista de imagens e devolve a lista de resultados)
+        self.funcao_lote = funcao_lote
+        self.tamanho_lote = tamanho_lote
+        self.prazo_lote = prazo_lote
+        self.tamanho_fila = tamanho_fila
+        self.politica = politica
+        # Função opcional chamada (na thread do worker) com (chave, resultado) a cada resultado
+        self.callback = callback
+
+        self._pedidos = deque()
+        self._condicao = threading.Condition()
+        self._resultados = queue.Queue()
+        self._rodando = True
+        self._em_andamento = 0
+
+        # Contadores para acompanhar o comportamento da fila
+        self.enfileirados = 0
+        self.descartados = 0
+        self.coalescidos = 0
+        self.concluidos = 0
+
+        FILAS.definir(self.pendentes, 'reconhecimento')
+        self._threads = [
+            threading.Thread(target=self._executar, name=f'reconhecimento-{i}', daemon=True)
+            for i in range(num_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submeter(self, imagem_rosto, chave=None):
+        """
+        Enfileira um rosto para verificação. A chave identifica o rosto (ex.: ID de rastreio)
+        e é devolvida junto com o resultado. Retorna False se o pedido foi recusado.
+        """
+        with self._condicao:
+            if not self._rodando:
+                return False
+
+            # Já existe um pedido para o mesmo rosto: troca a imagem pela mais recente
+            if self.politica == COALESCER and chave is not None:
+                for pedido in self._pedidos:
+                    if pedido[0] == chave:
+                        pedido[1] = imagem_rosto
+                        self.coalescidos += 1
+                        return True
+
+            if len(self._pedidos) >= self.tamanho_fila:
+                if self.politica == DESCARTAR_NOVO:
+                    self.descartados += 1
+                    return False
+                self._pedidos.popleft()
+                self.descartados += 1
+
+            self._pedidos.append([chave, imagem_rosto, time.time()])
+            self.enfileirados += 1
+            self._condicao.notify()
+            return True
+
+    def _retirar_lote(self):
+        """
+        Espera pelo primeiro pedido e então até o prazo do lote (ou até o lote encher)
+        antes de retirar os pedidos da fila. Retorna None quando o serviço foi encerrado.
+        """
+        with self._condicao:
+            while self._rodando and not self._pedidos:
+                self._condicao.wait()
+            if not self._pedidos:
+                return None
+            limite = self._pedidos[0][2] + self.prazo_lote
+            while self._rodando and len(self._pedidos) < self.tamanho_lote:
+                espera = limite - time.time()
+                if espera <= 0:
+                    break
+                self._condicao.wait(espera)
+            quantidade = min(self.tamanho_lote, len(self._pedidos))
+            lote = [self._pedidos.popleft() for _ in range(quantidade)]
+            self._em_andamento += len(lote)
+            return lote
+
+    def _executar(self):
+        while True:
+            lote = self._retirar_lote()
+            if lote is None:
+                return
+            if not lote:
+                continue
+
+            chaves = [pedido[0] for pedido in lote]
+            try:
+                resultados = self.funcao_lote([pedido[1] for pedido in lote])
+            except Exception as e:
+                print(f"[ERRO] Falha no reconhecimento em segundo plano: {e}")
+                resultados = [None] * len(lote)
+            finally:
+                with self._condicao:
+                    self._em_andamento -= len(lote)
+                    self.concluidos += len(lote)
+
+            for chave, resultado in zip(chaves, resultados):
+                self._resultados.put((chave, resultado))
+                if self.callback is not None:
+                    self.callback(chave, resultado)
+
+    def obter_resultados(self):
+        """
+        Retorna, sem bloquear, todos os resultados prontos como lista de (chave, resultado).
+        """
+        prontos = []
+        while True:
+            try:
+                prontos.append(self._resultados.get_nowait())
+            except queue.Empty:
+                return prontos
+
+    def pendentes(self):
+        """
+        Quantidade de rostos na fila ou sendo verificados neste momento.
+        """
+        with self._condicao:
+            return len(self._pedidos) + self._em_andamento
+
+    def encerrar(self, esperar=True):
+        """
+        Para de aceitar pedidos. Os pedidos já enfileirados são concluídos antes das threads terminarem.
+        """
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        if esperar:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,7 @@
+# Configuração comum dos testes: os módulos do sistema ficam na raiz do repositório
+
+# Importa a biblioteca OS e a sys para colocar a raiz do repositório no caminho de importação
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
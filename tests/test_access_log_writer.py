@@ -0,0 +1,146 @@
+# Testes da gravação de logs de acesso em segundo plano (access_log_writer.py)
+
+# Importa a biblioteca sqlite3 para conferir e bloquear o banco de teste
+import sqlite3
+# Importa a biblioteca de tempo para esperar a thread de gravação
+import time
+# Importa a biblioteca pytest para os arquivos temporários
+import pytest
+
+# Importa a classe e as funções testadas
+import access_log_writer
+from access_log_writer import EscritorLogs, erro_passageiro
+
+# Tempo máximo (em segundos) que um teste espera por uma gravação em segundo plano
+LIMITE_ESPERA = 5.0
+
+@pytest.fixture
+def banco(tmp_path):
+    """
+    Banco com a tabela LogsAcesso (com a mesma restrição de status de database_setup.py).
+    """
+    caminho = str(tmp_path / 'logs.db')
+    conn = sqlite3.connect(caminho)
+    conn.execute('''
+        CREATE TABLE LogsAcesso (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp_acesso TEXT NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('Aceito', 'Negado', 'Não Encontrado')),
+            usuario_id INTEGER,
+            caminho_foto_capturada TEXT,
+            portao TEXT
+        )
+    ''')
+    conn.commit()
+    conn.close()
+    return caminho
+
+def _evento(i, status='Aceito'):
+    return (f'2024-01-01 08:00:{i:02d}', status, i, None, 'Portão 1')
+
+def _logs(caminho):
+    with sqlite3.connect(caminho) as conn:
+        return [linha[0] for linha in conn.execute("SELECT usuario_id FROM LogsAcesso ORDER BY id")]
+
+def _esperar(condicao):
+    limite = time.monotonic() + LIMITE_ESPERA
+    while not condicao():
+        assert time.monotonic() < limite, 'a gravação em segundo plano não aconteceu a tempo'
+        time.sleep(0.01)
+
+# --- Agrupamento ---
+
+def test_lote_cheio_e_gravado_sem_esperar_o_intervalo(banco):
+    escritor = EscritorLogs(banco, tamanho_lote=3, intervalo=60)
+    for i in range(3):
+        escritor.registrar(_evento(i))
+    _esperar(lambda: escritor.eventos_gravados == 3)
+    assert escritor.gravacoes == 1
+    escritor.encerrar()
+    assert _logs(banco) == [0, 1, 2]
+
+def test_lote_incompleto_e_gravado_ao_vencer_o_intervalo(banco):
+    escritor = EscritorLogs(banco, tamanho_lote=100, intervalo=0.05)
+    escritor.registrar(_evento(1))
+    escritor.registrar(_evento(2))
+    _esperar(lambda: escritor.eventos_gravados == 2)
+    assert escritor.gravacoes == 1
+    escritor.encerrar()
+
+def test_encerrar_grava_o_que_esta_na_fila(banco):
+    escritor = EscritorLogs(banco, tamanho_lote=100, intervalo=60)
+    for i in range(5):
+        escritor.registrar(_evento(i))
+    escritor.encerrar()
+    assert _logs(banco) == [0, 1, 2, 3, 4]
+    assert escritor.profundidade_fila() == 0
+
+# --- Eventos recusados ---
+
+def test_evento_invalido_nao_derruba_o_lote(banco, tmp_path, capsys):
+    rejeitados = tmp_path / 'rejeitados.txt'
+    escritor = EscritorLogs(banco, tamanho_lote=100, intervalo=60, arquivo_rejeitados=str(rejeitados))
+    escritor.registrar(_evento(1))
+    escritor.registrar(_evento(2, status='Talvez'))
+    escritor.registrar(_evento(3))
+    escritor.encerrar()
+    assert _logs(banco) == [1, 3]
+    assert (escritor.eventos_gravados, escritor.rejeitados, escritor.falhas) == (2, 1, 0)
+    assert 'Talvez' in rejeitados.read_text(encoding='utf-8')
+    # Todos os avisos do escritor vão para a saída de erros
+    saida = capsys.readouterr()
+    assert saida.out == ''
+    assert '[ERRO DE LOG]' in saida.err
+
+def test_erro_de_esquema_descarta_sem_tentar_de_novo(tmp_path):
+    # Banco sem a tabela LogsAcesso: esperar não resolve, os eventos são rejeitados na hora
+    escritor = EscritorLogs(str(tmp_path / 'vazio.db'), tamanho_lote=2, intervalo=60)
+    escritor.registrar(_evento(1))
+    escritor.registrar(_evento(2))
+    _esperar(lambda: escritor.rejeitados == 2)
+    escritor.encerrar()
+    assert escritor.falhas == 0 and escritor.eventos_gravados == 0
+
+# --- Banco ocupado ---
+
+def _bloquear(caminho):
+    conn = sqlite3.connect(caminho, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('BEGIN EXCLUSIVE')
+    return conn
+
+def test_banco_ocupado_mantem_o_lote_e_grava_depois(banco, monkeypatch):
+    monkeypatch.setattr(access_log_writer, 'TEMPO_ESPERA_BLOQUEIO', 0.01)
+    bloqueio = _bloquear(banco)
+    escritor = EscritorLogs(banco, tamanho_lote=2, intervalo=0.01, maximo_tentativas=1000)
+    escritor.registrar(_evento(1))
+    escritor.registrar(_evento(2))
+    _esperar(lambda: escritor.falhas >= 1)
+    assert escritor.rejeitados == 0
+    bloqueio.rollback()
+    bloqueio.close()
+    escritor.encerrar()
+    assert _logs(banco) == [1, 2]
+
+def test_banco_sempre_ocupado_desiste_depois_das_tentativas(banco, tmp_path, monkeypatch):
+    monkeypatch.setattr(access_log_writer, 'TEMPO_ESPERA_BLOQUEIO', 0.01)
+    rejeitados = tmp_path / 'rejeitados.txt'
+    bloqueio = _bloquear(banco)
+    try:
+        escritor = EscritorLogs(banco, tamanho_lote=2, intervalo=0.01, arquivo_rejeitados=str(rejeitados),
+                                maximo_tentativas=3)
+        escritor.registrar(_evento(1))
+        escritor.registrar(_evento(2))
+        # Encerrar não fica preso esperando o banco: o lote vai para os rejeitados
+        escritor.encerrar()
+    finally:
+        bloqueio.rollback()
+        bloqueio.close()
+    assert (escritor.falhas, escritor.rejeitados) == (3, 2)
+    assert len(rejeitados.read_text(encoding='utf-8').splitlines()) == 2
+    assert _logs(banco) == []
+
+def test_classificacao_dos_erros():
+    assert erro_passageiro(sqlite3.OperationalError('database is locked'))
+    assert not erro_passageiro(sqlite3.OperationalError('no such table: LogsAcesso'))
+    assert not erro_passageiro(sqlite3.IntegrityError('CHECK constraint failed'))
@@ -0,0 +1,168 @@
+# Testes do motor de regras de acesso (access_policy.py)
+
+# Importa a biblioteca sqlite3 para montar as regras em um banco de teste
+import sqlite3
+# Importa as classes de data para os momentos das decisões
+from datetime import datetime, date
+
+# Importa a biblioteca pytest para os bancos temporários
+import pytest
+
+# Importa a função que cria o banco de dados e tabelas
+from database_setup import criar_banco_de_dados
+# Importa o motor de regras e as peças testadas isoladamente
+from access_policy import Intervalos, MotorPoliticas, _momento, SEM_FIM
+
+# Segunda-feira, no meio do turno matutino
+SEGUNDA_AULA = datetime(2026, 3, 2, 9, 30)
+# A mesma segunda-feira, depois das aulas
+SEGUNDA_TARDE = datetime(2026, 3, 2, 19, 0)
+
+# --- Intervalos ---
+
+def test_momento_converte_datas_horarios_e_textos():
+    assert _momento('2026-03-02') == '2026-03-02 00:00:00'
+    assert _momento('2026-03-02', fim_do_dia=True) == '2026-03-02 23:59:59'
+    assert _momento('2026-03-02T08:15') == '2026-03-02 08:15:00'
+    assert _momento('2026-03-02 08:15:30.250') == '2026-03-02 08:15:30'
+    assert _momento(date(2026, 3, 2)) == '2026-03-02 00:00:00'
+    assert _momento(datetime(2026, 3, 2, 8, 15)) == '2026-03-02 08:15:00'
+    assert _momento('ontem') is None
+    assert _momento(None) is None
+
+def test_intervalos_incluem_as_duas_pontas():
+    intervalos = Intervalos([('2026-03-02 08:00:00', '2026-03-02 10:00:00', 'a')])
+    assert intervalos.ativo('2026-03-02 08:00:00') == 'a'
+    assert intervalos.ativo('2026-03-02 10:00:00') == 'a'
+    assert intervalos.ativo('2026-03-02 07:59:59') is None
+    assert intervalos.ativo('2026-03-02 10:00:01') is None
+
+def test_intervalo_longo_continua_valendo_depois_de_intervalos_curtos():
+    intervalos = Intervalos([
+        ('2026-03-01 00:00:00', '2026-03-31 23:59:59', 'longo'),
+        ('2026-03-05 00:00:00', '2026-03-05 23:59:59', 'curto'),
+        ('2026-03-10 00:00:00', '2026-03-11 23:59:59', 'outro'),
+    ])
+    # Depois dos curtos terem terminado, só o longo contém o momento
+    assert intervalos.ativo('2026-03-20 12:00:00') == 'longo'
+    assert intervalos.ativo('2026-03-10 12:00:00') == 'outro'
+    assert intervalos.ativo('2026-04-01 00:00:00') is None
+
+def test_intervalos_vazios_e_separados():
+    assert Intervalos([]).ativo('2026-03-02 08:00:00') is None
+    intervalos = Intervalos([
+        ('2026-03-01 00:00:00', '2026-03-01 23:59:59', 'primeiro'),
+        ('2026-03-03 00:00:00', '2026-03-03 23:59:59', 'terceiro'),
+    ])
+    assert intervalos.ativo('2026-03-02 12:00:00') is None
+    assert intervalos.ativo('2026-03-03 12:00:00') == 'terceiro'
+
+# --- Motor de regras sobre o banco ---
+
+@pytest.fixture
+def conn(tmp_path):
+    caminho = str(tmp_path / 'database.db')
+    criar_banco_de_dados(caminho)
+    conexao = sqlite3.connect(caminho)
+    conexao.executemany(
+        "INSERT INTO Usuarios (id, nome_completo, matricula, tipo, situacao, caminho_foto_rosto) VALUES (?, ?, ?, ?, ?, 'x')",
+        [(1, 'Aluna', '1', 'Discente', 'Normal'), (2, 'Docente', '2', 'Docente', 'Normal'),
+         (3, 'Suspenso', '3', 'Discente', 'Suspenso')]
+    )
+    conexao.execute("INSERT INTO Turmas (id, nome_turma, turno) VALUES (10, 'Info 1', 'Matutino')")
+    conexao.execute("INSERT INTO UsuarioTurma (usuario_id, turma_id) VALUES (1, 10)")
+    conexao.commit()
+    yield conexao
+    conexao.close()
+
+def _motor(conn, **opcoes):
+    motor = MotorPoliticas(**opcoes)
+    motor.atualizar(conn)
+    return motor
+
+def _suspender(conn, usuario_id, inicio, fim, motivo='Briga'):
+    conn.execute('''
+        INSERT INTO AcoesDisciplinares (usuario_id, operador_id, tipo, motivo, data_inicio, data_fim)
+        VALUES (?, 1, 'Suspensão', ?, ?, ?)
+    ''', (usuario_id, motivo, inicio, fim))
+    conn.commit()
+
+def test_sem_regras_o_acesso_e_liberado(conn):
+    assert _motor(conn).decidir(1, SEGUNDA_AULA) == (True, 'Acesso liberado')
+
+def test_suspensao_vale_ate_o_fim_do_ultimo_dia(conn):
+    _suspender(conn, 1, '2026-03-01', '2026-03-02')
+    motor = _motor(conn)
+    assert motor.decidir(1, datetime(2026, 3, 2, 23, 59)).permitido is False
+    assert 'Briga' in motor.decidir(1, SEGUNDA_AULA).motivo
+    assert motor.decidir(1, datetime(2026, 3, 3, 0, 0)).permitido is True
+    assert motor.decidir(1, datetime(2026, 2, 28, 12, 0)).permitido is True
+
+def test_suspensao_sem_data_fim_vale_por_tempo_indeterminado(conn):
+    _suspender(conn, 1, '2026-03-01', None)
+    motor = _motor(conn)
+    assert motor.suspensoes[1].fins == [SEM_FIM]
+    assert motor.decidir(1, datetime(2030, 1, 1)).motivo.startswith('Suspensão até segunda ordem')
+
+def test_suspensoes_sobrepostas_de_um_mesmo_usuario(conn):
+    _suspender(conn, 1, '2026-03-01', '2026-03-31', 'Longa')
+    _suspender(conn, 1, '2026-03-02', '2026-03-02', 'Curta')
+    motor = _motor(conn)
+    assert motor.decidir(1, datetime(2026, 3, 20)).permitido is False
+
+def test_situacao_suspenso_nega_sem_acao_disciplinar(conn):
+    assert _motor(conn).decidir(3, SEGUNDA_TARDE) == (False, "Usuário com situação 'Suspenso'")
+
+def test_permissao_especial_libera_ate_o_fim_do_dia_mesmo_suspenso(conn):
+    _suspender(conn, 1, '2026-03-01', '2026-03-10')
+    conn.execute('''
+        INSERT INTO PermissoesEspeciais (usuario_id, operador_id, justificativa, data_hora_permissao)
+        VALUES (1, 1, 'Consulta médica', '2026-03-02 09:00:00')
+    ''')
+    conn.commit()
+    motor = _motor(conn)
+    assert motor.decidir(1, datetime(2026, 3, 2, 8, 59)).permitido is False
+    assert motor.decidir(1, SEGUNDA_AULA) == (True, 'Permissão especial: Consulta médica')
+    assert motor.decidir(1, datetime(2026, 3, 2, 23, 59, 59)).permitido is True
+    assert motor.decidir(1, datetime(2026, 3, 3, 9, 0)).permitido is False
+
+def test_horario_de_aula_exige_liberacao_da_coapac(conn):
+    motor = _motor(conn, restringir_horario_aula=True)
+    assert motor.decidir(1, SEGUNDA_AULA) == (False, 'Horário de aula sem liberação da COAPAC')
+    # Fora do turno, no fim de semana ou para quem não é discente, a restrição não se aplica
+    assert motor.decidir(1, SEGUNDA_TARDE).permitido is True
+    assert motor.decidir(1, datetime(2026, 3, 7, 9, 30)).permitido is True
+    assert motor.decidir(2, SEGUNDA_AULA).permitido is True
+
+    conn.execute('''
+        INSERT INTO LiberacoesCOAPAC (turma_id, operador_id, justificativa, data_liberacao, horario_liberacao)
+        VALUES (10, 1, 'Professor ausente', '2026-03-02', '09:00')
+    ''')
+    conn.commit()
+    motor.atualizar(conn)
+    assert motor.decidir(1, datetime(2026, 3, 2, 8, 30)).permitido is False
+    assert motor.decidir(1, SEGUNDA_AULA) == (True, 'Liberação da COAPAC: Professor ausente')
+
+def test_visitante_so_passa_na_janela_programada(conn):
+    conn.execute('''
+        INSERT INTO Visitantes (id, nome_completo, documento, motivo_acesso, horario_programado_inicio, horario_programado_fim)
+        VALUES (5, 'Visitante', '123', 'Manutenção', '2026-03-02 08:00:00', '2026-03-02 12:00:00')
+    ''')
+    conn.commit()
+    motor = _motor(conn)
+    assert motor.decidir_visitante(5, SEGUNDA_AULA) == (True, 'Manutenção')
+    assert motor.decidir_visitante(5, SEGUNDA_TARDE).permitido is False
+    assert motor.decidir_visitante(99, SEGUNDA_AULA).permitido is False
+
+def test_atualizar_recarrega_so_os_grupos_cujas_tabelas_mudaram(conn):
+    motor = MotorPoliticas()
+    assert set(motor.atualizar(conn)) == set(MotorPoliticas._DEPENDENCIAS)
+    assert motor.atualizar(conn) == []
+
+    _suspender(conn, 1, '2026-03-01', '2026-03-05')
+    assert motor.atualizar(conn) == ['suspensoes']
+    conn.execute("INSERT INTO UsuarioTurma (usuario_id, turma_id) VALUES (2, 10)")
+    conn.commit()
+    assert motor.atualizar(conn) == ['turmas']
+    assert motor.turmas_usuario[2] == [10]
+    assert motor.recargas['suspensoes'] == 2 and motor.recargas['usuarios'] == 1
@@ -0,0 +1,124 @@
+# Testes do índice de vizinhos mais próximos (ann_index.py)
+
+# Importa a biblioteca NumPy para gerar embeddings de teste
+import numpy as np
+
+# Importa os índices e a sincronização com a galeria
+from ann_index import IndiceExato, IndiceIVF, sincronizar_indice, LINHA_LIVRE, MINIMO_PARA_TREINO
+
+DIMENSAO = 16
+
+def _vetores(quantidade, semente=0):
+    vetores = np.random.default_rng(semente).normal(size=(quantidade, DIMENSAO)).astype(np.float32)
+    return vetores / np.linalg.norm(vetores, axis=1, keepdims=True)
+
+def _preencher(indice, chaves, vetores):
+    for chave, vetor in zip(chaves, vetores):
+        indice.adicionar(chave, vetor)
+    return indice
+
+def test_exato_devolve_os_dois_mais_proximos_em_ordem():
+    vetores = _vetores(20)
+    indice = _preencher(IndiceExato(), range(20), vetores)
+    ids, distancias = indice.buscar(vetores[7], k=2)
+    assert ids[0] == 7
+    assert distancias[0] < 1e-5 and distancias[0] <= distancias[1]
+
+def test_ivf_sem_treino_busca_em_todos_os_rostos():
+    vetores = _vetores(50)
+    indice = _preencher(IndiceIVF(DIMENSAO), range(50), vetores)
+    exato = _preencher(IndiceExato(), range(50), vetores)
+    assert indice.centroides is None
+    for consulta in _vetores(10, semente=1):
+        assert indice.buscar(consulta, k=3)[0].tolist() == exato.buscar(consulta, k=3)[0].tolist()
+
+def test_ivf_treinado_com_todas_as_listas_e_igual_a_busca_exata():
+    vetores = _vetores(MINIMO_PARA_TREINO + 50)
+    chaves = list(range(len(vetores)))
+    indice = _preencher(IndiceIVF(DIMENSAO), chaves, vetores)
+    exato = _preencher(IndiceExato(), chaves, vetores)
+    assert indice.treinar()
+    indice.nprobe = len(indice.centroides)
+    for consulta in _vetores(20, semente=2):
+        assert indice.buscar(consulta, k=2)[0].tolist() == exato.buscar(consulta, k=2)[0].tolist()
+
+def test_treino_exige_o_minimo_de_rostos():
+    indice = _preencher(IndiceIVF(DIMENSAO), range(10), _vetores(10))
+    assert not indice.treinar()
+    assert indice.centroides is None
+
+def test_adicionar_a_mesma_chave_substitui_o_vetor():
+    vetores = _vetores(3)
+    indice = _preencher(IndiceIVF(DIMENSAO), [1, 2], vetores[:2])
+    indice.adicionar(1, vetores[2])
+    assert len(indice) == 2
+    ids, distancias = indice.buscar(vetores[2], k=1)
+    assert ids.tolist() == [1] and distancias[0] < 1e-5
+    # O vetor antigo não aparece mais
+    assert indice.buscar(vetores[0], k=2)[0].tolist().count(1) == 1
+
+def test_remover_libera_a_linha_para_a_proxima_insercao():
+    vetores = _vetores(4)
+    indice = _preencher(IndiceIVF(DIMENSAO), [1, 2, 3], vetores[:3])
+    indice.remover(2)
+    indice.remover(99)
+    assert indice.ids() == {1, 3}
+    assert 2 not in indice.buscar(vetores[1], k=3)[0].tolist()
+    indice.adicionar(4, vetores[3])
+    # A linha do removido foi reaproveitada: o bloco de vetores não cresceu
+    assert indice._total == 3
+    assert indice.buscar(vetores[3], k=1)[0].tolist() == [4]
+
+def test_remover_e_adicionar_depois_do_treino_atualiza_as_listas():
+    vetores = _vetores(MINIMO_PARA_TREINO + 1)
+    indice = _preencher(IndiceIVF(DIMENSAO), range(MINIMO_PARA_TREINO), vetores[:-1])
+    indice.treinar()
+    indice.nprobe = len(indice.centroides)
+    indice.remover(0)
+    indice.adicionar(-5, vetores[-1])
+    linhas_nas_listas = sorted(linha for lista in indice._listas for linha in lista)
+    assert linhas_nas_listas == sorted(indice._linha_do_id.values())
+    assert indice.buscar(vetores[-1], k=1)[0].tolist() == [-5]
+    assert 0 not in indice.buscar(vetores[0], k=5)[0].tolist()
+
+def test_chaves_negativas_nunca_confundidas_com_linhas_livres():
+    vetores = _vetores(3)
+    indice = _preencher(IndiceIVF(DIMENSAO), [-1, -2, 3], vetores)
+    indice.remover(-2)
+    ids, _ = indice.buscar(vetores[1], k=3)
+    assert sorted(ids.tolist()) == [-1, 3]
+    assert LINHA_LIVRE not in ids.tolist()
+
+def test_salvar_e_carregar_preserva_chaves_linhas_livres_e_buscas(tmp_path):
+    vetores = _vetores(MINIMO_PARA_TREINO + 10)
+    indice = _preencher(IndiceIVF(DIMENSAO), [-chave - 1 for chave in range(len(vetores))], vetores)
+    indice.treinar()
+    indice.remover(-3)
+    caminho = str(tmp_path / 'indice.npz')
+    indice.salvar(caminho)
+
+    carregado = IndiceIVF.carregar(caminho)
+    assert carregado.ids() == indice.ids()
+    assert carregado._linhas_livres == indice._linhas_livres
+    for consulta in _vetores(10, semente=3):
+        assert carregado.buscar(consulta, k=2)[0].tolist() == indice.buscar(consulta, k=2)[0].tolist()
+    assert IndiceIVF.carregar(str(tmp_path / 'inexistente.npz')) is None
+
+def test_sincronizar_aplica_apenas_as_diferencas():
+    vetores = _vetores(6)
+    indice = IndiceIVF(DIMENSAO)
+    assert sincronizar_indice(indice, [1, 2, 3], vetores[:3])
+    assert not sincronizar_indice(indice, [1, 2, 3], vetores[:3])
+
+    # Usuário 1 saiu, 2 trocou de foto, 4 e o modelo extra -7 entraram
+    novos = np.vstack([vetores[3], vetores[2], vetores[4], vetores[5]])
+    assert sincronizar_indice(indice, [2, 3, 4, -7], novos)
+    assert indice.ids() == {2, 3, 4, -7}
+    assert indice.buscar(vetores[3], k=1)[0].tolist() == [2]
+    assert indice.buscar(vetores[5], k=1)[0].tolist() == [-7]
+
+def test_sincronizar_treina_quando_a_galeria_atinge_o_minimo():
+    vetores = _vetores(MINIMO_PARA_TREINO)
+    indice = IndiceIVF(DIMENSAO)
+    sincronizar_indice(indice, list(range(MINIMO_PARA_TREINO)), vetores)
+    assert indice.centroides is not None
@@ -0,0 +1,176 @@
+# Testes do armazém de embeddings mapeado em memória (embedding_store.py)
+
+# Importa a biblioteca OS para conferir os arquivos de cada geração
+import os
+# Importa a biblioteca sqlite3 para o banco de onde os embeddings são sincronizados
+import sqlite3
+# Importa a biblioteca NumPy para gerar e comparar os vetores
+import numpy as np
+# Importa a biblioteca pytest para os testes parametrizados
+import pytest
+
+# Importa o armazém e os limites que decidem quando uma nova base é gravada
+import embedding_store
+from embedding_store import ArmazemEmbeddings
+
+DIMENSAO = 32
+VERSAO = 'teste-v1'
+
+def _vetor(semente):
+    vetor = np.random.default_rng(semente).normal(size=DIMENSAO).astype(np.float32)
+    return vetor / np.linalg.norm(vetor)
+
+def _banco(quantidade):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE Usuarios (id INTEGER PRIMARY KEY, embedding BLOB, modelo_embedding TEXT)")
+    conn.executemany("INSERT INTO Usuarios VALUES (?, ?, ?)",
+                     [(i, _vetor(i).tobytes(), VERSAO) for i in range(1, quantidade + 1)])
+    conn.commit()
+    return conn
+
+def _esperado(conn):
+    """
+    Dicionário id -> vetor, direto do banco, para comparar com o armazém.
+    """
+    return {chave: np.frombuffer(blob, dtype=np.float32) for chave, blob in
+            conn.execute("SELECT id, embedding FROM Usuarios WHERE embedding IS NOT NULL AND modelo_embedding = ?",
+                         (VERSAO,))}
+
+def _conferir(armazem, conn, tolerancia=1e-6):
+    esperado = _esperado(conn)
+    assert sorted(armazem.ids.tolist()) == sorted(esperado)
+    consulta = _vetor(999)
+    produtos = armazem.visao @ consulta
+    matriz = armazem.visao.como_float32()
+    assert armazem.visao.shape == (len(esperado), DIMENSAO)
+    for i, chave in enumerate(armazem.ids.tolist()):
+        assert np.allclose(armazem.visao[i], esperado[chave], atol=tolerancia)
+        assert np.allclose(matriz[i], esperado[chave], atol=tolerancia)
+        assert abs(produtos[i] - float(esperado[chave] @ consulta)) < tolerancia * 10
+
+def _arquivos(pasta):
+    return sorted(nome for nome in os.listdir(pasta) if nome.startswith(('base-', 'log-')))
+
+def test_primeira_sincronizacao_grava_uma_base(tmp_path):
+    conn = _banco(10)
+    armazem = ArmazemEmbeddings(str(tmp_path), 'float32')
+    assert armazem.sincronizar(conn, VERSAO) == 10
+    assert armazem.meta['geracao'] == 1 and armazem.meta['linhas'] == 10
+    _conferir(armazem, conn)
+    assert armazem.sincronizar(conn, VERSAO) == 0
+
+@pytest.mark.parametrize('formato, tolerancia', [('float16', 2e-3), ('int8', 2e-2)])
+def test_formatos_quantizados_ficam_perto_do_float32(tmp_path, formato, tolerancia):
+    conn = _banco(20)
+    armazem = ArmazemEmbeddings(str(tmp_path), formato)
+    armazem.sincronizar(conn, VERSAO)
+    assert armazem.visao.base.dtype == np.dtype(formato)
+    _conferir(armazem, conn, tolerancia)
+
+def test_formato_invalido_e_recusado(tmp_path):
+    with pytest.raises(ValueError):
+        ArmazemEmbeddings(str(tmp_path), 'float64')
+
+def test_remocoes_e_trocas_vao_para_o_log_sem_nova_base(tmp_path):
+    conn = _banco(10)
+    armazem = ArmazemEmbeddings(str(tmp_path), 'float32')
+    armazem.sincronizar(conn, VERSAO)
+
+    conn.execute("DELETE FROM Usuarios WHERE id IN (2, 5)")
+    conn.execute("UPDATE Usuarios SET embedding = ? WHERE id = 7", (_vetor(70).tobytes(),))
+    conn.execute("INSERT INTO Usuarios VALUES (11, ?, ?)", (_vetor(11).tobytes(), VERSAO))
+    conn.commit()
+    assert armazem.sincronizar(conn, VERSAO) == 4
+    assert armazem.meta['geracao'] == 1
+    assert os.path.getsize(tmp_path / 'log-1.bin') > 0
+    _conferir(armazem, conn)
+
+def test_id_removido_e_readicionado_volta_a_valer(tmp_path):
+    conn = _banco(5)
+    armazem = ArmazemEmbeddings(str(tmp_path), 'float32')
+    armazem.sincronizar(conn, VERSAO)
+    conn.execute("UPDATE Usuarios SET embedding = NULL WHERE id = 3")
+    conn.commit()
+    armazem.sincronizar(conn, VERSAO)
+    assert 3 not in armazem.ids.tolist()
+    conn.execute("UPDATE Usuarios SET embedding = ? WHERE id = 3", (_vetor(3).tobytes(),))
+    conn.commit()
+    armazem.sincronizar(conn, VERSAO)
+    _conferir(armazem, conn)
+
+def test_outro_processo_ve_o_log_ao_abrir(tmp_path):
+    conn = _banco(8)
+    escritor = ArmazemEmbeddings(str(tmp_path), 'float16')
+    escritor.sincronizar(conn, VERSAO)
+    leitor = ArmazemEmbeddings(str(tmp_path), 'float16')
+    assert leitor.abrir()
+    conn.execute("DELETE FROM Usuarios WHERE id = 1")
+    conn.commit()
+    escritor.sincronizar(conn, VERSAO)
+    # O leitor continua com a visão antiga até abrir de novo
+    assert 1 in leitor.ids.tolist()
+    leitor.abrir()
+    _conferir(leitor, conn, 2e-3)
+
+def test_log_grande_gera_nova_geracao_e_apaga_a_antiga(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, 'LIMITE_LOG', 3)
+    monkeypatch.setattr(embedding_store, 'FRACAO_LOG', 0.0)
+    conn = _banco(10)
+    armazem = ArmazemEmbeddings(str(tmp_path), 'float32')
+    armazem.sincronizar(conn, VERSAO)
+    conn.execute("DELETE FROM Usuarios WHERE id <= 2")
+    conn.commit()
+    armazem.sincronizar(conn, VERSAO)
+    assert armazem.meta['geracao'] == 1
+
+    conn.execute("DELETE FROM Usuarios WHERE id IN (3, 4)")
+    conn.commit()
+    armazem.sincronizar(conn, VERSAO)
+    # 4 registros no log passam do limite: a base é regravada só com os vivos
+    assert armazem.meta['geracao'] == 2 and armazem.meta['linhas'] == 6
+    assert all(nome.startswith('base-2') for nome in _arquivos(tmp_path))
+    _conferir(armazem, conn)
+
+def test_troca_de_versao_ou_formato_regrava_a_base(tmp_path):
+    conn = _banco(6)
+    ArmazemEmbeddings(str(tmp_path), 'float32').sincronizar(conn, VERSAO)
+
+    armazem = ArmazemEmbeddings(str(tmp_path), 'int8')
+    armazem.sincronizar(conn, VERSAO)
+    assert armazem.meta['geracao'] == 2 and armazem.meta['formato'] == 'int8'
+
+    conn.execute("UPDATE Usuarios SET modelo_embedding = 'teste-v2'")
+    conn.commit()
+    assert armazem.sincronizar(conn, 'teste-v2') == 6
+    assert armazem.meta['geracao'] == 3 and armazem.meta['versao'] == 'teste-v2'
+
+def test_todos_removidos_deixam_a_visao_vazia(tmp_path):
+    conn = _banco(4)
+    armazem = ArmazemEmbeddings(str(tmp_path), 'float32')
+    armazem.sincronizar(conn, VERSAO)
+    conn.execute("UPDATE Usuarios SET modelo_embedding = 'antiga'")
+    conn.commit()
+    assert armazem.sincronizar(conn, VERSAO) == 4
+    assert len(armazem.ids) == 0 and len(armazem.visao) == 0
+    assert len(armazem.visao @ _vetor(1)) == 0
+
+def test_versao_nova_sem_embeddings_apaga_o_armazem(tmp_path):
+    conn = _banco(4)
+    armazem = ArmazemEmbeddings(str(tmp_path), 'float32')
+    armazem.sincronizar(conn, VERSAO)
+    armazem.sincronizar(conn, 'teste-v2')
+    assert armazem.visao is None and len(armazem.ids) == 0
+    assert not os.path.exists(tmp_path / 'atual.json')
+    assert _arquivos(tmp_path) == []
+    assert not ArmazemEmbeddings(str(tmp_path), 'float32').abrir()
+
+def test_aplicar_anexa_sem_consultar_o_banco(tmp_path):
+    conn = _banco(5)
+    armazem = ArmazemEmbeddings(str(tmp_path), 'float32')
+    armazem.sincronizar(conn, VERSAO)
+    assert armazem.aplicar(VERSAO, [(-1, _vetor(100))], [2])
+    assert sorted(armazem.ids.tolist()) == [-1, 1, 3, 4, 5]
+    assert np.allclose(armazem.visao[list(armazem.ids).index(-1)], _vetor(100))
+    # Versão diferente: nada muda, a próxima sincronização resolve
+    assert not armazem.aplicar('outra', [(-2, _vetor(101))], [])
+    assert -2 not in armazem.ids.tolist()
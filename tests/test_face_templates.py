@@ -0,0 +1,154 @@
+# Testes dos vários modelos faciais por usuário (face_gallery.Galeria.com_modelos e face_templates.py)
+
+# Importa a biblioteca sqlite3 para o banco de teste
+import sqlite3
+# Importa a classe namedtuple para simular o resultado de uma busca
+from collections import namedtuple
+# Importa as classes de data para criar modelos antigos
+from datetime import datetime, timedelta
+# Importa a biblioteca NumPy para gerar os embeddings
+import numpy as np
+# Importa a biblioteca pytest para os bancos temporários
+import pytest
+
+# face_gallery carrega os backends de embedding, que dependem do OpenCV
+pytest.importorskip('cv2')
+
+# Importa a função que cria o banco de dados e tabelas
+from database_setup import criar_banco_de_dados
+# Importa a galeria, o armazém e as funções de modelos testadas
+from face_gallery import Galeria, CONSULTA_MODELOS, VERSAO_MODELO, embedding_para_blob
+from embedding_store import ArmazemEmbeddings
+from ann_index import IndiceIVF, sincronizar_indice
+import face_templates
+
+DIMENSAO = 64
+USUARIOS = 20
+
+def _vetor(semente):
+    vetor = np.random.default_rng(semente).normal(size=DIMENSAO).astype(np.float32)
+    return vetor / np.linalg.norm(vetor)
+
+@pytest.fixture
+def conn(tmp_path):
+    caminho = str(tmp_path / 'database.db')
+    criar_banco_de_dados(caminho)
+    conexao = sqlite3.connect(caminho)
+    conexao.executemany('''
+        INSERT INTO Usuarios (id, nome_completo, matricula, tipo, situacao, caminho_foto_rosto, embedding, modelo_embedding)
+        VALUES (?, ?, ?, 'Discente', 'Normal', 'x', ?, ?)
+    ''', [(i, f'Usuário {i}', str(i), embedding_para_blob(_vetor(i)), VERSAO_MODELO) for i in range(1, USUARIOS + 1)])
+    conexao.commit()
+    yield conexao
+    conexao.close()
+
+def _galeria(conn, pasta):
+    return Galeria.do_armazem(ArmazemEmbeddings(str(pasta), 'float32', consulta=CONSULTA_MODELOS), conn)
+
+def _modelo(conn, usuario_id, semente, origem='captura', **colunas):
+    modelo_id = face_templates.adicionar_modelo(conn, usuario_id, f'{semente}.jpg', origem, _vetor(semente))
+    if colunas:
+        conn.execute(f"UPDATE ModelosFaciais SET {', '.join(f'{nome} = ?' for nome in colunas)} WHERE id = ?",
+                     list(colunas.values()) + [modelo_id])
+        conn.commit()
+    return modelo_id
+
+# --- Galeria.com_modelos ---
+
+def test_com_modelos_adiciona_e_remove_sem_recarregar(conn, tmp_path):
+    galeria = _galeria(conn, tmp_path / 'emb')
+    modelo_id = _modelo(conn, 3, 100)
+    nova = galeria.com_modelos([(-modelo_id, 3, _vetor(100))], conn=conn)
+    assert len(nova) == USUARIOS + 1 and len(galeria) == USUARIOS
+    resultado = nova.buscar(_vetor(100))
+    assert (resultado.usuario_id, resultado.chave) == (3, -modelo_id)
+    assert nova.usos is galeria.usos
+
+    sem_modelo = nova.com_modelos([], [-modelo_id], conn=conn)
+    assert -modelo_id not in sem_modelo.chaves.tolist()
+    assert sem_modelo.com_modelos([], [-modelo_id]) is sem_modelo
+
+def test_duas_galerias_sobre_o_mesmo_armazem(conn, tmp_path):
+    # Dois processos (ex.: workers do gate_server) com a mesma pasta de embeddings
+    galeria_a = _galeria(conn, tmp_path / 'emb')
+    galeria_b = _galeria(conn, tmp_path / 'emb')
+    modelo_b = _modelo(conn, 4, 200)
+    galeria_b = galeria_b.com_modelos([(-modelo_b, 4, _vetor(200))], conn=conn)
+
+    # A galeria A recebe do log compartilhado também o modelo gravado por B
+    modelo_a = _modelo(conn, 5, 300)
+    nova_a = galeria_a.com_modelos([(-modelo_a, 5, _vetor(300))], conn=conn)
+    assert nova_a is not None
+    assert nova_a.buscar(_vetor(200)).usuario_id == 4
+    assert nova_a.buscar(_vetor(300)).usuario_id == 5
+
+    # Sem acesso ao banco, o dono do modelo de B não pode ser resolvido: a galeria pede recarga
+    galeria_c = _galeria(conn, tmp_path / 'emb_c')
+    galeria_d = _galeria(conn, tmp_path / 'emb_c')
+    modelo_d = _modelo(conn, 6, 250)
+    galeria_d.com_modelos([(-modelo_d, 6, _vetor(250))], conn=conn)
+    assert galeria_c.com_modelos([]) is galeria_c
+    assert galeria_c.com_modelos([], [-modelo_a]) is None
+
+    # Remoção feita por B também chega a A
+    galeria_b.com_modelos([], [-modelo_b], conn=conn)
+    modelo_a2 = _modelo(conn, 9, 400)
+    outra_a = nova_a.com_modelos([(-modelo_a2, 9, _vetor(400))], conn=conn)
+    assert -modelo_b not in outra_a.chaves.tolist()
+
+def test_indice_recebe_os_modelos_de_outros_processos(conn, tmp_path):
+    galeria_a = _galeria(conn, tmp_path / 'emb')
+    galeria_a.indice = IndiceIVF(DIMENSAO)
+    sincronizar_indice(galeria_a.indice, galeria_a.chaves, galeria_a.matriz)
+    galeria_b = _galeria(conn, tmp_path / 'emb')
+    modelo_b = _modelo(conn, 7, 500)
+    galeria_b.com_modelos([(-modelo_b, 7, _vetor(500))], conn=conn)
+
+    modelo_a = _modelo(conn, 8, 600)
+    nova_a = galeria_a.com_modelos([(-modelo_a, 8, _vetor(600))], conn=conn)
+    assert {-modelo_a, -modelo_b} <= galeria_a.indice.ids()
+    resultado = nova_a.buscar(_vetor(500))
+    assert (resultado.usuario_id, resultado.chave) == (7, -modelo_b)
+    assert resultado.distancia == pytest.approx(0.0, abs=1e-5)
+    # A galeria antiga ignora as chaves que entraram depois dela
+    assert galeria_a.buscar(_vetor(600)).chave != -modelo_a
+
+# --- Incorporação de capturas e descarte ---
+
+Busca = namedtuple('Busca', ['usuario_id', 'distancia', 'margem', 'chave'])
+
+def test_incorporar_respeita_confianca_novidade_e_intervalo(conn, tmp_path):
+    galeria = _galeria(conn, tmp_path / 'emb')
+    nova_captura = _vetor(700)
+    assert face_templates.incorporar_captura(conn, galeria, Busca(1, 0.2, 0.5, 1), nova_captura, 'a.jpg') is None
+    assert face_templates.incorporar_captura(conn, galeria, Busca(1, 0.1, 0.05, 1), nova_captura, 'a.jpg') is None
+    # Quase igual à foto principal: não acrescenta nada
+    assert face_templates.incorporar_captura(conn, galeria, Busca(1, 0.0, 0.5, 1), _vetor(1), 'a.jpg') is None
+
+    modelo_id, descartados = face_templates.incorporar_captura(conn, galeria, Busca(1, 0.1, 0.5, 1), nova_captura, 'a.jpg')
+    assert descartados == []
+    assert conn.execute("SELECT usuario_id, origem FROM ModelosFaciais WHERE id = ?", (modelo_id,)).fetchone() == (1, 'captura')
+    # Uma captura por usuário a cada INTERVALO_INCORPORACAO_HORAS
+    assert face_templates.incorporar_captura(conn, galeria, Busca(1, 0.1, 0.5, 1), _vetor(701), 'b.jpg') is None
+
+def test_descarte_no_limite_tira_a_captura_menos_usada(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(face_templates, 'MAXIMO_MODELOS_POR_USUARIO', 3)
+    antigo = (datetime.now() - timedelta(days=10)).strftime('%Y-%m-%d %H:%M:%S')
+    cadastro = _modelo(conn, 2, 800, origem='cadastro', criado_em=antigo)
+    muito_usado = _modelo(conn, 2, 801, usos=50, criado_em=antigo)
+    pouco_usado = _modelo(conn, 2, 802, usos=1, criado_em=antigo)
+
+    galeria = _galeria(conn, tmp_path / 'emb')
+    # Usos contados em memória e ainda não gravados também entram na conta
+    galeria.usos[-pouco_usado] = 100
+    modelo_id, descartados = face_templates.incorporar_captura(conn, galeria, Busca(2, 0.1, 0.5, 2), _vetor(803), 'c.jpg')
+    assert descartados == [muito_usado]
+    restantes = {linha[0] for linha in conn.execute("SELECT id FROM ModelosFaciais WHERE usuario_id = 2")}
+    assert restantes == {cadastro, pouco_usado, modelo_id}
+    assert galeria.usos == {}
+
+def test_fotos_de_cadastro_nunca_sao_descartadas(conn):
+    modelos = [_modelo(conn, 9, 900 + i, origem='cadastro') for i in range(4)]
+    assert face_templates._descartar_excedentes(conn, 9, 2) == []
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM ModelosFaciais WHERE usuario_id = 9").fetchone()[0] == len(modelos)
@@ -0,0 +1,141 @@
+# Testes da paginação e das tabelas de resumo de LogsAcesso (log_queries.py)
+
+# Importa a biblioteca sqlite3 para criar bancos de teste em memória
+import sqlite3
+# Importa a classe datetime para testar os filtros com objetos de data
+from datetime import datetime
+
+# Importa a migração e as consultas testadas
+from log_queries import migrar_logs, listar_logs, resumo_acessos, totais_por_status
+
+def _banco(logs=()):
+    """
+    Banco em memória com a tabela LogsAcesso (como em database_setup.py), os logs informados
+    gravados antes da migração e a migração aplicada.
+    """
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE LogsAcesso (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp_acesso TEXT NOT NULL,
+            status TEXT NOT NULL,
+            usuario_id INTEGER,
+            visitante_id INTEGER,
+            caminho_foto_capturada TEXT,
+            portao TEXT
+        )
+    ''')
+    _gravar(conn, logs)
+    migrar_logs(conn)
+    conn.commit()
+    return conn
+
+def _gravar(conn, logs):
+    conn.executemany(
+        "INSERT INTO LogsAcesso (timestamp_acesso, status, usuario_id, portao) VALUES (?, ?, ?, ?)", logs
+    )
+
+def _paginas(conn, limite, **filtros):
+    paginas, cursor = [], None
+    while True:
+        linhas, cursor = listar_logs(conn, limite=limite, cursor=cursor, **filtros)
+        paginas.append([linha[0] for linha in linhas])
+        if cursor is None:
+            return paginas
+
+# --- Paginação ---
+
+def test_paginas_cobrem_todos_os_logs_sem_repetir_mesmo_com_timestamps_iguais():
+    # Vários logs no mesmo segundo: o id desempata
+    logs = [(f'2026-03-01 08:00:{segundo // 3:02d}', 'Aceito', 1, 'A') for segundo in range(20)]
+    conn = _banco()
+    _gravar(conn, logs)
+    paginas = _paginas(conn, limite=4)
+    ids = [log_id for pagina in paginas for log_id in pagina]
+    assert ids == list(range(20, 0, -1))
+    assert all(len(pagina) == 4 for pagina in paginas)
+
+def test_ultima_pagina_cheia_nao_devolve_cursor():
+    conn = _banco([('2026-03-01 08:00:00', 'Aceito', 1, 'A')] * 6)
+    linhas, cursor = listar_logs(conn, limite=3)
+    assert len(linhas) == 3 and cursor == ('2026-03-01 08:00:00', 4)
+    linhas, cursor = listar_logs(conn, limite=3, cursor=cursor)
+    assert [linha[0] for linha in linhas] == [3, 2, 1]
+    assert cursor is None
+
+def test_banco_vazio_devolve_pagina_vazia():
+    assert listar_logs(_banco(), limite=10) == ([], None)
+
+def test_filtros_valem_em_todas_as_paginas():
+    logs = []
+    for i in range(30):
+        logs.append((f'2026-03-{1 + i % 5:02d} 10:00:00', ('Aceito', 'Negado')[i % 2], i % 3, ('A', 'B')[i % 4 == 0]))
+    conn = _banco(logs)
+    filtros = dict(inicio=datetime(2026, 3, 2), fim='2026-03-05 00:00:00', status='Aceito', portao='A')
+    esperados = [
+        log_id for log_id, (timestamp, status, _, portao) in enumerate(logs, start=1)
+        if '2026-03-02' <= timestamp < '2026-03-05' and status == 'Aceito' and portao == 'A'
+    ]
+    esperados.sort(key=lambda log_id: (logs[log_id - 1][0], log_id), reverse=True)
+    ids = [log_id for pagina in _paginas(conn, limite=2, **filtros) for log_id in pagina]
+    assert ids == esperados
+
+def test_fim_e_exclusivo_e_inicio_inclusivo():
+    conn = _banco([('2026-03-01 00:00:00', 'Aceito', 1, 'A'), ('2026-03-02 00:00:00', 'Aceito', 1, 'A')])
+    linhas, _ = listar_logs(conn, inicio='2026-03-01 00:00:00', fim='2026-03-02 00:00:00')
+    assert [linha[0] for linha in linhas] == [1]
+
+# --- Resumos mantidos por gatilhos ---
+
+def test_migracao_padroniza_timestamps_e_preenche_os_resumos():
+    conn = _banco([
+        ('2026-03-01T08:15:00', 'Aceito', 1, 'A'),
+        ('2026-03-01 08:45:10.123', 'Negado', 2, None),
+        ('2026-03-02 09:00:00', 'Aceito', 1, 'A'),
+    ])
+    timestamps = [linha[0] for linha in conn.execute("SELECT timestamp_acesso FROM LogsAcesso ORDER BY id")]
+    assert timestamps == ['2026-03-01 08:15:00', '2026-03-01 08:45:10', '2026-03-02 09:00:00']
+    assert resumo_acessos(conn, 'hora') == [
+        ('2026-03-01 08', 'Aceito', 'A', 1),
+        ('2026-03-01 08', 'Negado', '', 1),
+        ('2026-03-02 09', 'Aceito', 'A', 1),
+    ]
+
+def test_gatilho_soma_cada_log_novo_no_resumo():
+    conn = _banco([('2026-03-01 08:00:00', 'Aceito', 1, 'A')])
+    _gravar(conn, [('2026-03-01 08:30:00', 'Aceito', 2, 'A'), ('2026-03-01 23:59:59', 'Não Encontrado', None, 'B')])
+    assert resumo_acessos(conn, 'dia') == [
+        ('2026-03-01', 'Aceito', 'A', 2),
+        ('2026-03-01', 'Não Encontrado', 'B', 1),
+    ]
+
+def test_migrar_de_novo_nao_conta_os_logs_duas_vezes():
+    conn = _banco([('2026-03-01 08:00:00', 'Aceito', 1, 'A')] * 3)
+    migrar_logs(conn)
+    _gravar(conn, [('2026-03-01 09:00:00', 'Aceito', 1, 'A')])
+    assert totais_por_status(conn) == {'Aceito': 4}
+
+def test_resumos_batem_com_a_contagem_direta_dos_logs():
+    logs = [(f'2026-03-{1 + i % 7:02d} {i % 24:02d}:{i % 60:02d}:00', ('Aceito', 'Negado', 'Não Encontrado')[i % 3],
+             i % 5, ('A', 'B', None)[i % 3]) for i in range(500)]
+    conn = _banco(logs[:200])
+    _gravar(conn, logs[200:])
+    for granularidade, tamanho in (('hora', 13), ('dia', 10)):
+        diretos = conn.execute(f'''
+            SELECT substr(timestamp_acesso, 1, {tamanho}), status, COALESCE(portao, ''), COUNT(*)
+            FROM LogsAcesso GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ''').fetchall()
+        assert sorted(resumo_acessos(conn, granularidade)) == diretos
+
+def test_filtros_dos_resumos_por_periodo_status_e_portao():
+    conn = _banco([
+        ('2026-03-01 10:00:00', 'Aceito', 1, 'A'),
+        ('2026-03-02 10:00:00', 'Aceito', 1, 'A'),
+        ('2026-03-02 11:00:00', 'Negado', 1, 'B'),
+        ('2026-03-03 10:00:00', 'Aceito', 1, 'A'),
+    ])
+    assert resumo_acessos(conn, 'dia', inicio='2026-03-02', fim=datetime(2026, 3, 3), portao='A') == [
+        ('2026-03-02', 'Aceito', 'A', 1),
+    ]
+    assert totais_por_status(conn, inicio='2026-03-02 00:00:00') == {'Aceito': 2, 'Negado': 1}
+    assert totais_por_status(conn, portao='B') == {'Negado': 1}